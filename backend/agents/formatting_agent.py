@@ -1,24 +1,22 @@
-from jinja2 import Environment, FileSystemLoader
-import os
+from tools.template_registry import get_template_registry
 
 class FormattingAgent:
-    def __init__(self):
-        # Setup Jinja2 to look in the templates folder
-        template_dir = os.path.join(os.getcwd(), "templates")
-        self.env = Environment(loader=FileSystemLoader(template_dir))
+    def __init__(self, registry=None):
+        # Shared registry: templates are compiled once per process (bytecode cached on disk)
+        self.registry = registry or get_template_registry()
 
-    def generate_html_with_context(self, context: dict):
+    def generate_html_with_context(self, context: dict, template: str = None, locale: str = None, timings: dict = None):
         """
         Renders the HTML template using a full context dictionary.
         This supports invoice numbers, dates, tax/discount, etc.
+        `template` / `locale` pick a branded or localized variant (default: quotation_template.html).
+        Template errors are raised: a broken template must not produce a blank quotation.
         """
         try:
-            template = self.env.get_template("quotation_template.html")
-            return template.render(**context)
+            return self.registry.render(context, name=template, locale=locale, timings=timings)
         except Exception as e:
-            print(f"Formatting Error: {e}")
-            # Return a basic fallback HTML if template fails
-            return "<html><body><h1>Error generating quotation</h1></body></html>"
+            print(f"Formatting Error ({template or 'default'}): {e}")
+            raise
 
     # Legacy method (kept for compatibility if needed, but generate_html_with_context is preferred)
     def generate_html(self, products, total):
@@ -29,4 +27,4 @@ class FormattingAgent:
             "date_today": "N/A",
             "customer_name": "Valued Customer"
         }
-        return self.generate_html_with_context(context)
\ No newline at end of file
+        return self.generate_html_with_context(context)
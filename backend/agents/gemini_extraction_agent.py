@@ -1,26 +1,36 @@
-import google.generativeai as genai
 import os
+import hashlib
+import importlib
 import json
 import re
+import threading
+import time
+
+from tools.extraction_cache import extraction_cache, prompt_key
+from tools.resilience import CircuitBreaker, ResilientCaller
 
 from dotenv import load_dotenv
 load_dotenv()
 
-# Load API key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# "module:callable" that builds the model instead of google.generativeai, called with the
+# model name. Set by test / benchmark harnesses, e.g. benchmarks.fake_gemini:fake_model
+GEMINI_MODEL_FACTORY = os.getenv("GEMINI_MODEL_FACTORY")
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1") == "1"
 
-class GeminiExtractionAgent:
-    def __init__(self):
-        # Use a model version that is stable and available for your key
-        # 'gemini-2.5-flash' is generally faster/cheaper if available, else 'gemini-pro'
-        self.model_name = "gemini-2.5-flash" 
+# Upstream call policy (seconds); see tools.resilience
+gemini_caller = ResilientCaller(
+    "gemini",
+    deadline=float(os.getenv("GEMINI_DEADLINE", "20")),
+    attempt_timeout=float(os.getenv("GEMINI_ATTEMPT_TIMEOUT", "8")),
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+    retries=int(os.getenv("GEMINI_RETRIES", "2")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")),
+    ),
+)
 
-    def extract(self, prompt: str):
-        """
-        Extracts product requirements from natural language into structured JSON.
-        """
-        
-        system_prompt = """
+SYSTEM_PROMPT = """
         You are an expert sales engineer and quotation agent.
         
         Your Goal: 
@@ -45,28 +55,142 @@ class GeminiExtractionAgent:
         4. Do not markdown the output. Just plain JSON.
         """
 
+# Part of the extraction cache key: editing the system prompt retires old cached extractions
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+_models = {}
+_models_lock = threading.Lock()
+_genai = None
+
+
+def get_genai():
+    """google.generativeai, imported and configured on first use (it's slow to import)."""
+    global _genai
+    if _genai is None:
+        with _models_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                # Load API key
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _genai = genai
+    return _genai
+
+
+def load_model_factory(spec):
+    """The callable named by a "module:callable" spec."""
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def get_model(model_name):
+    """One GenerativeModel per model name, shared by every request."""
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_name)
+            if model is None:
+                if GEMINI_MODEL_FACTORY:
+                    print(f"WARNING: GEMINI_MODEL_FACTORY={GEMINI_MODEL_FACTORY}, not calling Gemini")
+                    model = load_model_factory(GEMINI_MODEL_FACTORY)(model_name)
+                else:
+                    model = get_genai().GenerativeModel(model_name)
+                _models[model_name] = model
+    return model
+
+
+class GeminiExtractionAgent:
+    def __init__(self, model=None, cache=None, caller=None, fallback=None):
+        # Use a model version that is stable and available for your key
+        # 'gemini-2.5-flash' is generally faster/cheaper if available, else 'gemini-pro'
+        self.model_name = "gemini-2.5-flash" 
+        self._model = model
+        self.cache = cache if cache is not None else (extraction_cache if EXTRACTION_CACHE_ENABLED else None)
+        self.caller = caller or gemini_caller
+        # fallback(prompt) -> extraction, used when Gemini is down / too slow
+        self.fallback = fallback
+
+    @property
+    def model(self):
+        return self._model if self._model is not None else get_model(self.model_name)
+
+    def _build_prompt(self, prompt: str):
         # Combine system + user
+        return f"{SYSTEM_PROMPT}\n\nUSER REQUEST:\n{prompt}"
+
+    def _parse_response(self, response):
+        raw = response.text.strip()
+
+        # --- CLEAN JSON (Remove Markdown ```json ... ```) ---
+        # This regex finds the first { and the last } to capture the JSON object
+        json_match = re.search(r"\{[\s\S]*\}", raw)
+        
+        if json_match:
+            clean_json = json_match.group(0)
+            return json.loads(clean_json)
+        
+        # Fallback if regex fails but text looks like json
+        return json.loads(raw)
+
+    def extract(self, prompt: str):
+        """
+        Extracts product requirements from natural language into structured JSON.
+        """
+        key = prompt_key(prompt, self.model_name, PROMPT_VERSION)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            self.cache.record_lookup(hit=cached is not None)
+            if cached is not None:
+                return cached
+
         # Note: The call structure depends on the library version. 
         # This is the standard generating content call.
+        started = time.perf_counter()
         try:
-            model = genai.GenerativeModel(self.model_name)
-            
-            response = model.generate_content(f"{system_prompt}\n\nUSER REQUEST:\n{prompt}")
-            
-            raw = response.text.strip()
-
-            # --- CLEAN JSON (Remove Markdown ```json ... ```) ---
-            # This regex finds the first { and the last } to capture the JSON object
-            json_match = re.search(r"\{[\s\S]*\}", raw)
-            
-            if json_match:
-                clean_json = json_match.group(0)
-                return json.loads(clean_json)
-            
-            # Fallback if regex fails but text looks like json
-            return json.loads(raw)
-
+            response = self.model.generate_content(self._build_prompt(prompt))
+            result = self._parse_response(response)
         except Exception as e:
+            self._record(started, ok=False)
             print(f"GEMINI EXTRACTION ERROR: {e}")
             # Return empty structure to prevent crashes
-            return {"items": []}
\ No newline at end of file
+            return {"items": []}
+
+        self._record(started, ok=True)
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    async def extract_async(self, prompt: str):
+        """
+        Same as extract(), but awaits the Gemini call instead of blocking the event loop.
+        Concurrent identical prompts share a single upstream call; the call runs under
+        the deadline / retry / circuit breaker policy of self.caller.
+        """
+        try:
+            if self.cache is None:
+                return await self._call_async(prompt)
+            return await self.cache.get_or_load(
+                prompt_key(prompt, self.model_name, PROMPT_VERSION), lambda: self._call_async(prompt)
+            )
+        except Exception as e:
+            print(f"GEMINI EXTRACTION ERROR: {type(e).__name__}: {e}")
+            # Failures are never cached; degrade to local matching if we can
+            if self.fallback is not None:
+                return self.fallback(prompt)
+            # Return empty structure to prevent crashes
+            return {"items": []}
+
+    async def _call_async(self, prompt: str):
+        started = time.perf_counter()
+        full_prompt = self._build_prompt(prompt)
+        try:
+            response = await self.caller.call(lambda: self.model.generate_content_async(full_prompt))
+            result = self._parse_response(response)
+        except Exception:
+            self._record(started, ok=False)
+            raise
+        self._record(started, ok=True)
+        return result
+
+    def _record(self, started, ok):
+        if self.cache is not None:
+            self.cache.record_upstream((time.perf_counter() - started) * 1000, ok)
@@ -0,0 +1,197 @@
+import os
+import re
+import threading
+import time
+
+from agents.product_agent import ProductAgent
+from tools.product_matcher import STOPWORDS, compact, tokenize
+
+# Set FAST_PATH_ENABLED=0 to always go to Gemini
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") != "0"
+
+# A ranked (non-exact) match must be at least this confident...
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+# ...and beat the runner-up by this score ratio, otherwise we let the LLM decide
+FAST_PATH_MIN_MARGIN = float(os.getenv("FAST_PATH_MIN_MARGIN", "1.5"))
+
+# "Need a quote of", "please quote", "quotation for:" ...
+LEAD_IN_RE = re.compile(
+    r"^\s*(?:hi|hello)?[\s,]*(?:please\s+)?(?:(?:i|we)\s+)?(?:need|want|require|send)?\s*"
+    r"(?:a\s+)?(?:quote|quotation|price|pricing)?\s*(?:of|for)?\s*[:\-]?\s*",
+    re.IGNORECASE,
+)
+# "... for Acme Corp" at the very end (customer names start with a capital/digit)
+CUSTOMER_TAIL_RE = re.compile(r"\s+for\s+(?:customer\s+|client\s+)?([A-Z0-9][\w&.,'\- ]{0,80}?)\s*[.!]?\s*$")
+# "customer: Acme Corp" / "client - Acme" anywhere
+CUSTOMER_LABEL_RE = re.compile(r"\b(?:customer|client)\s*[:\-]\s*([^,;\n]+)", re.IGNORECASE)
+
+SEGMENT_SPLIT_RE = re.compile(r"[,;\n]+|\s+(?:and|&|plus)\s+", re.IGNORECASE)
+QTY_PREFIX_RE = re.compile(r"^\s*(?:qty\s*:?\s*)?\d+\s*(?:x|×|pcs|units?|nos?\.?)?\s+|^\s*\d+\s*(?:x|×)(?=\S)", re.IGNORECASE)
+QTY_SUFFIX_RE = re.compile(r"\s*(?:(?:x|×)\s*\d+|\s(?:qty|quantity)\s*:?\s*\d+|\s\d+\s*(?:pcs|units?|nos?\.?))\s*$", re.IGNORECASE)
+# Where a customer name runs into the next item: "for Acme and 2 ECS-24-PoE"
+NEXT_ITEM_RE = re.compile(r"\s*(?:qty\b|quantity\b|\d)", re.IGNORECASE)
+
+
+class FastPathStats:
+    """Counters for how often the local extractor answers without Gemini."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+        self.local_ms_total = 0.0
+        self.llm_calls = 0
+        self.llm_ms_total = 0.0
+
+    def record_attempt(self, hit, elapsed_ms):
+        with self._lock:
+            self.attempts += 1
+            self.hits += 1 if hit else 0
+            self.local_ms_total += elapsed_ms
+
+    def record_llm(self, elapsed_ms):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_ms_total += elapsed_ms
+
+    def snapshot(self):
+        with self._lock:
+            avg_llm = self.llm_ms_total / self.llm_calls if self.llm_calls else 0.0
+            avg_local = self.local_ms_total / self.attempts if self.attempts else 0.0
+            return {
+                "enabled": FAST_PATH_ENABLED,
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.attempts, 4) if self.attempts else 0.0,
+                "avg_local_ms": round(avg_local, 3),
+                "llm_calls": self.llm_calls,
+                "avg_llm_ms": round(avg_llm, 3),
+                # Every hit is a Gemini round trip we did not make
+                "estimated_ms_saved": round(self.hits * max(avg_llm - avg_local, 0.0), 1),
+            }
+
+
+fast_path_stats = FastPathStats()
+
+
+class LocalExtractionAgent:
+    """
+    Deterministic extraction for prompts that simply list known SKUs/names with quantities,
+    e.g. "3x UXG-Enterprise, 2 ZK-IWB65/75/86BM for Acme".
+
+    extract() returns the same structure as GeminiExtractionAgent.extract, or None when
+    any part of the prompt is not confidently understood (the caller then asks Gemini).
+    """
+
+    def __init__(self, product_agent=None):
+        self.product_agent = product_agent or ProductAgent()
+
+    def extract(self, prompt: str):
+        if not FAST_PATH_ENABLED or not prompt or not prompt.strip():
+            return None
+
+        started = time.perf_counter()
+        result = self._parse(prompt)
+        fast_path_stats.record_attempt(result is not None, (time.perf_counter() - started) * 1000)
+        return result
+
+    def extract_best_effort(self, prompt: str):
+        """
+        Degraded mode for when Gemini is unavailable: segments the prompt the same way,
+        but keeps segments it cannot resolve as free-text items (the caller's ranked
+        matching gets a go at them, or reports them as unmatched). Never returns None.
+        """
+        return self._parse(prompt or "", strict=False) or {"customer_name": None, "items": [], "source": "fallback"}
+
+    def _parse(self, prompt, strict=True):
+        text, customer_name = self._split_customer(prompt.strip())
+        if strict and customer_name and re.search(r"\s\d", customer_name):
+            # "for Acme 2 ECS-24-PoE": can't tell the name from an item, let the LLM decide
+            return None
+        text = LEAD_IN_RE.sub("", text, count=1)
+
+        snapshot = self.product_agent.catalog.snapshot
+        items = []
+        for segment in SEGMENT_SPLIT_RE.split(text):
+            segment = segment.strip(" .:-\t")
+            if not segment:
+                continue
+
+            item_text, quantity = self._split_quantity(segment)
+            if not [t for t in tokenize(item_text) if t not in STOPWORDS]:
+                # Nothing but filler words / numbers: only acceptable if it carries no quantity
+                if strict and re.search(r"\d", segment):
+                    return None
+                continue
+
+            product = self._resolve(snapshot, item_text)
+            if product is None:
+                if strict:
+                    return None
+                product = {"sku": "", "name": item_text}
+
+            if quantity is None:
+                quantity = self.product_agent.extract_quantity(segment, item_text, product.get("sku"))
+            if strict and quantity < 1:
+                # "0 UXG-Enterprise" is not a confident read; best-effort passes it on for parse_quantity to reject
+                return None
+            items.append({
+                "sku": product.get("sku"),
+                "name": product.get("name"),
+                "quantity": quantity,
+            })
+
+        if not items:
+            return None
+
+        return {"customer_name": customer_name, "items": items, "source": "local" if strict else "fallback"}
+
+    def _split_quantity(self, segment):
+        """(item text, quantity) with the "3x" / "4 units" / "x3" / "qty: 3" part removed; quantity None if absent."""
+        quantity = None
+        match = QTY_PREFIX_RE.search(segment)
+        if match:
+            quantity = int(re.search(r"\d+", match.group()).group())
+            segment = segment[match.end():]
+        match = QTY_SUFFIX_RE.search(segment)
+        if match:
+            quantity = int(re.search(r"\d+", match.group()).group())
+            segment = segment[:match.start()]
+        return segment.strip(), quantity
+
+    def _split_customer(self, prompt):
+        match = CUSTOMER_LABEL_RE.search(prompt)
+        if match:
+            customer, rest = self._cut_customer(match.group(1))
+            return prompt[:match.start()] + rest + prompt[match.end():], customer.strip()
+
+        match = CUSTOMER_TAIL_RE.search(prompt)
+        if match:
+            customer, rest = self._cut_customer(match.group(1))
+            return prompt[:match.start()] + rest, customer.strip(" ,")
+
+        return prompt, None
+
+    def _cut_customer(self, customer):
+        """Stops a captured customer name at the first separator followed by a quantity; returns (name, rest)."""
+        for separator in SEGMENT_SPLIT_RE.finditer(customer):
+            if NEXT_ITEM_RE.match(customer, separator.end()):
+                return customer[:separator.start()], ", " + customer[separator.end():]
+        return customer, ""
+
+    def _resolve(self, snapshot, item_text):
+        """Exact SKU/name (incl. dash/space variants), else an unambiguous ranked match."""
+        product = snapshot.index.exact(item_text)
+        if product is not None:
+            return product
+
+        pid = snapshot.matcher.sku_compact.get(compact(item_text))
+        if pid is not None:
+            return snapshot.products[pid]
+
+        ranked = snapshot.matcher.rank(item_text, top_k=2)
+        if not ranked or ranked[0]["confidence"] < FAST_PATH_MIN_CONFIDENCE:
+            return None
+        if len(ranked) > 1 and ranked[0]["score"] < ranked[1]["score"] * FAST_PATH_MIN_MARGIN:
+            return None
+        return ranked[0]["product"]
@@ -1,34 +1,31 @@
+from tools.pricing_engine import get_pricing_engine, money, parse_quantity
+
+
 class PricingAgent:
-    def __init__(self):
-        # Default margin rules (can be updated later)
-        self.default_margin = 0.10  # 10% markup
+    def __init__(self, engine=None):
+        # Margins, quantity tiers and customer price lists live in data/pricing_rules.json
+        self.engine = engine or get_pricing_engine()
 
-    def process(self, products):
+    def process(self, products, customer=None):
         """
         Takes extracted products and applies pricing.
         Returns: priced_items_list, grand_total
         """
+        unit_prices, line_totals, flags = self.engine.price_lines(products, customer=customer)
 
         priced_items = []
-        grand_total = 0
-
-        for item in products:
-            base_price = item.get("price", 50)  # fallback dummy price
-            margin_price = base_price + (base_price * self.default_margin)
-
-            quantity = item.get("quantity", 1)
-            line_total = margin_price * quantity
-
-            priced_items.append({
+        for item, unit_price, line_total, flag in zip(products, unit_prices, line_totals, flags):
+            priced = {
                 "sku": item["sku"],
                 "name": item["name"],
-                "quantity": quantity,
-                "unit_price": round(margin_price, 2),
-                "line_total": round(line_total, 2),
+                "quantity": parse_quantity(item.get("quantity")),
+                "unit_price": float(unit_price),
+                "line_total": float(line_total),
                 "thumbnail": item.get("thumbnail"),
                 "description": item.get("short_description")
-            })
-
-            grand_total += line_total
+            }
+            if flag:
+                priced.update(flag)
+            priced_items.append(priced)
 
-        return priced_items, round(grand_total, 2)
+        return priced_items, float(money(sum(line_totals)))
@@ -1,43 +1,23 @@
-import json
 import re
-import os
+
+from tools.catalog import get_catalog
+from tools.product_matcher import MATCH_CONFIDENCE_THRESHOLD
 
 class ProductAgent:
-    def __init__(self):
-        # Ensure path is correct relative to where backend starts
-        self.data_path = os.path.join("data", "products.json")
-        self.products_db = self._load_products()
+    def __init__(self, catalog=None):
+        # Shared, hot-reloadable catalog (loaded once per process, not per request)
+        self.catalog = catalog or get_catalog()
+        self.data_path = self.catalog.data_path
+
+    @property
+    def products_db(self):
+        return self.catalog.products
 
     @property
     def products(self):
         """Expose products directly for the /products endpoint"""
         return self.products_db
 
-    def _load_products(self):
-        """
-        Robust loader: Handles both list [...] and dict {"products": [...]} formats.
-        """
-        if not os.path.exists(self.data_path):
-            print(f"WARNING: Product file not found at {self.data_path}")
-            return []
-
-        try:
-            with open(self.data_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                
-                if isinstance(data, dict):
-                    if "products" in data:
-                        return data["products"]
-                    return list(data.values())
-                
-                if isinstance(data, list):
-                    return data
-                
-                return []
-        except Exception as e:
-            print(f"ERROR loading products.json: {e}")
-            return []
-
     def process(self, prompt: str):
         return []
 
@@ -52,55 +32,51 @@ class ProductAgent:
         if not query:
             return []
 
-        query_lower = query.lower().strip()
-        
-        exact_sku = []
-        partial_sku = []
-        name_match = []
-        broad_match = []
-
-        for product in self.products_db:
-            p_sku = str(product.get("sku", "")).lower()
-            p_name = str(product.get("name", "")).lower()
-            p_brand = str(product.get("brand", "")).lower()
-            p_desc = str(product.get("short_description", "")).lower()
-
-            # 1. Exact SKU
-            if query_lower == p_sku:
-                exact_sku.append(product)
-                continue
-
-            # 2. SKU Contains
-            if query_lower in p_sku:
-                partial_sku.append(product)
-                continue
+        # Tiers are resolved by the precomputed catalog index (see tools/product_index.py)
+        all_matches = self.catalog.snapshot.index.find(query)
 
-            # 3. Name Contains
-            if query_lower in p_name:
-                name_match.append(product)
-                continue
-            
-            # 4. Broad Match (Brand or Description)
-            if query_lower in p_brand or query_lower in p_desc:
-                broad_match.append(product)
-
-        # Combine results in order of relevance
-        all_matches = exact_sku + partial_sku + name_match + broad_match
-        
         # Remove duplicates while preserving order
         return self._unique(all_matches)
 
+    def rank_products(self, query: str, top_k: int = 5, min_confidence: float = 0.0):
+        """
+        FUZZY SEARCH: scored, typo-tolerant ranking for free-text item names.
+        Returns [{"product", "score", "confidence"}] best first.
+        """
+        if not query:
+            return []
+        return self.catalog.snapshot.matcher.rank(query, top_k=top_k, min_confidence=min_confidence)
+
+    def resolve_item(self, sku: str = None, name: str = None):
+        """
+        Picks the single best product for an extracted item, or None.
+        Exact/substring search wins (SKU first, then name); otherwise the best
+        ranked match is used if it clears MATCH_CONFIDENCE_THRESHOLD.
+        """
+        for query in (sku, name):
+            found = self.find_products(query)
+            if found:
+                return found[0]
+
+        query = " ".join(q for q in (sku, name) if q)
+        ranked = self.rank_products(query, top_k=1, min_confidence=MATCH_CONFIDENCE_THRESHOLD)
+        if ranked:
+            return ranked[0]["product"]
+        return None
+
     def extract_quantity(self, prompt: str, name: str, sku: str):
         prompt_lower = prompt.lower()
         name_lower = name.lower() if name else ""
         sku_lower = sku.lower() if sku else ""
 
         patterns = [
-            rf"(\d+)\s+{re.escape(sku_lower)}",
+            rf"(\d+)\s*(?:x|×)?\s+{re.escape(sku_lower)}",
+            rf"{re.escape(sku_lower)}\s*(?:x|×)\s*(\d+)",
             rf"{re.escape(sku_lower)}\s+(\d+)",
-            rf"(\d+)\s+{re.escape(name_lower)}",
+            rf"(\d+)\s*(?:x|×)?\s+{re.escape(name_lower)}",
+            rf"{re.escape(name_lower)}\s*(?:x|×)\s*(\d+)",
             rf"{re.escape(name_lower)}\s+(\d+)",
-            r"qty\s+(\d+)",
+            r"qty\s*:?\s*(\d+)",
         ]
 
         for p in patterns:
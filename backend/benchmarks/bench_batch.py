@@ -0,0 +1,67 @@
+"""
+Throughput of bulk quotation runs: N x /finalize-quotation vs one
+/finalize-quotation/batch call, against a running backend.
+
+    python -m benchmarks.bench_batch --quotes 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.load_test import finalize_payload
+
+
+async def single_path(client, quotes, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            response = await client.post("/finalize-quotation", json=finalize_payload(i))
+            errors += response.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(quotes)))
+    return time.perf_counter() - started, errors, None
+
+
+async def batch_path(client, quotes):
+    payload = {"quotations": [finalize_payload(i) for i in range(quotes)]}
+    errors = 0
+    first_result = None
+
+    started = time.perf_counter()
+    async with client.stream("POST", "/finalize-quotation/batch", json=payload) as response:
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            if first_result is None:
+                first_result = time.perf_counter() - started
+            errors += not json.loads(line).get("success")
+    return time.perf_counter() - started, errors, first_result
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        rows = [
+            ("single", *await single_path(client, args.quotes, args.concurrency)),
+            ("batch", *await batch_path(client, args.quotes)),
+        ]
+
+    print(f"{args.quotes} quotations @ {args.url}")
+    print(f"{'path':>7} {'elapsed':>9} {'quotes/s':>9} {'first result':>13} {'errors':>7}")
+    for label, elapsed, errors, first in rows:
+        first_txt = f"{first * 1000:.0f}ms" if first is not None else "-"
+        print(f"{label:>7} {elapsed:>8.2f}s {args.quotes / elapsed:>9.2f} {first_txt:>13} {errors:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--quotes", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="client concurrency for the single path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""
+Supplier feed import: initial CSV load, an incremental re-import with 1% changed
+prices, and catalog (re)load time from products.json vs the SQLite store.
+
+    python -m benchmarks.bench_catalog_import --size 100000
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import synthetic_products
+from tools.catalog import ProductCatalog
+from tools.catalog_import import peak_rss_mb, read_feed
+from tools.catalog_store import CatalogStore
+
+FIELDS = ["sku", "name", "brand", "category", "price", "thumbnail", "description", "short_description", "use_case"]
+
+
+def write_csv(path, products):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        writer.writerows(products)
+
+
+def load_ms(catalog):
+    started = time.perf_counter()
+    catalog.maybe_reload(force=True)
+    loaded = time.perf_counter()
+    catalog.snapshot.index.lookup("ab")
+    return (loaded - started) * 1000, (time.perf_counter() - loaded) * 1000
+
+
+def main(args):
+    products = synthetic_products(args.size)
+    with tempfile.TemporaryDirectory() as tmp:
+        feed, db_path, json_path = (os.path.join(tmp, name) for name in ("feed.csv", "catalog.db", "products.json"))
+        write_csv(feed, products)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"products": products}, f)
+
+        store = CatalogStore(db_path)
+        initial = store.import_rows(read_feed(feed))
+        for p in products[::100]:
+            p["price"] = round(p["price"] * 1.05, 2)
+        write_csv(feed, products)
+        incremental = store.import_rows(read_feed(feed), full=True)
+
+        json_load, _ = load_ms(ProductCatalog(data_path=json_path))
+        store_load, store_index = load_ms(ProductCatalog(store=CatalogStore(db_path)))
+
+    print(f"{args.size} products (peak RSS {peak_rss_mb()} MiB)")
+    for label, report in (("initial import", initial), ("1% re-import", incremental)):
+        print(f"  {label:<16} {report['elapsed_s']:>7.2f}s {report['rows_per_sec']:>9,} rows/s  "
+              f"+{report['inserted']} ~{report['updated']} -{report['deleted']} ={report['unchanged']}")
+    print(f"  catalog load     products.json {json_load:.0f}ms (index + matcher built up front), "
+          f"sqlite {store_load:.0f}ms + {store_index:.0f}ms index on first search")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000)
+    main(parser.parse_args())
@@ -0,0 +1,166 @@
+"""
+Cold start: module import time and time-to-first-response of a fresh backend process.
+
+Run from the backend/ folder:
+
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --runs 5 --modes core none all --top 15
+
+Each run spawns a new uvicorn process (fake Gemini model, cold extraction cache) and
+polls it: spawn -> first /health 200 (liveness), spawn -> first /ready 200 (warm-up
+done), then the latency of the first /analyze-request and /products/search calls.
+WARMUP_BLOCKING modes are compared side by side.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.run_suite import BACKEND_DIR, free_port
+
+# Modules that main.py must not import at startup any more
+HEAVY_MODULES = ("google.generativeai", "weasyprint", "PIL", "requests")
+
+IMPORT_PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import main\n"
+    "print(json.dumps({'import_s': time.perf_counter() - t,\n"
+    "                  'heavy': [m for m in %r if m in sys.modules]}))\n" % (HEAVY_MODULES,)
+)
+
+
+def measure_import(runs):
+    samples, heavy = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, capture_output=True,
+                             text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        samples.append(result["import_s"] * 1000)
+        heavy = result["heavy"]
+    return {"runs": runs, "median_ms": round(statistics.median(samples), 1),
+            "min_ms": round(min(samples), 1), "heavy_modules_loaded": heavy}
+
+
+def top_imports(top):
+    """Slowest top-level imports (cumulative µs) from `python -X importtime -c 'import main'`."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                         capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        # Direct imports of main (and main itself) sit at one-space indentation
+        if match and len(match[3]) <= 2:
+            rows.append((int(match[2]), match[4]))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[:top]]
+
+
+def _poll(client, path, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            response = client.get(path)
+            if response.status_code == 200:
+                return response
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{path} not 200 before the timeout")
+
+
+def measure_startup(mode, timeout):
+    port = free_port()
+    env = dict(os.environ, WARMUP_BLOCKING=mode, GEMINI_MODEL_FACTORY=os.getenv("GEMINI_MODEL_FACTORY", "benchmarks.fake_gemini:fake_model"),
+               EXTRACTION_CACHE_FILE="", PREWARM_THUMBNAILS="0", PYTHONUNBUFFERED="1")
+    log = tempfile.TemporaryFile()
+    spawned = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                                "--log-level", "warning"], cwd=BACKEND_DIR, env=env, stdout=log,
+                               stderr=subprocess.STDOUT)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            deadline = spawned + timeout
+            _poll(client, "/health", deadline)
+            health_ms = (time.perf_counter() - spawned) * 1000
+            ready = _poll(client, "/ready", deadline).json()
+            ready_ms = (time.perf_counter() - spawned) * 1000
+
+            firsts = {}
+            for name, method, path, body in [
+                ("analyze", "POST", "/analyze-request", {"prompt": "2 x drill, 5 x safety gloves"}),
+                ("search", "GET", "/products/search?q=drill", None),
+            ]:
+                started = time.perf_counter()
+                client.request(method, path, json=body).raise_for_status()
+                firsts[name] = round((time.perf_counter() - started) * 1000, 1)
+    except Exception:
+        log.seek(0)
+        sys.stderr.write(log.read().decode("utf-8", "replace")[-2000:])
+        raise
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        log.close()
+
+    return {
+        "health_ms": round(health_ms, 1),
+        "ready_ms": round(ready_ms, 1),
+        "first_ms": firsts,
+        "status": ready["status"],
+        "import_s": ready["startup"]["import_s"],
+        "steps_ms": {name: step.get("ms") for name, step in ready["steps"].items()},
+    }
+
+
+def median_of(results, key):
+    return round(statistics.median(r[key] for r in results), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["core", "none", "all"], choices=["core", "none", "all"])
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = {"import": measure_import(args.runs), "top_imports": top_imports(args.top), "startup": {}}
+    for mode in args.modes:
+        runs = [measure_startup(mode, args.timeout) for _ in range(args.runs)]
+        report["startup"][mode] = {
+            "health_ms": median_of(runs, "health_ms"),
+            "ready_ms": median_of(runs, "ready_ms"),
+            "first_analyze_ms": round(statistics.median(r["first_ms"]["analyze"] for r in runs), 1),
+            "first_search_ms": round(statistics.median(r["first_ms"]["search"] for r in runs), 1),
+            "status": runs[-1]["status"],
+            "steps_ms": runs[-1]["steps_ms"],
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    imp = report["import"]
+    print(f"import main: median {imp['median_ms']} ms, min {imp['min_ms']} ms "
+          f"(heavy modules loaded: {', '.join(imp['heavy_modules_loaded']) or 'none'})")
+    for row in report["top_imports"]:
+        print(f"  {row['cumulative_ms']:>8.1f} ms  {row['module']}")
+    print(f"\n{'mode':<6} {'health':>9} {'ready':>9} {'1st analyze':>12} {'1st search':>11}  status")
+    for mode, row in report["startup"].items():
+        print(f"{mode:<6} {row['health_ms']:>7.0f}ms {row['ready_ms']:>7.0f}ms {row['first_analyze_ms']:>10.1f}ms "
+              f"{row['first_search_ms']:>9.1f}ms  {row['status']}")
+    for mode, row in report["startup"].items():
+        steps = ", ".join(f"{k} {v:.0f}ms" for k, v in row["steps_ms"].items() if v is not None)
+        print(f"  {mode} warm-up steps: {steps}")
+
+
+if __name__ == "__main__":
+    main()
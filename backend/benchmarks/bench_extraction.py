@@ -0,0 +1,71 @@
+"""
+Extraction cache + request coalescing with the offline fake Gemini: a prompt
+mix with repeats (pasted templates, retries), uncached vs cached.
+
+    python -m benchmarks.bench_extraction --requests 200 --unique 40 --concurrency 16
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from agents.gemini_extraction_agent import GeminiExtractionAgent
+from benchmarks.common import summarize
+from benchmarks.fake_gemini import FakeGeminiModel
+from tools.extraction_cache import ExtractionCache
+
+
+def prompt_mix(requests, unique, seed=3):
+    rng = random.Random(seed)
+    templates = [f"{1 + i % 4} cameras, {2 + i % 3} switches and 1 gateway for Customer {i}" for i in range(unique)]
+    prompts = []
+    for _ in range(requests):
+        prompt = rng.choice(templates)
+        # Near-identical variants: whitespace noise
+        if rng.random() < 0.3:
+            prompt = "  " + prompt.replace(" ", "  ") + " \n"
+        prompts.append(prompt)
+    return prompts
+
+
+async def run(agent, prompts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(prompt):
+        async with semaphore:
+            started = time.perf_counter()
+            await agent.extract_async(prompt)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in prompts))
+    result = summarize(latencies)
+    result["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+async def main(args):
+    prompts = prompt_mix(args.requests, args.unique)
+    rows = []
+    for label, cache in (("uncached", None), ("cached", ExtractionCache(path=None))):
+        model = FakeGeminiModel(latency_ms=args.latency)
+        agent = GeminiExtractionAgent(model=model)
+        agent.cache = cache  # the constructor would fall back to the shared cache
+        result = await run(agent, prompts, args.concurrency)
+        rows.append((label, result, model.calls, cache.stats() if cache else None))
+
+    print(f"{len(prompts)} requests, {args.unique} distinct prompts, fake latency {args.latency}ms")
+    print(f"{'mode':>9} {'upstream':>9} {'elapsed':>8} {'p50':>8} {'p95':>8} {'hit rate':>9}")
+    for label, r, calls, stats in rows:
+        hit_rate = f"{stats['hit_rate']:.0%}" if stats else "-"
+        print(f"{label:>9} {calls:>9} {r['elapsed_s']:>7.2f}s {r['p50_ms']:>6.1f}ms {r['p95_ms']:>6.1f}ms {hit_rate:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=int, default=300, help="fake Gemini latency (ms)")
+    asyncio.run(main(parser.parse_args()))
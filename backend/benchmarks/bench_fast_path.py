@@ -0,0 +1,51 @@
+"""
+Local fast-path extraction: checks known prompts against data/products.json
+(customer split, multi-item, quantity forms), then times the parser.
+
+    python -m benchmarks.bench_fast_path --iterations 2000
+"""
+import argparse
+
+from agents.local_extraction_agent import LocalExtractionAgent
+from benchmarks.common import summarize, time_calls
+
+# prompt -> expected (customer, [(sku, quantity), ...]), or None when Gemini must decide
+CASES = {
+    "3x UXG-Enterprise, 2 ZK-IWB65/75/86BM for Acme Corp":
+        ("Acme Corp", [("UXG-Enterprise", 3), ("ZK-IWB65/75/86BM", 2)]),
+    "3 UXG-Enterprise for Acme and 2 ECS-24-PoE":
+        ("Acme", [("UXG-Enterprise", 3), ("ECS-24-PoE", 2)]),
+    "customer: Acme and 2 UXG-Enterprise, 1 ECS-24-PoE":
+        ("Acme", [("UXG-Enterprise", 2), ("ECS-24-PoE", 1)]),
+    "please send 4 units UXG-Enterprise": (None, [("UXG-Enterprise", 4)]),
+    "UXG-Enterprise 6 pcs and ECS-24-PoE x2 for Acme & Sons":
+        ("Acme & Sons", [("UXG-Enterprise", 6), ("ECS-24-PoE", 2)]),
+    "UXG-Enterprise qty: 5 for 3M": ("3M", [("UXG-Enterprise", 5)]),
+    "2 UXG-Enterprise for Acme 2 ECS-24-PoE": None,
+    # Zero quantities are not rounded up to 1: Gemini / parse_quantity decide
+    "0 UXG-Enterprise": None,
+    "0x UXG-Enterprise for Acme": None,
+    "UXG-Enterprise x0, 2 ECS-24-PoE": None,
+}
+
+
+def check(agent):
+    for prompt, expected in CASES.items():
+        result = agent.extract(prompt)
+        got = result and (result["customer_name"], [(i["sku"], i["quantity"]) for i in result["items"]])
+        assert got == expected, f"{prompt!r}: expected {expected}, got {got}"
+
+
+def main(args):
+    agent = LocalExtractionAgent()
+    check(agent)
+    prompts = list(CASES) * (args.iterations // len(CASES) + 1)
+    result = summarize(time_calls(agent.extract, prompts[:args.iterations]))
+    print(f"OK: {len(CASES)} prompts parsed as expected")
+    print(f"local parse p50/p95/p99: {result['p50_ms']:.3f}/{result['p95_ms']:.3f}/{result['p99_ms']:.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,72 @@
+"""
+/history cost vs archive size: the old glob + getmtime + sort scan against
+one page from the SQLite history index.
+
+    python -m benchmarks.bench_history --sizes 1000 10000 50000
+"""
+import argparse
+import glob
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import summarize, time_calls
+from tools.history_store import HistoryStore
+from tools.pdf_storage import LocalPdfStorage
+
+
+def legacy_list(pdf_dir):
+    paths = sorted(glob.glob(os.path.join(pdf_dir, "*.pdf")), key=os.path.getmtime, reverse=True)
+    return [(os.path.basename(p), os.path.getmtime(p)) for p in paths]
+
+
+def build_archive(tmp, size, seed=7):
+    rng = random.Random(seed)
+    pdf_dir = os.path.join(tmp, "pdfs")
+    os.makedirs(pdf_dir)
+    store = HistoryStore(db_path=os.path.join(tmp, "history.db"), storage=LocalPdfStorage(pdf_dir))
+    now = time.time()
+    for i in range(size):
+        invoice_no = f"SQ-BENCH-{i:06d}"
+        path = os.path.join(pdf_dir, f"{invoice_no}.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF")
+        created_at = now - rng.uniform(0, 365 * 86400)
+        os.utime(path, (created_at, created_at))
+    # Backfill indexes the files; then attach customers/totals like finalize would
+    conn = store._conn()
+    with conn:
+        conn.executemany(
+            "UPDATE quotations SET customer_name = ?, customer_key = ?, grand_total = ? WHERE invoice_no = ?",
+            [(f"Customer {i % 500}", f"customer {i % 500}", rng.uniform(100, 50000), f"SQ-BENCH-{i:06d}")
+             for i in range(size)],
+        )
+    return pdf_dir, store
+
+
+def main(args):
+    print(f"{'files':>7} {'legacy p50':>11} {'page p50':>9} {'filtered p50':>13} {'deep page p50':>14}")
+    runs = range(args.repeat)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_dir, store = build_archive(tmp, size)
+            legacy = summarize(time_calls(lambda _: legacy_list(pdf_dir), runs))
+            page = summarize(time_calls(lambda _: store.query(limit=50), runs))
+            filtered = summarize(time_calls(
+                lambda _: store.query(limit=50, customer="customer 42", min_total=1000), runs))
+
+            cursor = None
+            for _ in range(min(20, size // 50)):
+                _, cursor = store.query(limit=50, cursor=cursor)
+            deep = summarize(time_calls(lambda _: store.query(limit=50, cursor=cursor), runs))
+
+        print(f"{size:>7} {legacy['p50_ms']:>9.2f}ms {page['p50_ms']:>7.2f}ms "
+              f"{filtered['p50_ms']:>11.2f}ms {deep['p50_ms']:>12.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,93 @@
+"""
+HTML size, PDF size and render time: legacy full-size PNG thumbnails vs
+normalised (box-sized JPEG/PNG, de-duplicated) thumbnails.
+
+    python -m benchmarks.bench_images --lines 30 --distinct 10
+"""
+import argparse
+import base64
+import os
+import tempfile
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from agents.formatting_agent import FormattingAgent
+from benchmarks.image_server import synthetic_image
+from tools.pdf_generator import encode_image, generate_pdf_from_html
+
+
+def legacy_encode(content):
+    """What image_to_base64 used to do: full resolution PNG."""
+    img = Image.open(BytesIO(content))
+    if img.mode in ("RGBA", "P"):
+        img = img.convert("RGB")
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+def build_context(images, lines):
+    items = []
+    for i in range(lines):
+        items.append({
+            "sku": f"SKU-{i:04d}",
+            "name": f"Benchmark Product {i}",
+            "quantity": 1 + i % 4,
+            "unit_price": 100.0 + i,
+            "line_total": (100.0 + i) * (1 + i % 4),
+            "base64_image": images[i % len(images)],
+        })
+    total = sum(item["line_total"] for item in items)
+    return {
+        "invoice_no": "SQ-BENCH-0001", "quote_id": "SQ-BENCH-0001",
+        "customer_name": "Benchmark Customer", "date_today": "2025-01-01", "valid_until": "2025-01-31",
+        "items": items, "subtotal": total, "discount_rate": 0, "discount_amount": 0,
+        "tax_rate": 0, "tax_amount": 0, "total": total,
+    }
+
+
+def measure(label, encoder, raw_images, lines, out_dir):
+    started = time.perf_counter()
+    encoded = [encoder(content) for content in raw_images]
+    encode_ms = (time.perf_counter() - started) * 1000
+
+    html = FormattingAgent().generate_html_with_context(build_context(encoded, lines))
+
+    pdf_path = os.path.join(out_dir, f"{label}.pdf")
+    started = time.perf_counter()
+    generate_pdf_from_html(html, pdf_path)
+    render_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "label": label,
+        "encode_ms": round(encode_ms, 1),
+        "html_bytes": len(html.encode("utf-8")),
+        "render_ms": round(render_ms, 1),
+        "pdf_bytes": os.path.getsize(pdf_path),
+    }
+
+
+def run(lines, distinct):
+    raw_images = [synthetic_image(seed) for seed in range(distinct)]
+    with tempfile.TemporaryDirectory() as out_dir:
+        rows = [
+            measure("legacy_png", legacy_encode, raw_images, lines, out_dir),
+            measure("normalized", encode_image, raw_images, lines, out_dir),
+        ]
+
+    print(f"{lines} line items, {distinct} distinct 600x600 images")
+    print(f"{'variant':>12} {'encode':>9} {'html':>11} {'render':>10} {'pdf':>11}")
+    for r in rows:
+        print(f"{r['label']:>12} {r['encode_ms']:>7.1f}ms {r['html_bytes']:>11,} "
+              f"{r['render_ms']:>8.1f}ms {r['pdf_bytes']:>11,}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=30)
+    parser.add_argument("--distinct", type=int, default=10)
+    args = parser.parse_args()
+    run(args.lines, args.distinct)
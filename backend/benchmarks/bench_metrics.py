@@ -0,0 +1,42 @@
+"""
+Instrumentation overhead: cost of one `with stage(...)` block and one counter
+increment with metrics enabled vs disabled (METRICS_ENABLED=0).
+
+    python -m benchmarks.bench_metrics --calls 200000
+"""
+import argparse
+import time
+
+from tools import metrics
+
+
+def per_call_ns(fn, calls):
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - started) / calls
+
+
+def timed_block():
+    with metrics.stage("bench"):
+        pass
+
+
+def main(args):
+    rows = []
+    for enabled in (False, True):
+        metrics.METRICS_ENABLED = enabled
+        rows.append((enabled, per_call_ns(lambda: None, args.calls), per_call_ns(timed_block, args.calls),
+                     per_call_ns(lambda: metrics.count("bench"), args.calls)))
+
+    print(f"{args.calls} calls each (ns per call, loop overhead included)")
+    print(f"{'metrics':>9} {'empty loop':>11} {'stage()':>9} {'count()':>9}")
+    for enabled, empty, block, counter in rows:
+        print(f"{'on' if enabled else 'off':>9} {empty:>11.0f} {block:>9.0f} {counter:>9.0f}")
+    print(f"exposition: {len(metrics.render_prometheus().splitlines())} lines")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    main(parser.parse_args())
@@ -0,0 +1,70 @@
+"""
+PDF storage: flat directory vs day-sharded layout, and the cost of a compaction pass.
+
+Run from the backend/ folder:
+
+    python -m benchmarks.bench_pdf_storage --sizes 2000 20000 --days 90
+
+Each PDF is a small placeholder spread over --days of invoice dates. Measures a
+single stat (what /pdf/<file> does), a full listing, and a compaction pass that
+only has the oldest days to archive (the sharded layout skips recent day shards).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import summarize, time_calls
+from tools.pdf_storage import LocalPdfStorage, compact
+
+DAY = 86400
+
+
+def build(root, size, days, sharded, seed=5):
+    rng = random.Random(seed)
+    storage = LocalPdfStorage(root)
+    now = time.time()
+    names = []
+    for i in range(size):
+        age = rng.uniform(0, days)
+        day = time.strftime("%Y%m%d", time.localtime(now - age * DAY))
+        name = f"SQ-{day}-{i:06d}.pdf"
+        path = storage.path_for(name) if sharded else os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.7 placeholder")
+        os.utime(path, (now - age * DAY, now - age * DAY))
+        names.append(name)
+    return storage, names
+
+
+def main(args):
+    print(f"{'files':>7} {'layout':<8} {'stat p50':>9} {'list all':>10} {'archive pass':>13} {'idle pass':>10}")
+    for size in args.sizes:
+        for sharded in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                storage, names = build(os.path.join(tmp, "pdfs"), size, args.days, sharded)
+                rng = random.Random(1)
+                stat = summarize(time_calls(lambda _: storage.stat(rng.choice(names)), range(200)))
+                started = time.perf_counter()
+                listed = sum(1 for _ in storage.iter_objects())
+                list_ms = (time.perf_counter() - started) * 1000
+                assert listed == size
+                line = f"{size:>7} {'sharded' if sharded else 'flat':<8} {stat['p50_ms']:>7.3f}ms {list_ms:>8.1f}ms"
+                if sharded:
+                    # Only the oldest --archive-window days are due; recent day shards are never listed
+                    archive_after = args.days - args.archive_window
+                    first = compact(storage, archive_after_days=archive_after, retention_days=0)
+                    idle = compact(storage, archive_after_days=archive_after, retention_days=0)
+                    line += (f" {first['elapsed_s'] * 1000:>9.1f}ms ({first['archived']} archived)"
+                             f" {idle['elapsed_s'] * 1000:>7.1f}ms ({idle['scanned']} scanned)")
+                print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--archive-window", type=int, default=7, help="days of PDFs old enough to archive")
+    main(parser.parse_args())
@@ -0,0 +1,38 @@
+"""
+Payload size and latency: full /products listing (raw, gzip) vs one page of
+/products/search with the autocomplete projection, on a synthetic catalog.
+
+    python -m benchmarks.bench_product_search --size 50000
+"""
+import argparse
+import json
+
+from benchmarks.common import sample_queries, summarize, synthetic_products, time_calls
+from tools.catalog import CatalogSnapshot
+from tools.product_search import search_products
+
+
+def main(args):
+    products = synthetic_products(args.size)
+    snapshot = CatalogSnapshot(products, version="bench")
+
+    body, gzipped = snapshot.listing()
+    queries = [q[:args.prefix] for q in sample_queries(products, args.queries)]
+    cold = summarize(time_calls(lambda q: search_products(snapshot, q, limit=10), queries))
+    warm = summarize(time_calls(lambda q: search_products(snapshot, q, limit=10), queries))
+    page = json.dumps(search_products(snapshot, queries[0], limit=10)).encode("utf-8")
+
+    print(f"catalog: {args.size} products")
+    print(f"  /products raw      {len(body) / 1024:>10.1f} KiB")
+    print(f"  /products gzip     {len(gzipped) / 1024:>10.1f} KiB")
+    print(f"  /products/search   {len(page) / 1024:>10.1f} KiB per page (10 items, projected)")
+    print(f"  search p50/p95     cold {cold['p50_ms']:.2f}/{cold['p95_ms']:.2f}ms, "
+          f"cached {warm['p50_ms']:.3f}/{warm['p95_ms']:.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--prefix", type=int, default=4, help="typed characters per query")
+    main(parser.parse_args())
@@ -0,0 +1,152 @@
+"""
+Finalize render cache (tools/quotation_cache.py): checks the failure paths, then
+times hit / Idempotency-Key replay lookups against a cold render.
+
+    python -m benchmarks.bench_render_cache --lookups 2000
+
+Checks: a failed render releases its Idempotency-Key claim (a retry on another
+worker renders at once instead of waiting IDEMPOTENCY_WAIT), a transient storage
+error raises PdfUnavailable without dropping the entry or re-rendering, and a PDF
+that is really gone is re-rendered.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import summarize
+from tools.pdf_storage import LocalPdfStorage
+from tools.quotation_cache import QuotationCache, PdfUnavailable, fingerprint
+from tools.shared_state import SqliteSharedState
+
+PDF_BYTES = b"%PDF-1.7 " + b"x" * 40_000
+
+
+class FlakyStorage(LocalPdfStorage):
+    """Local storage whose reads fail with a permission error while `failing` is set."""
+
+    failing = False
+
+    def stat(self, name):
+        if self.failing:
+            raise PermissionError(f"EACCES {name}")
+        return super().stat(name)
+
+    def get(self, name):
+        if self.failing:
+            raise PermissionError(f"EACCES {name}")
+        return super().get(name)
+
+
+class Renderer:
+    """Render stand-in: numbers quotations in order, optionally failing the next call."""
+
+    def __init__(self, storage, latency_ms=0):
+        self.storage = storage
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.fail_next = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency_ms / 1000)
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("render failed")
+        invoice_no = f"SQ-20261017-{self.calls:04d}"
+        filename = f"{invoice_no}.pdf"
+        self.storage.put(filename, PDF_BYTES)
+        return {"invoice_no": invoice_no, "filename": filename}, PDF_BYTES
+
+
+async def check_claim_released(tmp):
+    shared = SqliteSharedState(os.path.join(tmp, "claim.db"))
+    storage = LocalPdfStorage(os.path.join(tmp, "claim-pdfs"))
+    render = Renderer(storage)
+    first, second = QuotationCache(storage, shared=shared), QuotationCache(storage, shared=shared)
+    content_hash = fingerprint({"customer": "Acme"})
+
+    render.fail_next = True
+    try:
+        await first.get_or_render(content_hash, "retry-key", render)
+        raise AssertionError("render failure was swallowed")
+    except RuntimeError:
+        pass
+    assert shared.get("idem-claim:retry-key") is None, "failed render kept its Idempotency-Key claim"
+
+    # The client retries and lands on another worker
+    started = time.perf_counter()
+    _, _, status = await second.get_or_render(content_hash, "retry-key", render)
+    elapsed = time.perf_counter() - started
+    assert status == "miss" and render.calls == 2, f"retry was not rendered ({status}, {render.calls} renders)"
+    assert elapsed < 1.0, f"retry waited {elapsed:.1f}s for a claim nobody holds"
+
+
+async def check_transient_storage_error(tmp):
+    storage = FlakyStorage(os.path.join(tmp, "flaky-pdfs"))
+    render = Renderer(storage)
+    cache = QuotationCache(storage, use_shared=False)
+    content_hash = fingerprint({"customer": "Acme"})
+
+    result, _, _ = await cache.get_or_render(content_hash, "flaky-key", render)
+    storage.failing = True
+    for key in (None, "flaky-key"):
+        try:
+            await cache.get_or_render(content_hash, key, render)
+            raise AssertionError("storage error did not raise PdfUnavailable")
+        except PdfUnavailable:
+            pass
+    assert render.calls == 1, f"storage error re-rendered ({render.calls} renders, new invoice number spent)"
+    assert cache.stale == 0, "storage error dropped the cache entry"
+
+    storage.failing = False
+    _, _, status = await cache.get_or_render(content_hash, "flaky-key", render)
+    assert status == "replay" and render.calls == 1, f"entry lost after the storage error ({status})"
+
+    # A PDF that is really gone (retention) is re-rendered
+    storage.delete(result["filename"])
+    _, _, status = await cache.get_or_render(content_hash, None, render)
+    assert status == "miss" and render.calls == 2 and cache.stale == 1, f"deleted PDF not re-rendered ({status})"
+
+
+async def time_lookups(tmp, lookups, render_latency_ms):
+    storage = LocalPdfStorage(os.path.join(tmp, "bench-pdfs"))
+    render = Renderer(storage, render_latency_ms)
+    cache = QuotationCache(storage, use_shared=False)
+    content_hash = fingerprint({"customer": "Acme", "lines": 3})
+
+    started = time.perf_counter()
+    await cache.get_or_render(content_hash, "bench-key", render)
+    cold_ms = (time.perf_counter() - started) * 1000
+
+    results = {}
+    for label, key in (("hit", None), ("replay", "bench-key")):
+        samples = []
+        for _ in range(lookups):
+            started = time.perf_counter()
+            await cache.get_or_render(content_hash, key, render)
+            samples.append((time.perf_counter() - started) * 1000)
+        results[label] = summarize(samples)
+    assert render.calls == 1, f"lookups rendered again ({render.calls} renders)"
+    return cold_ms, results
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        await check_claim_released(tmp)
+        print("OK: a failed render releases its Idempotency-Key claim")
+        await check_transient_storage_error(tmp)
+        print("OK: transient storage errors raise PdfUnavailable, deleted PDFs re-render")
+
+        cold_ms, results = await time_lookups(tmp, args.lookups, args.render_latency)
+    print(f"cold render: {cold_ms:.1f}ms (render stand-in {args.render_latency}ms)")
+    for label, r in results.items():
+        print(f"{label:>7} p50/p95/p99: {r['p50_ms']:.3f}/{r['p95_ms']:.3f}/{r['p99_ms']:.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--render-latency", type=int, default=150, help="ms per render (stand-in)")
+    asyncio.run(main(parser.parse_args()))
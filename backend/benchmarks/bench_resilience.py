@@ -0,0 +1,117 @@
+"""
+Extraction tail latency under upstream trouble: drives GeminiExtractionAgent
+against benchmarks/stub_gemini_server.py (started here) through healthy, flaky,
+hanging and outage scenarios, with the resilient call layer and local fallback.
+
+    python -m benchmarks.bench_resilience --requests 100 --concurrency 16
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+
+from agents.gemini_extraction_agent import GeminiExtractionAgent
+from agents.local_extraction_agent import LocalExtractionAgent
+from benchmarks.common import summarize
+from benchmarks.fake_gemini import StubServerModel
+from tools.resilience import CircuitBreaker, ResilientCaller
+
+SCENARIOS = [
+    ("healthy", {"latency_ms": 200, "jitter_ms": 100, "error_rate": 0.0, "hang_rate": 0.0}),
+    ("flaky 30% 503", {"latency_ms": 200, "jitter_ms": 100, "error_rate": 0.3, "hang_rate": 0.0}),
+    ("5% hangs", {"latency_ms": 200, "jitter_ms": 100, "error_rate": 0.0, "hang_rate": 0.05}),
+    ("outage", {"latency_ms": 50, "jitter_ms": 0, "error_rate": 1.0, "hang_rate": 0.0}),
+]
+
+
+async def check_cancelled_probe():
+    """A half-open probe that gets cancelled (client disconnect) must not wedge the breaker."""
+    caller = ResilientCaller("probe", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05), retries=0)
+
+    async def fail():
+        raise ConnectionError("down")
+
+    async def ok():
+        return "ok"
+
+    try:
+        await caller.call(fail)
+    except ConnectionError:
+        pass
+    await asyncio.sleep(0.06)
+    probe = asyncio.create_task(caller.call(lambda: asyncio.sleep(10)))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    await asyncio.gather(probe, return_exceptions=True)
+    assert await caller.call(ok) == "ok", "breaker did not recover after a cancelled probe"
+    assert caller.breaker.state == "closed", caller.breaker.state
+
+
+async def run_scenario(url, settings, args):
+    async with httpx.AsyncClient(base_url=url) as control:
+        await control.post("/control", json=settings)
+
+    caller = ResilientCaller("gemini", deadline=args.deadline, attempt_timeout=args.attempt_timeout,
+                             max_concurrency=args.upstream_concurrency, retries=2,
+                             breaker=CircuitBreaker(failure_threshold=5, reset_timeout=5))
+    local = LocalExtractionAgent()
+    agent = GeminiExtractionAgent(model=StubServerModel(url, "gemini-2.5-flash"), caller=caller,
+                                  fallback=local.extract_best_effort)
+    agent.cache = None
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    fallbacks = 0
+
+    async def one(i):
+        nonlocal fallbacks
+        async with semaphore:
+            started = time.perf_counter()
+            result = await agent.extract_async(f"{1 + i % 4} cameras and 2 switches for Customer {i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            fallbacks += result.get("source") == "fallback"
+
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    result = summarize(latencies)
+    result.update(fallbacks=fallbacks, **{k: v for k, v in caller.stats().items()
+                                          if k in ("retries", "timeouts", "rejected_open", "times_opened")})
+    return result
+
+
+async def main(args):
+    await check_cancelled_probe()
+    print("OK: breaker recovers after a cancelled half-open probe")
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_gemini_server", "--port", str(args.port)])
+    try:
+        async with httpx.AsyncClient(base_url=url) as client:
+            for _ in range(50):
+                try:
+                    await client.get("/control")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+        print(f"{'scenario':>14} {'p50':>8} {'p95':>8} {'p99':>8} {'fallback':>9} {'retries':>8} {'timeouts':>9} {'rejected':>9}")
+        for label, settings in SCENARIOS:
+            r = await run_scenario(url, settings, args)
+            print(f"{label:>14} {r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms {r['p99_ms']:>6.0f}ms "
+                  f"{r['fallbacks']:>9} {r['retries']:>8} {r['timeouts']:>9} {r['rejected_open']:>9}")
+    finally:
+        # The stub holds "hung" requests open, so don't wait for a graceful shutdown
+        server.kill()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--upstream-concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=3.0)
+    parser.add_argument("--attempt-timeout", type=float, default=1.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,154 @@
+"""
+Multi-worker scaling: /finalize-quotation throughput with 1, 2, 4 ... uvicorn workers
+sharing state, plus a check that no invoice number is ever handed out twice.
+
+Run from the backend/ folder:
+
+    python -m benchmarks.bench_scaling --workers 1 2 4 --requests 200 --concurrency 16
+    python -m benchmarks.bench_scaling --state redis       # against benchmarks.stub_redis_server
+
+Each level starts `uvicorn main:app --workers N` in a throwaway workdir (synthetic
+catalog, local thumbnail server, fresh shared state, RENDER_CACHE_TTL=0 so every
+request renders). After the load, the same Idempotency-Key is sent concurrently to
+check that retries landing on different workers replay one quotation. Throughput
+only scales with workers up to the number of CPU cores.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import summarize, synthetic_products
+from benchmarks.image_server import ImageServer
+from benchmarks.run_suite import (BACKEND_DIR, THUMBNAIL_VARIANTS, finalize_payload_factory, free_port,
+                                  prepare_workdir, wait_until_up)
+from benchmarks.stub_redis_server import RedisStubServer
+
+
+async def drive(client, make_payload, concurrency, total, offset):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, invoices, errors = [], [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/finalize-quotation", json=make_payload(offset + i))
+                if response.status_code == 200:
+                    invoices.append(response.json()["invoice_no"])
+                else:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies)
+    result.update({"errors": errors, "elapsed_s": round(elapsed, 3),
+                   "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0})
+    return result, invoices
+
+
+async def idempotent_burst(url, payload, copies):
+    """`copies` concurrent requests with one Idempotency-Key, each on its own connection."""
+    async def one():
+        async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+            response = await client.post("/finalize-quotation", json=payload, headers={"Idempotency-Key": "burst-1"})
+            return response.json().get("invoice_no"), response.headers.get("X-Render-Cache")
+    return await asyncio.gather(*(one() for _ in range(copies)))
+
+
+async def run_level(workers, args, products, image_server):
+    workdir, catalog = prepare_workdir(products, image_server)
+    redis_server = RedisStubServer().start() if args.state == "redis" else None
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])),
+        SHARED_STATE=args.state,
+        GEMINI_MODEL_FACTORY="benchmarks.fake_gemini:fake_model",
+        EXTRACTION_CACHE_FILE="",
+        RENDER_CACHE_TTL="0",  # every finalize renders
+        RENDER_POOL_SIZE=str(args.render_pool),
+        PREWARM_THUMBNAILS="0",
+        PDF_COMPACTION_INTERVAL="0",
+    )
+    if redis_server is not None:
+        env["SHARED_STATE_URL"] = redis_server.url
+    log = open(os.path.join(workdir, "backend.log"), "wb")
+    backend = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                                "--workers", str(workers), "--log-level", "warning"],
+                               cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    make = finalize_payload_factory(catalog, args.quote_lines)
+    try:
+        await wait_until_up(url, backend, "/ready", timeout=120)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+            # Warm every worker: render pool, templates, all thumbnail variants
+            warm_quote = finalize_payload_factory(catalog[:THUMBNAIL_VARIANTS], THUMBNAIL_VARIANTS)
+            await drive(client, warm_quote, args.concurrency, workers * 4, offset=10**6)
+            result, invoices = await drive(client, make, args.concurrency, args.requests, offset=0)
+        burst = await idempotent_burst(url, make(10**7), args.burst)
+    finally:
+        backend.terminate()
+        try:
+            backend.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            backend.kill()
+        log.close()
+        if redis_server is not None:
+            redis_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result["workers"] = workers
+    result["duplicates"] = len(invoices) - len(set(invoices))
+    result["burst_invoices"] = sorted({invoice for invoice, _ in burst})
+    result["burst_status"] = sorted(status or "error" for _, status in burst)
+    return result
+
+
+async def main(args):
+    products = synthetic_products(args.catalog_size)
+    image_server = ImageServer().preload(range(THUMBNAIL_VARIANTS)).start()
+    print(f"{args.state} shared state, {os.cpu_count()} CPU cores, {args.requests} requests @ {args.concurrency}")
+    print(f"{'workers':>7} {'req/s':>8} {'scaling':>8} {'p50':>8} {'p95':>8} {'errors':>7} {'dup':>4}  idempotent burst")
+    failed = False
+    baseline = None
+    try:
+        for workers in args.workers:
+            r = await run_level(workers, args, products, image_server)
+            baseline = baseline or r["throughput_rps"] / workers
+            scaling = r["throughput_rps"] / (baseline * workers) if baseline else 0.0
+            burst_ok = len(r["burst_invoices"]) == 1
+            failed |= bool(r["duplicates"] or r["errors"] or not burst_ok)
+            print(f"{workers:>7} {r['throughput_rps']:>8.1f} {scaling:>7.0%} {r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms "
+                  f"{r['errors']:>7} {r['duplicates']:>4}  {len(r['burst_invoices'])} invoice(s), "
+                  f"{', '.join(r['burst_status'])}")
+    finally:
+        image_server.stop()
+    print("FAILED: errors, duplicate invoice numbers or split idempotent burst" if failed
+          else "OK: no duplicate invoice numbers")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--state", choices=["sqlite", "redis"], default="sqlite")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--quote-lines", type=int, default=10)
+    parser.add_argument("--render-pool", type=int, default=1, help="render processes per worker")
+    parser.add_argument("--burst", type=int, default=8, help="concurrent requests sharing one Idempotency-Key")
+    parser.add_argument("--catalog-size", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
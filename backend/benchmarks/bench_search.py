@@ -0,0 +1,67 @@
+"""
+Query latency of ProductAgent.find_products: legacy linear scan vs catalog index.
+
+    python -m benchmarks.bench_search --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+from agents.product_agent import ProductAgent
+from benchmarks.common import StaticCatalog, sample_queries, summarize, synthetic_products, time_calls
+from tools.catalog import CatalogSnapshot
+
+
+def legacy_find(products, query):
+    """The original per-request scan, kept here as the baseline."""
+    query_lower = query.lower().strip()
+    tiers = ([], [], [], [])
+    for product in products:
+        p_sku = str(product.get("sku", "")).lower()
+        p_name = str(product.get("name", "")).lower()
+        p_brand = str(product.get("brand", "")).lower()
+        p_desc = str(product.get("short_description", "")).lower()
+        if query_lower == p_sku:
+            tiers[0].append(product)
+        elif query_lower in p_sku:
+            tiers[1].append(product)
+        elif query_lower in p_name:
+            tiers[2].append(product)
+        elif query_lower in p_brand or query_lower in p_desc:
+            tiers[3].append(product)
+    return ProductAgent._unique(None, [p for tier in tiers for p in tier])
+
+
+def run(sizes, query_count):
+    rows = []
+    for size in sizes:
+        products = synthetic_products(size)
+
+        started = time.perf_counter()
+        snapshot = CatalogSnapshot(products)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        agent = ProductAgent(catalog=StaticCatalog(snapshot))
+        queries = sample_queries(products, query_count)
+
+        # Same results, same order
+        for q in queries:
+            assert agent.find_products(q) == legacy_find(products, q), q
+
+        legacy = summarize(time_calls(lambda q: legacy_find(products, q), queries))
+        indexed = summarize(time_calls(agent.find_products, queries))
+        rows.append((size, build_ms, legacy, indexed))
+
+    print(f"{'catalog':>8} {'index build':>12} {'legacy p50':>11} {'legacy p95':>11} "
+          f"{'index p50':>10} {'index p95':>10} {'speedup':>8}")
+    for size, build_ms, legacy, indexed in rows:
+        speedup = legacy["mean_ms"] / indexed["mean_ms"] if indexed["mean_ms"] else float("inf")
+        print(f"{size:>8} {build_ms:>10.1f}ms {legacy['p50_ms']:>9.3f}ms {legacy['p95_ms']:>9.3f}ms "
+              f"{indexed['p50_ms']:>8.3f}ms {indexed['p95_ms']:>8.3f}ms {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    run(args.sizes, args.queries)
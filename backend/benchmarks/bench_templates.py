@@ -0,0 +1,80 @@
+"""
+Template stage cost: a fresh Jinja Environment per render (the old FormattingAgent)
+vs the shared TemplateRegistry, plus first-render cost in a new process with and
+without the on-disk bytecode cache.
+
+    python -m benchmarks.bench_templates --renders 500 --items 40
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from jinja2 import Environment, FileSystemLoader
+
+from benchmarks.common import summarize, synthetic_products, time_calls
+from tools.template_registry import TEMPLATE_DIR, TemplateRegistry
+
+COLD_START = """
+import time
+from tools.template_registry import TemplateRegistry
+started = time.perf_counter()
+TemplateRegistry(cache_dir={cache_dir!r}).env.get_template("quotation_template.html")
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def sample_context(items):
+    products = synthetic_products(items)
+    rows = [{"sku": p["sku"], "name": p["name"], "quantity": 2, "unit_price": p["price"],
+             "line_total": p["price"] * 2, "base64_image": None, "description": p["short_description"]}
+            for p in products]
+    return {"invoice_no": "BENCH", "quote_id": "BENCH", "customer_name": "Bench Corp",
+            "date_today": "2026-01-01", "valid_until": "2026-02-01", "items": rows,
+            "subtotal": 1.0, "discount_rate": 0, "discount_amount": 0, "tax_rate": 0, "tax_amount": 0, "total": 1.0}
+
+
+def per_request_env(context):
+    env = Environment(loader=FileSystemLoader(os.path.join(os.getcwd(), TEMPLATE_DIR)))
+    return env.get_template("quotation_template.html").render(**context)
+
+
+def cold_start_ms(cache_dir, runs):
+    """First template load in a fresh interpreter (jinja2 import not counted)."""
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", COLD_START.format(cache_dir=cache_dir)],
+                             capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONPATH=os.getcwd()))
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return summarize(samples)
+
+
+def main(args):
+    context = sample_context(args.items)
+    registry = TemplateRegistry(cache_dir="")
+    registry.render(context)
+
+    rounds = range(args.renders)
+    fresh = summarize(time_calls(lambda _: per_request_env(context), rounds))
+    shared = summarize(time_calls(lambda _: registry.render(context), rounds))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        no_cache = cold_start_ms("", args.cold_runs)
+        cold_start_ms(cache_dir, 1)  # populate the bytecode cache
+        with_cache = cold_start_ms(cache_dir, args.cold_runs)
+
+    print(f"{args.renders} renders of a {args.items}-line quotation")
+    print(f"  Environment per request   p50 {fresh['p50_ms']:.3f}ms  p95 {fresh['p95_ms']:.3f}ms")
+    print(f"  shared registry           p50 {shared['p50_ms']:.3f}ms  p95 {shared['p95_ms']:.3f}ms")
+    print(f"  new process, first load   no bytecode cache {no_cache['p50_ms']:.1f}ms, "
+          f"bytecode cache {with_cache['p50_ms']:.1f}ms (p50 of {args.cold_runs})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renders", type=int, default=500)
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""
+Shared helpers for the benchmark scripts: synthetic catalogs, a static catalog
+stand-in and latency stats.
+Run benchmarks from the backend/ folder, e.g. `python -m benchmarks.bench_search`.
+"""
+import random
+import statistics
+import time
+
+BRANDS = ["UniFi", "ZKTeco", "MikroTik", "Hikvision", "Cisco", "Aruba", "TP-Link", "Dahua"]
+CATEGORIES = ["Network Gateway", "Switch", "Access Point", "Camera", "Interactive Display",
+              "Access Control", "Router", "Storage"]
+WORDS = ["enterprise", "poe", "gigabit", "outdoor", "managed", "smart", "wifi", "dome",
+         "bullet", "fingerprint", "terminal", "rackmount", "fiber", "uplink", "dual", "band",
+         "4k", "lite", "pro", "max", "mesh", "sfp", "cloud", "biometric", "layer3"]
+
+
+def synthetic_products(count, seed=42):
+    """Deterministic catalog of `count` products shaped like data/products.json."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        brand = rng.choice(BRANDS)
+        category = rng.choice(CATEGORIES)
+        words = rng.sample(WORDS, 4)
+        prefix = "".join(w[0] for w in words[:2]).upper()
+        sku = f"{brand[:2].upper()}-{prefix}{i:06d}-{rng.choice(['A', 'B', 'PRO', 'XL'])}"
+        products.append({
+            "sku": sku,
+            "name": f"{brand} {' '.join(w.title() for w in words[:3])} {category}",
+            "brand": brand,
+            "category": category,
+            "price": round(rng.uniform(20, 5000), 2),
+            "thumbnail": f"https://images.example.com/{sku}.png",
+            "description": " ".join(rng.choice(WORDS) for _ in range(60)),
+            "short_description": " ".join(rng.choice(WORDS) for _ in range(14)),
+            "use_case": " ".join(rng.choice(WORDS) for _ in range(20)),
+        })
+    return products
+
+
+class StaticCatalog:
+    """ProductCatalog stand-in serving one fixed snapshot (no file, no reloads)."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.products = snapshot.products
+        self.data_path = "<synthetic>"
+
+
+def sample_queries(products, count=200, seed=7):
+    """Mix of exact SKUs, SKU fragments, name words and misses."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        p = rng.choice(products)
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(p["sku"])
+        elif kind < 0.5:
+            queries.append(p["sku"][3:9])
+        elif kind < 0.8:
+            queries.append(rng.choice(p["name"].split()))
+        elif kind < 0.9:
+            queries.append(" ".join(p["short_description"].split()[2:4]))
+        else:
+            queries.append("zz-no-such-item")
+    return queries
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples_ms):
+    """p50/p95/p99/mean of a list of millisecond samples."""
+    return {
+        "count": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 4) if samples_ms else 0.0,
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p95_ms": round(percentile(samples_ms, 95), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+    }
+
+
+def time_calls(fn, args_list):
+    """Calls fn(arg) for every arg, returns per-call latency in ms."""
+    samples = []
+    for arg in args_list:
+        started = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
@@ -0,0 +1,75 @@
+"""
+Compares two benchmark suite result files (benchmarks/run_suite.py --out) and
+flags regressions beyond a threshold.
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# metric -> True when lower is better
+METRICS = {"p50_ms": True, "p95_ms": True, "p99_ms": True}
+RATE_SUFFIXES = ("_per_sec", "throughput_rps")
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base, new, threshold):
+    """Returns rows of (benchmark, metric, base, new, change %, verdict)."""
+    rows = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old_result, new_result = base["results"].get(name), new["results"].get(name)
+        if not old_result or not new_result or "skipped" in old_result or "skipped" in new_result:
+            rows.append((name, "-", None, None, None, "missing/skipped"))
+            continue
+        metrics = dict(METRICS)
+        metrics.update({k: False for k in old_result if k.endswith(RATE_SUFFIXES)})
+        for metric, lower_is_better in metrics.items():
+            old, current = old_result.get(metric), new_result.get(metric)
+            if old is None or current is None:
+                continue
+            change = (current - old) / old * 100 if old else 0.0
+            worse = change > threshold if lower_is_better else change < -threshold
+            better = change < -threshold if lower_is_better else change > threshold
+            rows.append((name, metric, old, current, change, "REGRESSION" if worse else "improved" if better else ""))
+        if new_result.get("errors", 0) > old_result.get("errors", 0):
+            rows.append((name, "errors", old_result.get("errors", 0), new_result["errors"], None, "REGRESSION"))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change treated as significant")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if anything regressed")
+    args = parser.parse_args(argv)
+
+    base, new = load(args.base), load(args.new)
+    for label, data in (("base", base), ("new", new)):
+        meta = data.get("meta", {})
+        print(f"{label:>4}: {meta.get('git') or '?'} {meta.get('label') or ''} ({meta.get('started_at', '?')}, "
+              f"{meta.get('platform', '?')})")
+    if base.get("meta", {}).get("args") != new.get("meta", {}).get("args"):
+        print("warning: the runs used different suite arguments")
+
+    rows = compare(base, new, args.threshold)
+    print(f"\n{'benchmark':<20} {'metric':<16} {'base':>12} {'new':>12} {'change':>8}")
+    for name, metric, old, current, change, verdict in rows:
+        if old is None:
+            print(f"{name:<20} {metric:<16} {'':>12} {'':>12} {'':>8}  {verdict}")
+            continue
+        change_txt = f"{change:+.1f}%" if change is not None else ""
+        print(f"{name:<20} {metric:<16} {old:>12,.3f} {current:>12,.3f} {change_txt:>8}  {verdict}")
+
+    regressions = sum(row[-1] == "REGRESSION" for row in rows)
+    print(f"\n{regressions} regression(s) beyond {args.threshold:g}%")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Gemini stand-ins for benchmarks and local runs without an API key. The backend
+only loads them when a harness names one of the factories below:
+
+    GEMINI_MODEL_FACTORY=benchmarks.fake_gemini:fake_model uvicorn main:app
+    GEMINI_MODEL_FACTORY=benchmarks.fake_gemini:stub_model GEMINI_STUB_URL=http://127.0.0.1:9100 uvicorn main:app
+"""
+import asyncio
+import json
+import os
+import re
+import time
+
+import httpx
+
+# Pretend-LLM latency so caching/coalescing effects are visible in benchmarks
+DEFAULT_LATENCY_MS = 300
+
+SEGMENT_SPLIT_RE = re.compile(r",|;|\n|\band\b|&", re.IGNORECASE)
+QTY_RE = re.compile(r"^\s*(\d+)\s*(?:x|pcs|units?|nos)?\s+(.+)$", re.IGNORECASE)
+CUSTOMER_RE = re.compile(r"\bfor\s+([A-Z][\w&.\- ]+?)\s*$")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Offline stand-in for genai.GenerativeModel (see fake_model): same
+    generate_content / generate_content_async surface, deterministic
+    "N x product" parsing and a fixed latency. Counts calls for benchmarks.
+    """
+
+    def __init__(self, model_name="fake-gemini", latency_ms=DEFAULT_LATENCY_MS):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _answer(self, full_prompt):
+        self.calls += 1
+        request = full_prompt.split("USER REQUEST:", 1)[-1].strip()
+
+        customer = None
+        match = CUSTOMER_RE.search(request)
+        if match:
+            customer = match.group(1).strip()
+            request = request[:match.start()]
+
+        items = []
+        for segment in SEGMENT_SPLIT_RE.split(request):
+            segment = segment.strip(" .")
+            if not segment:
+                continue
+            qty_match = QTY_RE.match(segment)
+            quantity, name = (int(qty_match.group(1)), qty_match.group(2)) if qty_match else (1, segment)
+            sku = name if re.fullmatch(r"[A-Z0-9][A-Z0-9\-/]+", name.strip()) else ""
+            items.append({"sku": sku, "name": name.strip(), "quantity": quantity})
+
+        # Wrapped in a markdown fence like the real model often does
+        return FakeResponse("```json\n" + json.dumps({"customer_name": customer, "items": items}) + "\n```")
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency_ms / 1000)
+        return self._answer(prompt)
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._answer(prompt)
+
+
+class StubServerModel:
+    """
+    GenerativeModel look-alike that talks to benchmarks/stub_gemini_server.py over
+    HTTP (see stub_model), so timeouts, 5xx and retries go through a real socket.
+    """
+
+    def __init__(self, base_url, model_name):
+        self.url = f"{base_url.rstrip('/')}/v1beta/models/{model_name}:generateContent"
+        self._client = None
+
+    @staticmethod
+    def _body(prompt):
+        return {"contents": [{"parts": [{"text": prompt}]}]}
+
+    @staticmethod
+    def _response(response):
+        response.raise_for_status()
+        return FakeResponse(response.json()["candidates"][0]["content"]["parts"][0]["text"])
+
+    def generate_content(self, prompt):
+        return self._response(httpx.post(self.url, json=self._body(prompt), timeout=None))
+
+    async def generate_content_async(self, prompt):
+        if self._client is None:
+            # No client-side timeout: deadlines belong to the resilience layer
+            self._client = httpx.AsyncClient(timeout=None)
+        return self._response(await self._client.post(self.url, json=self._body(prompt)))
+
+
+def fake_model(model_name):
+    """GEMINI_MODEL_FACTORY target: FakeGeminiModel with GEMINI_FAKE_LATENCY_MS latency."""
+    return FakeGeminiModel(model_name, int(os.getenv("GEMINI_FAKE_LATENCY_MS", str(DEFAULT_LATENCY_MS))))
+
+
+def stub_model(model_name):
+    """GEMINI_MODEL_FACTORY target: StubServerModel against GEMINI_STUB_URL."""
+    return StubServerModel(os.environ["GEMINI_STUB_URL"], model_name)
@@ -0,0 +1,99 @@
+"""
+Local thumbnail server for offline benchmarks: GET /img/<seed>.png returns a
+deterministic product-photo-like PNG (generated once per seed, then served from memory).
+
+    python -m benchmarks.image_server --port 9200
+"""
+import argparse
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+
+def synthetic_image(seed, size=600):
+    """A product-photo-like image: gradient background, shapes, sensor noise, some alpha."""
+    rng = random.Random(seed)
+    img = Image.new("RGBA", (size, size), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+    for y in range(size):
+        shade = int(200 + 55 * y / size)
+        draw.line([(0, y), (size, y)], fill=(shade, shade, 255 - shade // 3, 255))
+    for _ in range(12):
+        x0, y0 = rng.randrange(size), rng.randrange(size)
+        x1, y1 = x0 + rng.randrange(40, 250), y0 + rng.randrange(40, 250)
+        colour = tuple(rng.randrange(256) for _ in range(3)) + (rng.randrange(120, 256),)
+        draw.rectangle([x0, y0, x1, y1], fill=colour)
+    noise = Image.effect_noise((size, size), 24).convert("RGBA")
+    img = Image.blend(img, noise, 0.15)
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+class ImageServer:
+    """Threaded HTTP server on 127.0.0.1, run in a background thread."""
+
+    def __init__(self, port=0, size=600):
+        images = self._images = {}
+        lock = threading.Lock()
+        self.size = size
+        self.requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                name = self.path.rsplit("/", 1)[-1]
+                if not (self.path.startswith("/img/") and name.endswith(".png") and name[:-4].isdigit()):
+                    self.send_error(404)
+                    return
+                seed = int(name[:-4])
+                with lock:
+                    body = images.get(seed)
+                    if body is None:
+                        body = images[seed] = synthetic_image(seed, size)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "max-age=86400")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def preload(self, seeds):
+        """Generates images up front so the first requests don't time PIL work."""
+        for seed in seeds:
+            self._images.setdefault(seed, synthetic_image(seed, self.size))
+        return self
+
+    def image_url(self, seed):
+        return f"{self.url}/img/{seed}.png"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9200)
+    args = parser.parse_args()
+    server = ImageServer(args.port)
+    print(f"Serving synthetic thumbnails on {server.url}/img/<seed>.png")
+    server._httpd.serve_forever()
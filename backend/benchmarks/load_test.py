@@ -0,0 +1,108 @@
+"""
+Concurrent HTTP load against a running backend, to check that throughput scales
+with concurrency instead of serialising on the event loop.
+
+    uvicorn main:app --port 8000 &
+    python -m benchmarks.load_test --endpoint finalize --concurrency 1 4 16 --requests 64
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.common import summarize
+from tools.catalog import get_catalog
+
+
+def analyze_payload(i):
+    return {"prompt": f"{1 + i % 5}x UXG-Enterprise, 2 ZK-IWB65/75/86BM for Load Test {i}"}
+
+
+def finalize_payload(i, lines=5):
+    products = []
+    for p in get_catalog().products[:lines]:
+        price = float(p.get("price", 0) or 0)
+        products.append({
+            "sku": p["sku"],
+            "name": p["name"],
+            "thumbnail": p.get("thumbnail"),
+            "quantity": 1 + i % 3,
+            "unit_price": price,
+            "line_total": price * (1 + i % 3),
+        })
+    return {
+        "customer_name": f"Load Test {i}",
+        "invoice_date": "2025-01-01",
+        "valid_until": "2025-01-31",
+        "tax_rate": 5,
+        "discount_rate": 0,
+        "products": products,
+    }
+
+
+ENDPOINTS = {
+    "analyze": ("/analyze-request", analyze_payload),
+    "finalize": ("/finalize-quotation", finalize_payload),
+}
+
+
+async def run_level(client, path, make_payload, concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=make_payload(i))
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies)
+    result.update({
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+    })
+    return result
+
+
+async def main(args):
+    path, make_payload = ENDPOINTS[args.endpoint]
+    results = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        for concurrency in args.concurrency:
+            results.append(await run_level(client, path, make_payload, concurrency, args.requests))
+
+    print(f"{args.endpoint} @ {args.url}{path}")
+    print(f"{'conc':>5} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['throughput_rps']:>8.2f} {r['p50_ms']:>7.1f}ms "
+              f"{r['p95_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms {r['errors']:>7}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"endpoint": args.endpoint, "url": args.url, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="finalize")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", help="write results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,321 @@
+"""
+Offline end-to-end benchmark suite: microbenchmarks (search, pricing, template,
+PDF, image encoding) and concurrent HTTP load on /analyze-request and
+/finalize-quotation, against a synthetic catalog, a stubbed Gemini and a local
+image server. Results go to a JSON file for benchmarks/compare.py.
+
+    python -m benchmarks.run_suite --catalog-size 5000 --out benchmarks/results/base.json
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.common import StaticCatalog, sample_queries, summarize, synthetic_products, time_calls
+from benchmarks.image_server import ImageServer, synthetic_image
+from benchmarks.load_test import run_level
+
+SUITE_VERSION = 1
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Distinct thumbnails served by the image server (products share them round-robin)
+THUMBNAIL_VARIANTS = 64
+
+
+def with_rate(samples_ms, unit="ops"):
+    """summarize() plus throughput of a sequential run."""
+    result = summarize(samples_ms)
+    total_s = sum(samples_ms) / 1000
+    result[f"{unit}_per_sec"] = round(len(samples_ms) / total_s, 2) if total_s else 0.0
+    return result
+
+
+def quote_lines(products, lines, seed):
+    rng = random.Random(seed)
+    return [dict(p, quantity=rng.choice([1, 2, 3, 5, 10])) for p in rng.sample(products, lines)]
+
+
+# --------------------------------------------------
+# Microbenchmarks (in process)
+# --------------------------------------------------
+def micro_search(products, args):
+    from agents.product_agent import ProductAgent
+    from tools.catalog import CatalogSnapshot
+
+    started = time.perf_counter()
+    agent = ProductAgent(catalog=StaticCatalog(CatalogSnapshot(products)))
+    build_ms = (time.perf_counter() - started) * 1000
+    queries = sample_queries(products, args.queries)
+    result = with_rate(time_calls(agent.find_products, queries))
+    result["index_build_ms"] = round(build_ms, 2)
+    return result
+
+
+def micro_pricing(products, args):
+    from tools.pricing_engine import PricingEngine, PricingRules
+
+    engine = PricingEngine(rules=PricingRules(
+        default_margin="0.10", quantity_tiers=[{"min_qty": 5, "discount": "0.03"}, {"min_qty": 10, "discount": "0.05"}],
+    ))
+    quotes = [quote_lines(products, args.quote_lines, seed) for seed in range(args.iterations)]
+    return with_rate(time_calls(engine.price_lines, quotes), unit="quotes")
+
+
+def sample_context(products, lines, images=None):
+    items = []
+    for i, p in enumerate(quote_lines(products, lines, seed=1)):
+        items.append({"sku": p["sku"], "name": p["name"], "quantity": p["quantity"], "unit_price": p["price"],
+                      "line_total": p["price"] * p["quantity"], "description": p["short_description"],
+                      "base64_image": images[i % len(images)] if images else None})
+    return {"invoice_no": "BENCH", "quote_id": "BENCH", "customer_name": "Bench Corp", "date_today": "2026-01-01",
+            "valid_until": "2026-02-01", "items": items, "subtotal": 1.0, "discount_rate": 0,
+            "discount_amount": 0, "tax_rate": 0, "tax_amount": 0, "total": 1.0}
+
+
+def micro_template(products, args):
+    from tools.template_registry import TemplateRegistry
+
+    registry = TemplateRegistry(cache_dir="")
+    context = sample_context(products, args.quote_lines)
+    registry.render(context)
+    return with_rate(time_calls(lambda _: registry.render(context), range(args.iterations)), unit="renders")
+
+
+def micro_images(products, args):
+    from tools.pdf_generator import encode_image
+
+    raw = [synthetic_image(seed) for seed in range(8)]
+    return with_rate(time_calls(encode_image, [raw[i % len(raw)] for i in range(args.iterations)]), unit="images")
+
+
+def micro_pdf(products, args):
+    from tools.pdf_generator import encode_image, generate_pdf_from_html
+    from tools.template_registry import TemplateRegistry
+
+    images = [encode_image(synthetic_image(seed)) for seed in range(4)]
+    html = TemplateRegistry(cache_dir="").render(sample_context(products, args.quote_lines, images))
+    generate_pdf_from_html(html)
+    runs = max(3, args.iterations // 20)
+    return with_rate(time_calls(lambda _: generate_pdf_from_html(html), range(runs)), unit="pdfs")
+
+
+MICRO = [("search", micro_search), ("pricing", micro_pricing), ("template", micro_template),
+         ("images", micro_images), ("pdf", micro_pdf)]
+
+
+def run_micro(products, args):
+    results = {}
+    for name, bench in MICRO:
+        if args.only and name not in args.only:
+            continue
+        try:
+            results[f"micro.{name}"] = bench(products, args)
+        except (ImportError, OSError) as e:
+            # e.g. WeasyPrint without its native libraries: keep the rest of the suite
+            results[f"micro.{name}"] = {"skipped": f"{type(e).__name__}: {e}"}
+        print(f"  micro.{name}: {_brief(results[f'micro.{name}'])}")
+    return results
+
+
+# --------------------------------------------------
+# HTTP load (backend in a subprocess, isolated working directory)
+# --------------------------------------------------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_workdir(products, image_server):
+    """A throwaway backend/ layout: synthetic catalog, real templates, empty storage."""
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.makedirs(os.path.join(workdir, "storage", "pdfs"))
+    catalog = [dict(p, thumbnail=image_server.image_url(i % THUMBNAIL_VARIANTS)) for i, p in enumerate(products)]
+    with open(os.path.join(workdir, "data", "products.json"), "w", encoding="utf-8") as f:
+        json.dump({"products": catalog}, f)
+    shutil.copy(os.path.join(BACKEND_DIR, "data", "pricing_rules.json"), os.path.join(workdir, "data"))
+    shutil.copytree(os.path.join(BACKEND_DIR, "templates"), os.path.join(workdir, "templates"))
+    return workdir, catalog
+
+
+async def wait_until_up(url, process, path, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"process exited with code {process.returncode}")
+            try:
+                if (await client.get(path)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def analyze_payload_factory(catalog):
+    def make(i):
+        rng = random.Random(i)
+        picks = rng.sample(catalog, 3)
+        if i % 2 == 0:
+            # Plain SKU list: served by the local fast path
+            return {"prompt": ", ".join(f"{rng.randint(1, 5)} x {p['sku']}" for p in picks)}
+        # Free text: goes to the (stubbed) Gemini call
+        return {"prompt": f"Customer {i} needs " + " and ".join(f"{rng.randint(1, 5)} {p['name']}" for p in picks)}
+    return make
+
+
+def finalize_payload_factory(catalog, lines):
+    def make(i):
+        return {
+            "customer_name": f"Bench Customer {i}",
+            "invoice_date": "2026-01-01",
+            "valid_until": "2026-01-31",
+            "tax_rate": 5,
+            "discount_rate": 2,
+            "products": [{"sku": p["sku"], "name": p["name"], "thumbnail": p["thumbnail"], "quantity": p["quantity"],
+                          "unit_price": p["price"], "line_total": p["price"] * p["quantity"]}
+                         for p in quote_lines(catalog, lines, seed=i)],
+        }
+    return make
+
+
+async def run_http(products, args):
+    results = {}
+    image_server = ImageServer().preload(range(THUMBNAIL_VARIANTS)).start()
+    workdir, catalog = prepare_workdir(products, image_server)
+    gemini_port = args.gemini_port or free_port()
+    backend_port = args.backend_port or free_port()
+    gemini_url = f"http://127.0.0.1:{gemini_port}"
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])),
+        GEMINI_MODEL_FACTORY="benchmarks.fake_gemini:stub_model",
+        GEMINI_STUB_URL=gemini_url,
+        EXTRACTION_CACHE_FILE="",
+        RENDER_CACHE_TTL="0",  # every finalize renders: measure the pipeline, not the cache
+        PREWARM_THUMBNAILS="0",
+    )
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_gemini_server", "--port", str(gemini_port),
+                             "--latency", str(args.gemini_latency), "--jitter", str(args.gemini_jitter)],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    log = open(os.path.join(workdir, "backend.log"), "wb")
+    backend = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port),
+                                "--log-level", "warning"], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        await wait_until_up(gemini_url, stub, "/control")
+        await wait_until_up(backend_url, backend, "/templates")
+        endpoints = [
+            ("analyze", "/analyze-request", analyze_payload_factory(catalog)),
+            ("finalize", "/finalize-quotation", finalize_payload_factory(catalog, args.quote_lines)),
+        ]
+        async with httpx.AsyncClient(base_url=backend_url, timeout=args.timeout) as client:
+            # Warm-up: render workers, every distinct thumbnail, first Gemini connection
+            await client.post("/analyze-request", json=endpoints[0][2](10**6 + 1))
+            warm_quote = finalize_payload_factory(catalog[:THUMBNAIL_VARIANTS], THUMBNAIL_VARIANTS)(10**6)
+            await client.post("/finalize-quotation", json=warm_quote)
+            for name, path, make in endpoints:
+                if args.only and name not in args.only:
+                    continue
+                for concurrency in args.concurrency:
+                    key = f"http.{name}@{concurrency}"
+                    results[key] = await run_level(client, path, make, concurrency, args.requests)
+                    print(f"  {key}: {_brief(results[key])}")
+    except RuntimeError as e:
+        log.flush()
+        with open(log.name, "rb") as f:
+            tail = f.read()[-2000:].decode("utf-8", "replace")
+        print(f"  http: backend unavailable ({e})\n{tail}")
+        results["http"] = {"skipped": str(e)}
+    finally:
+        for process in (backend, stub):
+            process.kill()
+            process.wait()
+        log.close()
+        image_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# --------------------------------------------------
+# Reporting
+# --------------------------------------------------
+def _brief(result):
+    if "skipped" in result:
+        return f"skipped ({result['skipped']})"
+    rate = next((f"{v:,.1f} {k.replace('_per_sec', '')}/s" for k, v in result.items() if k.endswith("_per_sec")),
+                f"{result.get('throughput_rps', 0):,.1f} req/s")
+    return (f"p50 {result['p50_ms']:.2f}ms p95 {result['p95_ms']:.2f}ms p99 {result['p99_ms']:.2f}ms, {rate}"
+            + (f", {result['errors']} errors" if result.get("errors") else ""))
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BACKEND_DIR)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=BACKEND_DIR).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "") if out.returncode == 0 else None
+    except OSError:
+        return None
+
+
+async def main(args):
+    products = synthetic_products(args.catalog_size, seed=args.seed)
+    meta = {
+        "suite_version": SUITE_VERSION,
+        "label": args.label,
+        "git": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k != "out"},
+    }
+    print(f"Benchmark suite: {args.catalog_size} products, {args.quote_lines}-line quotes")
+    results = {}
+    if not args.skip_micro:
+        results.update(run_micro(products, args))
+    if not args.skip_http:
+        results.update(await run_http(products, args))
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "latest.json"))
+    parser.add_argument("--label", default="", help="free-form tag stored in the results (e.g. branch name)")
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--quote-lines", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500, help="search queries (micro.search)")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per microbenchmark")
+    parser.add_argument("--requests", type=int, default=64, help="HTTP requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks (search, pricing, template, "
+                                                  "images, pdf, analyze, finalize)")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--gemini-latency", type=int, default=300, help="stub Gemini latency (ms)")
+    parser.add_argument("--gemini-jitter", type=int, default=100)
+    parser.add_argument("--gemini-port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--backend-port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--timeout", type=float, default=120)
+    asyncio.run(main(parser.parse_args()))
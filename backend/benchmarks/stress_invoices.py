@@ -0,0 +1,88 @@
+"""
+Multi-process stress test for the invoice allocator: every worker hammers
+reserve_invoice_numbers against one shared-state counter, then all handed-out
+numbers are checked for duplicates and gaps.
+
+    python -m benchmarks.stress_invoices --processes 8 --allocations 500 --block 1
+    python -m benchmarks.stress_invoices --state redis      # against benchmarks.stub_redis_server
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.stub_redis_server import RedisStubServer
+from tools import invoice_manager
+from tools.shared_state import RedisSharedState, SqliteSharedState
+
+
+def open_state(target):
+    return RedisSharedState(target) if target.startswith("redis://") else SqliteSharedState(target)
+
+
+def worker(target, allocations, block, barrier, results):
+    invoice_manager.COUNTER_FILE = os.devnull  # no legacy counter to carry over
+    state = open_state(target)
+    barrier.wait()
+    numbers = []
+    for _ in range(allocations):
+        numbers.extend(invoice_manager.reserve_invoice_numbers(block, state=state))
+    results.put(numbers)
+
+
+def run(processes, allocations, block, state_kind="sqlite"):
+    with tempfile.TemporaryDirectory() as tmp:
+        redis_server = RedisStubServer().start() if state_kind == "redis" else None
+        target = redis_server.url if redis_server else os.path.join(tmp, "shared_state.db")
+        ctx = multiprocessing.get_context("spawn")
+        barrier = ctx.Barrier(processes + 1)
+        results = ctx.Queue()
+        workers = [ctx.Process(target=worker, args=(target, allocations, block, barrier, results))
+                   for _ in range(processes)]
+        for p in workers:
+            p.start()
+
+        barrier.wait()
+        started = time.perf_counter()
+        numbers = []
+        for _ in workers:
+            numbers.extend(results.get())
+        elapsed = time.perf_counter() - started
+        for p in workers:
+            p.join()
+        if redis_server is not None:
+            redis_server.stop()
+
+    sequences = sorted(int(n.rsplit("-", 1)[1]) for n in numbers)
+    expected = processes * allocations * block
+    assert len(numbers) == expected, f"expected {expected} numbers, got {len(numbers)}"
+    assert len(set(numbers)) == expected, f"{expected - len(set(numbers))} duplicate invoice numbers"
+    assert sequences == list(range(1, expected + 1)), "sequence has gaps"
+
+    calls = processes * allocations
+    return {
+        "processes": processes,
+        "block": block,
+        "numbers": expected,
+        "elapsed_s": round(elapsed, 3),
+        "calls_per_s": round(calls / elapsed, 1),
+        "numbers_per_s": round(expected / elapsed, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--allocations", type=int, default=500, help="reserve calls per process")
+    parser.add_argument("--block", type=int, nargs="+", default=[1, 50], help="numbers per reserve call")
+    parser.add_argument("--state", choices=["sqlite", "redis"], default="sqlite")
+    args = parser.parse_args()
+
+    print(f"{'procs':>6} {'block':>6} {'numbers':>8} {'calls/s':>9} {'numbers/s':>10}")
+    for block in args.block:
+        for processes in args.processes:
+            r = run(processes, args.allocations, block, args.state)
+            print(f"{r['processes']:>6} {r['block']:>6} {r['numbers']:>8} "
+                  f"{r['calls_per_s']:>9.1f} {r['numbers_per_s']:>10.1f}")
+    print("OK: no duplicates, no gaps")
@@ -0,0 +1,69 @@
+"""
+Local stand-in for the Gemini REST endpoint with latency and fault injection,
+for exercising the resilient call layer (tools/resilience.py) end to end.
+
+    python -m benchmarks.stub_gemini_server --port 9100 --latency 300 --jitter 200 --error-rate 0.2 --hang-rate 0.05
+    GEMINI_MODEL_FACTORY=benchmarks.fake_gemini:stub_model GEMINI_STUB_URL=http://127.0.0.1:9100 uvicorn main:app
+
+Fault settings can be changed at runtime: POST /control {"error_rate": 1.0}.
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.fake_gemini import FakeGeminiModel
+
+app = FastAPI(title="Stub Gemini")
+settings = {"latency_ms": 300, "jitter_ms": 0, "error_rate": 0.0, "error_status": 503, "hang_rate": 0.0}
+counters = {"requests": 0, "errors": 0, "hangs": 0}
+_model = FakeGeminiModel(latency_ms=0)
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def generate_content(model: str, request: Request):
+    counters["requests"] += 1
+    body = await request.json()
+    prompt = body["contents"][0]["parts"][0]["text"]
+
+    if random.random() < settings["hang_rate"]:
+        counters["hangs"] += 1
+        await asyncio.sleep(3600)  # never answers in practice: client deadlines must kick in
+
+    await asyncio.sleep((settings["latency_ms"] + random.uniform(0, settings["jitter_ms"])) / 1000)
+
+    if random.random() < settings["error_rate"]:
+        counters["errors"] += 1
+        return JSONResponse({"error": {"code": settings["error_status"], "message": "injected failure"}},
+                            status_code=settings["error_status"])
+
+    text = _model._answer(prompt).text
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+@app.post("/control")
+async def control(changes: dict):
+    settings.update({k: v for k, v in changes.items() if k in settings})
+    return settings
+
+
+@app.get("/control")
+async def status():
+    return {"settings": settings, "counters": counters}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=int, default=300, help="base latency (ms)")
+    parser.add_argument("--jitter", type=int, default=0, help="extra random latency (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    settings.update(latency_ms=args.latency, jitter_ms=args.jitter, error_rate=args.error_rate,
+                    error_status=args.error_status, hang_rate=args.hang_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,156 @@
+"""
+Local in-memory stand-in for a Redis server (RESP2/3; the handful of commands
+tools/shared_state.py uses), for testing SHARED_STATE=redis without installing Redis.
+
+    python -m benchmarks.stub_redis_server --port 6390
+    SHARED_STATE=redis SHARED_STATE_URL=redis://127.0.0.1:6390/0 uvicorn main:app --workers 4
+
+Commands: PING, GET, SET [EX|PX] [NX|XX], INCR, INCRBY, DEL, EXISTS, DBSIZE,
+SCAN [MATCH] [COUNT] (one pass, cursor always 0), FLUSHDB; HELLO (RESP2 or 3 handshake), SELECT and CLIENT are acknowledged.
+"""
+import argparse
+import fnmatch
+import re
+import socketserver
+import threading
+import time
+
+
+class _Store:
+    def __init__(self):
+        self.data = {}  # key -> (value bytes, expires_at monotonic or None)
+        self.lock = threading.Lock()
+
+    def live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+
+def _encode(value, proto=2):
+    if value is None or value is False:
+        return b"_\r\n" if proto == 3 else b"$-1\r\n"
+    if value is True:
+        return b"+OK\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, Exception):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(item, proto) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _hello(proto):
+    """Server info: a map under RESP3, a flat array under RESP2."""
+    fields = [(b"server", b"redis"), (b"version", b"7.0.0"), (b"proto", proto), (b"mode", b"standalone")]
+    out = [b"%%%d\r\n" % len(fields) if proto == 3 else b"*%d\r\n" % (2 * len(fields))]
+    for key, value in fields:
+        out += [_encode(key), _encode(value)]
+    return b"".join(out)
+
+
+def execute(store, args):
+    command = args[0].upper().decode()
+    with store.lock:
+        if command == "PING":
+            return "PONG"
+        if command in ("SELECT", "CLIENT"):
+            return "OK"
+        if command == "GET":
+            entry = store.live(args[1])
+            return entry[0] if entry else None
+        if command == "SET":
+            key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+            expires = None
+            for unit, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+                if unit in options:
+                    expires = time.monotonic() + float(options[options.index(unit) + 1]) * scale
+            exists = store.live(key) is not None
+            if (b"NX" in options and exists) or (b"XX" in options and not exists):
+                return None
+            store.data[key] = (value, expires)
+            return True
+        if command in ("INCR", "INCRBY"):
+            amount = int(args[2]) if command == "INCRBY" else 1
+            entry = store.live(args[1])
+            try:
+                value = int(entry[0]) + amount if entry else amount
+            except ValueError:
+                return ValueError("value is not an integer or out of range")
+            store.data[args[1]] = (str(value).encode(), entry[1] if entry else None)
+            return value
+        if command == "DEL":
+            return sum(1 for key in args[1:] if store.live(key) is not None and store.data.pop(key))
+        if command == "EXISTS":
+            return sum(1 for key in args[1:] if store.live(key) is not None)
+        if command == "DBSIZE":
+            return sum(1 for key in list(store.data) if store.live(key) is not None)
+        if command == "SCAN":
+            options = [a.upper() for a in args[2:]]
+            pattern = args[2 + options.index(b"MATCH") + 1] if b"MATCH" in options else b"*"
+            pattern = re.sub(rb"\\(.)", rb"[\1]", pattern)  # Redis escapes "\*"; fnmatch wants "[*]"
+            keys = [key for key in list(store.data) if store.live(key) is not None and fnmatch.fnmatchcase(key, pattern)]
+            return [b"0", keys]
+        if command == "FLUSHDB":
+            store.data.clear()
+            return "OK"
+    return ValueError(f"unknown command '{command}'")
+
+
+class RedisStubServer:
+    """Threaded TCP server on 127.0.0.1, run in a background thread."""
+
+    def __init__(self, port=0):
+        store = self.store = _Store()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                proto = 2
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    if not line.startswith(b"*"):  # inline command (redis-cli / telnet)
+                        args = line.split()
+                    else:
+                        args = []
+                        for _ in range(int(line[1:])):
+                            size = int(self.rfile.readline()[1:])
+                            args.append(self.rfile.read(size + 2)[:-2])
+                    if args and args[0].upper() == b"HELLO":
+                        proto = int(args[1]) if len(args) > 1 else 2
+                        self.wfile.write(_hello(proto))
+                    elif args:
+                        self.wfile.write(_encode(execute(store, args), proto))
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", port), Handler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self.port = self._server.server_address[1]
+        self.url = f"redis://127.0.0.1:{self.port}/0"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    server = RedisStubServer(args.port)
+    print(f"Serving an in-memory Redis stand-in on {server.url}")
+    server._server.serve_forever()
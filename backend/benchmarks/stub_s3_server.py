@@ -0,0 +1,165 @@
+"""
+Local in-memory stand-in for an S3 bucket (path-style PUT / GET / HEAD / DELETE
+object and ListObjectsV2), enough for PDF_STORAGE=s3 without AWS credentials.
+
+    python -m benchmarks.stub_s3_server --port 9300
+    PDF_STORAGE=s3 PDF_S3_BUCKET=quotes PDF_S3_ENDPOINT=http://127.0.0.1:9300 \\
+        AWS_ACCESS_KEY_ID=x AWS_SECRET_ACCESS_KEY=x AWS_DEFAULT_REGION=us-east-1 uvicorn main:app
+
+Signatures are not checked and buckets are created on first write.
+"""
+import argparse
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+LIST_PAGE_SIZE = 1000
+
+
+class S3StubServer:
+    """Threaded HTTP server on 127.0.0.1, run in a background thread."""
+
+    def __init__(self, port=0):
+        buckets = self.buckets = {}  # bucket -> {key: (body, headers, mtime)}
+        lock = threading.Lock()
+        self.requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _target(self):
+                parts = urlsplit(self.path)
+                bucket, _, key = parts.path.lstrip("/").partition("/")
+                return unquote(bucket), unquote(key), parse_qs(parts.query)
+
+            def _reply(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _not_found(self, key):
+                body = (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>NoSuchKey</Code>"
+                        f"<Message>The specified key does not exist.</Message><Key>{escape(key)}</Key></Error>")
+                self._reply(404, body.encode(), {"Content-Type": "application/xml"})
+
+            def do_PUT(self):
+                server.requests += 1
+                bucket, key, _ = self._target()
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding", "").startswith("aws-chunked") or \
+                        self.headers.get("x-amz-content-sha256", "").startswith("STREAMING-"):
+                    body = _decode_aws_chunked(body)
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                headers = {"Content-Type": self.headers.get("Content-Type", "application/octet-stream"),
+                           "ETag": etag}
+                headers.update({k: v for k, v in self.headers.items() if k.lower().startswith("x-amz-meta-")})
+                with lock:
+                    objects = buckets.setdefault(bucket, {})
+                    if key:
+                        objects[key] = (body, headers, time.time())
+                self._reply(200, headers={"ETag": etag})
+
+            def do_GET(self):
+                server.requests += 1
+                bucket, key, query = self._target()
+                if not key:
+                    self._list(bucket, query)
+                    return
+                with lock:
+                    obj = buckets.get(bucket, {}).get(key)
+                if obj is None:
+                    self._not_found(key)
+                    return
+                body, headers, mtime = obj
+                self._reply(200, body, dict(headers, **{"Last-Modified": formatdate(mtime, usegmt=True)}))
+
+            do_HEAD = do_GET
+
+            def do_DELETE(self):
+                server.requests += 1
+                bucket, key, _ = self._target()
+                with lock:
+                    buckets.get(bucket, {}).pop(key, None)
+                self._reply(204)
+
+            def _list(self, bucket, query):
+                prefix = query.get("prefix", [""])[0]
+                start = query.get("continuation-token", query.get("start-after", [""]))[0]
+                limit = min(int(query.get("max-keys", [LIST_PAGE_SIZE])[0]), LIST_PAGE_SIZE)
+                with lock:
+                    keys = sorted(k for k in buckets.get(bucket, {}) if k.startswith(prefix) and k > start)
+                    page = [(k, buckets[bucket][k]) for k in keys[:limit]]
+                truncated = len(keys) > limit
+                items = "".join(
+                    f"<Contents><Key>{escape(k)}</Key><LastModified>{_iso(mtime)}</LastModified>"
+                    f"<ETag>{escape(headers['ETag'])}</ETag><Size>{len(body)}</Size>"
+                    f"<StorageClass>STANDARD</StorageClass></Contents>"
+                    for k, (body, headers, mtime) in page
+                )
+                token = f"<NextContinuationToken>{escape(page[-1][0])}</NextContinuationToken>" if truncated else ""
+                xml = (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+                       f"<ListBucketResult xmlns=\"http://s3.amazonaws.com/doc/2006-03-01/\">"
+                       f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+                       f"<MaxKeys>{limit}</MaxKeys><IsTruncated>{str(truncated).lower()}</IsTruncated>"
+                       f"{token}{items}</ListBucketResult>")
+                self._reply(200, xml.encode(), {"Content-Type": "application/xml"})
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def age(self, bucket, days):
+        """Backdates every object in `bucket` (for exercising the lifecycle job)."""
+        objects = self.buckets.get(bucket, {})
+        for key, (body, headers, mtime) in list(objects.items()):
+            objects[key] = (body, headers, mtime - days * 86400)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def _iso(mtime):
+    return datetime.fromtimestamp(mtime, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _decode_aws_chunked(body):
+    """Strips aws-chunked framing (`<hex size>;chunk-signature=...\\r\\n<data>\\r\\n`)."""
+    out, pos = bytearray(), 0
+    while pos < len(body):
+        line_end = body.index(b"\r\n", pos)
+        size = int(body[pos:line_end].split(b";")[0], 16)
+        if size == 0:
+            break
+        out += body[line_end + 2:line_end + 2 + size]
+        pos = line_end + 2 + size + 2
+    return bytes(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9300)
+    args = parser.parse_args()
+    server = S3StubServer(args.port)
+    print(f"Serving an in-memory S3 stand-in on {server.url}")
+    server._httpd.serve_forever()
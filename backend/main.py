@@ -1,35 +1,157 @@
-from fastapi import FastAPI, HTTPException
+import time
+IMPORT_STARTED = time.perf_counter()  # cold start: module import time is reported on /ready and /stats
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List, Optional
-import glob
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import base64
-from datetime import datetime
+import json
+import tempfile
+import zipfile
+from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
 
 #AGENTS
 from agents.product_agent import ProductAgent
 from agents.pricing_agent import PricingAgent
-from agents.formatting_agent import FormattingAgent
 from agents.review_agent import ReviewAgent
-from agents.gemini_extraction_agent import GeminiExtractionAgent
+from agents.gemini_extraction_agent import GeminiExtractionAgent, gemini_caller, get_model
+from agents.local_extraction_agent import LocalExtractionAgent, fast_path_stats
 
-from tools.pdf_generator import generate_pdf_from_html, image_to_base64
-from tools.invoice_manager import get_next_invoice_number
+from tools.pdf_generator import images_to_base64_async, close_async_client, thumbnail_cache
+from tools.thumbnail_cache import PREWARM_THUMBNAILS
+from tools.render_service import render_service, RENDER_PREWARM
+from tools.invoice_manager import get_next_invoice_number, reserve_invoice_numbers
+from tools.catalog import get_catalog
+from tools.pricing_engine import get_pricing_engine, InvalidAmount, InvalidQuantity, parse_quantity, to_decimal
+from tools.template_registry import get_template_registry, TemplateError, UnknownTemplate
+from tools.product_search import search_products
+from tools.extraction_cache import extraction_cache
+from tools.history_store import get_history_store, HISTORY_PAGE_SIZE
+from tools.quotation_cache import QuotationCache, IdempotencyConflict, PdfUnavailable, fingerprint
+from tools.pdf_storage import get_pdf_storage, compact, PDF_COMPACTION_INTERVAL
+from tools.shared_state import SHARED_STATE, get_shared_state
+from tools import executors
+from tools import metrics
+from tools.executors import run_io
+from tools.metrics import ServerTimingMiddleware, stage, record_stage
+from tools.warmup import Warmup
 
 from dotenv import load_dotenv
 load_dotenv()
 
 # --- CONFIGURATION ---
-STORAGE_DIR = "storage"
-PDF_DIR = os.path.join(STORAGE_DIR, "pdfs")
-os.makedirs(PDF_DIR, exist_ok=True)
+# Generated PDFs: day-sharded local disk (default) or an S3 bucket, see tools/pdf_storage.py
+pdf_storage = get_pdf_storage()
+
+# Shared extraction agent: one model client + prompt cache for every request.
+# When Gemini is down (circuit open / deadline) prompts degrade to local catalog matching.
+def _local_fallback(prompt: str):
+    return LocalExtractionAgent().extract_best_effort(prompt)
+
+gemini_agent = GeminiExtractionAgent(fallback=_local_fallback)
+
+# Finalized quotations by content hash / Idempotency-Key
+quotation_cache = QuotationCache(pdf_storage)
+
+# Existing stats() counters, exposed as gauges on /metrics at scrape time
+metrics.register_collector("extraction_cache", extraction_cache.stats)
+metrics.register_collector("gemini", lambda: dict(gemini_caller.stats(), circuit_open=gemini_caller.breaker.state != "closed"))
+metrics.register_collector("fast_path", fast_path_stats.snapshot)
+metrics.register_collector("thumbnail_cache", thumbnail_cache.stats)
+metrics.register_collector("render_cache", quotation_cache.stats)
+metrics.register_collector("catalog", lambda: get_catalog().stats())
+metrics.register_collector("pdf_compaction", lambda: app.state.compaction)
+
+# Batch quotation runs
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(executors.RENDER_POOL_SIZE * 2)))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+# ====================================================
+# STARTUP WARM-UP
+# ====================================================
+def _warm_index():
+    # A store-backed catalog builds its search index lazily; build it before the first search
+    snapshot = get_catalog().snapshot
+    snapshot.index
+    snapshot.matcher
+
+async def _warm_thumbnails():
+    await thumbnail_cache.prewarm(p.get("thumbnail") for p in get_catalog().products)
+
+def _warm_gemini():
+    # Imports + configures google.generativeai (~1s) and creates the shared model client
+    get_model(gemini_agent.model_name)
+
+def _build_warmup():
+    warmup = Warmup()
+    # Invoice counters and the shared cache tiers (opens the SQLite file / Redis connection)
+    warmup.add("shared_state", lambda: get_shared_state().stats(), core=True)
+    # Load the product catalog once at startup (hot-reloaded on file change afterwards)
+    warmup.add("catalog", get_catalog, core=True)
+    warmup.add("index", _warm_index, core=True)
+    # Open the history index (the first run backfills it from existing PDFs)
+    warmup.add("history", get_history_store().stats, core=True)
+    # Replay the persisted extraction cache off the event loop
+    warmup.add("extraction_cache", extraction_cache.load, core=True)
+    warmup.add("templates", get_template_registry().compile_all, core=True)
+    # Start the render workers now (fonts, stylesheet, a dummy PDF) instead of on the first quote
+    warmup.add("render", render_service.warm_up, enabled=RENDER_PREWARM)
+    warmup.add("gemini", _warm_gemini)
+    # Fill the thumbnail cache so first quotes skip the downloads (never holds up readiness)
+    warmup.add("thumbnails", _warm_thumbnails, gating=False, enabled=PREWARM_THUMBNAILS)
+    return warmup
+
+# ====================================================
+# PDF LIFECYCLE (archive to the cold tier / retention)
+# ====================================================
+def _forget_pdf(filename: str):
+    get_history_store().delete(filename)
+    quotation_cache.forget(os.path.splitext(filename)[0])
+
+async def _compaction_loop():
+    while True:
+        try:
+            report = await run_io(compact, pdf_storage, on_delete=_forget_pdf)
+            app.state.compaction = dict(report, runs=app.state.compaction["runs"] + 1, last_run=time.time())
+            if report["archived"] or report["deleted"] or report["relocated"]:
+                print(f"PDF compaction: {report}")
+        except Exception as e:
+            print(f"PDF compaction failed: {e}")
+        await asyncio.sleep(PDF_COMPACTION_INTERVAL)
 
 # ====================================================
 # FASTAPI APP
 # ====================================================
-app = FastAPI(title="S-MAG Enterprise Backend", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    app.state.warmup = _build_warmup()
+    await app.state.warmup.start()
+    app.state.startup = {
+        "import_s": round(IMPORT_SECONDS, 3),
+        "blocking_warmup_s": round(time.perf_counter() - started, 3),
+    }
+    print(f"Startup: imports {IMPORT_SECONDS:.2f}s, blocking warm-up {app.state.startup['blocking_warmup_s']:.2f}s")
+    if SHARED_STATE == "redis":
+        print("WARNING: /history only lists quotations generated by this instance (HISTORY_DB is per host)")
+    app.state.compaction = {"runs": 0}
+    compaction_task = asyncio.create_task(_compaction_loop()) if PDF_COMPACTION_INTERVAL > 0 else None
+    yield
+    if compaction_task is not None:
+        compaction_task.cancel()
+    await app.state.warmup.stop()
+    await close_async_client()
+    executors.shutdown()
+
+app = FastAPI(title="S-MAG Enterprise Backend", version="2.0.0", lifespan=lifespan)
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 # Enable CORS (Next.js frontend needs this)
 app.add_middleware(
@@ -38,7 +160,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-History-Scope", "X-Invoice-No", "X-Pdf-Url", "X-Grand-Total", "X-Render-Cache",
+                    "Content-Disposition", "Server-Timing"],
 )
+# Per-stage Server-Timing headers + request latency histograms (METRICS_ENABLED=0 turns it off)
+app.add_middleware(ServerTimingMiddleware)
 
 # --- DYNAMIC URL LOGIC ---
 def get_base_url():
@@ -80,15 +206,111 @@ class FinalizeRequest(BaseModel):
     tax_rate: float = 0.0
     discount_rate: float = 0.0
     products: List[ProductItem]
+    # Branded / localized variant (see GET /templates); default quotation_template.html
+    template: Optional[str] = None
+    locale: Optional[str] = None
+
+# Bulk runs: many quotations in one call
+class BatchFinalizeRequest(BaseModel):
+    quotations: List[FinalizeRequest]
 
 # ====================================================
 # ROUTE 1: GET ALL PRODUCTS (For Search Bar)
 @app.get("/products")
-async def get_all_products():
+async def get_all_products(request: Request):
     """Returns all available products for the search bar"""
-    product_agent = ProductAgent()
-    # This now uses the robust loader we just wrote
-    return product_agent.products
+    # Shared catalog: serialized + gzipped once per catalog version, revalidated by ETag
+    snapshot = get_catalog().snapshot
+    headers = {
+        "ETag": f'"catalog-{snapshot.version}"',
+        "Cache-Control": "public, max-age=0, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    body, gzipped = await run_io(snapshot.listing)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = gzipped
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/products/search")
+async def search_products_route(
+    request: Request,
+    q: str = "",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Paginated catalog search for autocomplete. Returns {items, total, next_cursor}.
+    `fields` is a comma-separated projection (default: sku,name,thumbnail,price,brand;
+    "*" for whole products). Pass next_cursor back as ?cursor= for the next page.
+    """
+    snapshot = get_catalog().snapshot
+    etag = f'"search-{snapshot.version}-{fingerprint([q.lower().strip(), limit, cursor, fields])[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        result = await run_io(search_products, snapshot, q, limit=limit, cursor=cursor, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=json.dumps(result), media_type="application/json", headers=headers)
+
+def _etag_matches(request: Request, etag: str):
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+# ====================================================
+# ROUTE: RUNTIME STATS (Monitoring)
+# ====================================================
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving (may still be warming up)"""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness: 200 once the startup warm-up finished (point a startup/readiness probe here), 503 before"""
+    warmup = app.state.warmup.status()
+    if warmup["status"] == "warming":
+        response.status_code = 503
+    return dict(warmup, startup=app.state.startup)
+
+@app.get("/stats")
+async def get_stats():
+    """Reload counters and load timings for the shared services"""
+    return {
+        "catalog": get_catalog().stats(),
+        "fast_path": fast_path_stats.snapshot(),
+        "extraction": extraction_cache.stats(),
+        "llm": gemini_caller.stats(),
+        "pools": executors.pool_stats(),
+        "thumbnails": thumbnail_cache.stats(),
+        "render": render_service.stats(),
+        "history": await run_io(get_history_store().stats),
+        "render_cache": quotation_cache.stats(),
+        "templates": get_template_registry().stats(),
+        "shared_state": await run_io(get_shared_state().stats),
+        "pdf_storage": dict(pdf_storage.stats(), compaction=app.state.compaction),
+        "startup": dict(app.state.startup, warmup=app.state.warmup.status()),
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint: stage latency histograms, pipeline counters, cache gauges"""
+    return Response(content=metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/templates")
+async def list_templates():
+    """Quotation templates available to /finalize-quotation ({name: [locales]})"""
+    return get_template_registry().available()
 
 # ====================================================
 # ROUTE 2: ANALYZE REQUEST (AI Extraction)
@@ -100,84 +322,235 @@ async def analyze_request(req: AnalyzeRequest):
     Does NOT generate PDF yet. Allows user to edit data on frontend.
     """
     # Initialize Agents
-    gemini_agent = GeminiExtractionAgent()
     product_agent = ProductAgent()
     pricing_agent = PricingAgent()
 
-    # 1. Gemini Extraction
-    try:
-        extraction = gemini_agent.extract(req.prompt)
-    except Exception as e:
-        print("GEMINI ERROR:", e)
-        extraction = {"items": [], "customer_name": ""}
+    # 1. Extraction (local fast path, else Gemini)
+    extraction = await _extract(req.prompt, product_agent)
 
-    # 2. Product Matching
-    matched_items = []
+    # 2 + 3. Product Matching and Initial Pricing (customer price lists apply when the name matches)
+    customer = extraction.get("customer_name", "")
+    priced_items = []
+    unmatched_items = []
     for item in extraction.get("items", []):
-        sku_or_name = item.get("sku") or item.get("name")
-        qty = item.get("quantity", 1)
-        
-        found = product_agent.find_products(sku_or_name)
-        
-        if found:
-            product = found[0] # Match the best product
-            product["quantity"] = qty
-            matched_items.append(product)
-
-    # 3. Initial Pricing Calculation
-    priced_items, _ = pricing_agent.process(matched_items)
+        priced = _match_and_price(item, product_agent, pricing_agent, customer)
+        if priced:
+            priced_items.append(priced)
+        else:
+            unmatched_items.append(item)
 
     return {
         "success": True,
         "suggested_customer": extraction.get("customer_name", ""),
-        "products": priced_items
+        "products": priced_items,
+        "unmatched": unmatched_items
     }
 
+@app.post("/analyze-request/stream")
+async def analyze_request_stream(req: AnalyzeRequest):
+    """
+    Streaming variant of /analyze-request (Server-Sent Events). Emits, in order:
+    status -> extraction (customer + item count) -> one product / unmatched event
+    per item as it resolves -> done. Errors arrive as an "error" event.
+    """
+    async def events():
+        started = time.perf_counter()
+        product_agent = ProductAgent()
+        pricing_agent = PricingAgent()
+        try:
+            yield _sse("status", {"stage": "extracting"})
+            extraction = await _extract(req.prompt, product_agent)
+            items = extraction.get("items", [])
+            yield _sse("extraction", {
+                "suggested_customer": extraction.get("customer_name", ""),
+                "item_count": len(items),
+                "source": extraction.get("source", "gemini"),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+
+            matched = 0
+            customer = extraction.get("customer_name", "")
+            for index, item in enumerate(items):
+                priced = _match_and_price(item, product_agent, pricing_agent, customer)
+                if priced:
+                    matched += 1
+                    yield _sse("product", {"index": index, "product": priced})
+                else:
+                    yield _sse("unmatched", {"index": index, "item": item})
+
+            yield _sse("done", {
+                "success": True,
+                "matched": matched,
+                "unmatched": len(items) - matched,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+        except Exception as e:
+            print("ANALYZE STREAM ERROR:", e)
+            yield _sse("error", {"success": False, "detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No proxy buffering, or events arrive all at once at the end
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _sse(event: str, data: dict):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _extract(prompt: str, product_agent: ProductAgent):
+    # 1a. Local fast path: plain SKU/quantity lists never leave the process
+    with stage("extract_local"):
+        extraction = LocalExtractionAgent(product_agent).extract(prompt)
+
+    # 1b. Gemini Extraction (only when the local parser isn't confident)
+    if extraction is None:
+        started = time.perf_counter()
+        try:
+            extraction = await gemini_agent.extract_async(prompt)
+        except Exception as e:
+            print("GEMINI ERROR:", e)
+            metrics.count("gemini_error")
+            extraction = {"items": [], "customer_name": ""}
+        elapsed = time.perf_counter() - started
+        record_stage("gemini", elapsed)
+        fast_path_stats.record_llm(elapsed * 1000)
+    else:
+        metrics.count("fast_path_hit")
+    return extraction
+
+def _match_and_price(item: dict, product_agent: ProductAgent, pricing_agent: PricingAgent, customer: str = None):
+    """Catalog match (exact search first, then ranked fuzzy match) + price; None if unmatched."""
+    with stage("match"):
+        found = product_agent.resolve_item(item.get("sku"), item.get("name"))
+    if not found:
+        metrics.count("item_unmatched")
+        return None
+    metrics.count("item_matched")
+    product = dict(found) # Copy: catalog is shared
+    product["quantity"] = item.get("quantity")
+    with stage("pricing"):
+        try:
+            priced_items, _ = pricing_agent.process([product], customer=customer)
+        except (InvalidQuantity, InvalidAmount):
+            # e.g. "0 cameras": let the user fix the line instead of pricing it as 1
+            metrics.count("item_invalid_quantity")
+            return None
+    return priced_items[0]
+
 # ====================================================
 # ROUTE 3: FINALIZE QUOTATION (Generate PDF)
 # ====================================================
 @app.post("/finalize-quotation")
-async def finalize_quotation(req: FinalizeRequest):
+async def finalize_quotation(
+    req: FinalizeRequest,
+    response: Response,
+    format: str = "json",
+    include_pdf: bool = False,
+    idempotency_key: Optional[str] = Header(None),
+):
     """
     Step 2: Takes edited data, calculates Tax/Discount, Converts Images,
     Generates Sequential ID, and Creates PDF.
+
+    format=json (default) returns metadata + pdf_url; add include_pdf=true for an
+    inline pdf_base64 copy. format=pdf returns the PDF itself as the response body
+    (invoice details in X-Invoice-No / X-Pdf-Url / X-Grand-Total headers).
+
+    Identical inputs return the already rendered quotation, and a repeated
+    Idempotency-Key header returns the original result instead of a new invoice.
+    X-Render-Cache reports hit / miss / coalesced / replay.
     """
-    formatting_agent = FormattingAgent()
+    if format not in ("json", "pdf"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'pdf'")
     # review_agent = ReviewAgent()
 
-    # 1. Recalculate Financials (Server-side math is safer)
-    subtotal = sum(item.unit_price * item.quantity for item in req.products)
-    
+    content_hash = fingerprint(_render_inputs(req))
+    try:
+        result, pdf_bytes, cache_status = await quotation_cache.get_or_render(
+            content_hash, idempotency_key, lambda: _finalize_uncached(req)
+        )
+    except (IdempotencyConflict, UnknownTemplate, InvalidQuantity, InvalidAmount) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except PdfUnavailable as e:
+        # Retryable: the quotation exists, re-rendering it would spend a second invoice number
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except TemplateError as e:
+        # Surface broken templates instead of rendering a placeholder page
+        raise HTTPException(status_code=500, detail=f"Template error: {e}")
+    metrics.count(f"render_cache_{cache_status}")
+    result = dict(result)
+
+    if format == "pdf":
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f'inline; filename="{result["filename"]}"',
+                "X-Invoice-No": result["invoice_no"],
+                "X-Pdf-Url": result["pdf_url"],
+                "X-Grand-Total": str(result["grand_total"]),
+                "X-Render-Cache": cache_status,
+            },
+        )
+    response.headers["X-Render-Cache"] = cache_status
+    if include_pdf:
+        result["pdf_base64"] = base64.b64encode(pdf_bytes).decode('utf-8')
+    return result
+
+def _render_inputs(req: FinalizeRequest):
+    """Everything that ends up in the PDF except the invoice number (line totals are recomputed)."""
+    inputs = req.dict()
+    for product in inputs["products"]:
+        product.pop("line_total", None)
+    return inputs
+
+async def _finalize_uncached(req: FinalizeRequest):
+    # 1 + 2. Financials and images
+    context = await _prepare_quotation(req)
+
+    # 3. Get Sequential Invoice Number
+    with stage("invoice"):
+        invoice_no = await run_io(get_next_invoice_number)
+
+    # 4 - 6. Render HTML template and PDF File (bytes come straight back from the worker)
+    return await _render_quotation(context, invoice_no, return_bytes=True)
+
+async def _prepare_quotation(req: FinalizeRequest):
+    """
+    Builds the template context for a quotation (everything except the invoice number).
+    Raises UnknownTemplate before any work (or invoice number) is spent on a bad template.
+    """
+    get_template_registry().resolve(req.template, req.locale)
+
+    # 1. Recalculate Financials (Server-side math is safer; Decimal, rounded to cents)
+    with stage("totals"):
+        totals = get_pricing_engine().quote_totals(
+            [(item.unit_price, item.quantity) for item in req.products],
+            discount_rate=req.discount_rate,
+            tax_rate=req.tax_rate,
+        )
+
     # Update line totals just in case
-    for item in req.products:
-        item.line_total = item.unit_price * item.quantity
+    for item, line_total in zip(req.products, totals["line_totals"]):
+        item.line_total = float(line_total)
 
-    discount_amount = subtotal * (req.discount_rate / 100)
-    taxable_income = subtotal - discount_amount
-    tax_amount = taxable_income * (req.tax_rate / 100)
-    grand_total = taxable_income + tax_amount
+    subtotal = float(totals["subtotal"])
+    discount_amount = float(totals["discount_amount"])
+    tax_amount = float(totals["tax_amount"])
+    grand_total = float(totals["total"])
 
     # 2. Prepare Product List & Convert Images
-    # We convert Pydantic models to Dicts and handle Images here
+    # We convert Pydantic models to Dicts; images come from the thumbnail cache
     print("Converting images for PDF...")
-    product_dicts = []
-    
-    for item in req.products:
-        p_dict = item.dict()
-        # Image conversion logic
-        if p_dict.get('thumbnail'):
-            p_dict['base64_image'] = image_to_base64(p_dict.get('thumbnail'))
-        else:
-            p_dict['base64_image'] = None
-        product_dicts.append(p_dict)
-
-    # 3. Get Sequential Invoice Number
-    invoice_no = get_next_invoice_number()
+    product_dicts = [item.dict() for item in req.products]
+    with stage("images"):
+        images = await images_to_base64_async([p.get('thumbnail') for p in product_dicts])
+    for p_dict, image in zip(product_dicts, images):
+        p_dict['base64_image'] = image
 
-    # 4. Prepare Data Context for HTML Template
-    context = {
-        "invoice_no": invoice_no,
-        "quote_id": invoice_no,
+    # Data Context for HTML Template
+    return {
         "customer_name": req.customer_name,
         "date_today": req.invoice_date,
         "valid_until": req.valid_until,
@@ -187,59 +560,254 @@ async def finalize_quotation(req: FinalizeRequest):
         "discount_amount": discount_amount,
         "tax_rate": req.tax_rate,
         "tax_amount": tax_amount,
-        "total": grand_total
+        "total": grand_total,
+        "template": req.template,
+        "locale": req.locale,
     }
 
-    # 5. Generate HTML from Template
-    html_output = formatting_agent.generate_html_with_context(context)
+async def _render_quotation(context: dict, invoice_no: str, return_bytes: bool = False):
+    """
+    Renders the quotation PDF on a warm render worker and stores it in PDF storage.
+    Returns (result dict, PDF bytes if return_bytes else None).
+    """
+    context = dict(context, invoice_no=invoice_no, quote_id=invoice_no)
 
-    # 6. Generate PDF File
     pdf_filename = f"{invoice_no}.pdf"
-    pdf_path = os.path.join("storage", "pdfs", pdf_filename)
-    generate_pdf_from_html(html_output, pdf_path)
-
-    with open(pdf_path, "rb") as f:
-        pdf_bytes = f.read()
-        encoded_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
+    # Local storage: the worker writes the file itself; remote storage: upload the bytes here
+    pdf_path = pdf_storage.direct_path(pdf_filename)
+    pdf_bytes, timings = await render_service.render(context, pdf_path, return_bytes=return_bytes or pdf_path is None)
+    if pdf_path is None:
+        with stage("store"):
+            await run_io(pdf_storage.put, pdf_filename, pdf_bytes)
+    # Worker-side stages (template -> layout -> PDF write) + time spent queued for a worker
+    for name in ("queue_ms", "template_ms", "layout_ms", "write_ms"):
+        if name in timings:
+            record_stage("render_" + name[:-3], timings[name] / 1000)
+    with stage("history"):
+        await run_io(
+            get_history_store().record,
+            invoice_no,
+            pdf_filename,
+            customer_name=context["customer_name"],
+            subtotal=context["subtotal"],
+            grand_total=context["total"],
+            item_count=len(context["items"]),
+            file_size=timings["pdf_size"],
+        )
+    metrics.count("quotation_rendered")
 
     return {
         "success": True,
         "invoice_no": invoice_no,
-        "filename": pdf_filename,            
+        "filename": pdf_filename,
         "pdf_url": f"{BASE_URL}/pdf/{pdf_filename}",
-        "pdf_base64": encoded_pdf,            
-        "grand_total": grand_total
-    }
+        "grand_total": context["total"]
+    }, pdf_bytes
+
+# ====================================================
+# ROUTE 3b: BATCH QUOTATIONS (Bulk PDF runs)
+# ====================================================
+@app.post("/finalize-quotation/batch")
+async def finalize_quotation_batch(req: BatchFinalizeRequest, format: str = "ndjson"):
+    """
+    Finalizes many quotations at once. Invoice numbers are reserved in one block,
+    PDFs render in parallel, and results stream back (NDJSON) as each completes.
+    Use ?format=zip to get every PDF plus a results.json manifest as one ZIP instead.
+    """
+    return await _batch_response(list(req.quotations), format)
+
+@app.post("/finalize-quotation/batch/upload")
+async def finalize_quotation_batch_upload(file: UploadFile = File(...), format: str = "ndjson"):
+    """
+    Same as /finalize-quotation/batch, but takes a JSONL file (one FinalizeRequest per line).
+    Invalid lines are reported in the results instead of failing the whole run.
+    """
+    raw = (await file.read()).decode("utf-8-sig")
+    items = []
+    for line_no, line in enumerate(raw.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(FinalizeRequest(**json.loads(line)))
+        except (ValueError, TypeError) as e:
+            items.append(f"line {line_no}: {e}")
+    return await _batch_response(items, format)
+
+async def _batch_response(items: list, format: str):
+    if format not in ("ndjson", "zip"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'zip'")
+    if not items:
+        raise HTTPException(status_code=400, detail="No quotations supplied")
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch limit is {MAX_BATCH_SIZE} quotations")
+
+    if format == "zip":
+        results = [result async for result in _finalize_batch(items)]
+        zip_path = await run_io(_build_batch_zip, results)
+        return FileResponse(
+            zip_path,
+            media_type="application/zip",
+            filename="quotations.zip",
+            background=BackgroundTask(os.remove, zip_path),
+        )
+
+    async def ndjson_lines():
+        async for result in _finalize_batch(items):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+async def _finalize_batch(items: list):
+    """
+    Yields one result dict per item (tagged with its "index"), in completion order.
+    Items that are not FinalizeRequest objects are validation error messages.
+    """
+    # Unknown templates/locales and bad quantities are rejected here, so they never spend an invoice number
+    item_errors = await run_io(_check_batch_items, items)
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, FinalizeRequest):
+            yield {"index": index, "success": False, "error": item}
+        elif index in item_errors:
+            yield {"index": index, "success": False, "error": item_errors[index]}
+        else:
+            valid.append((index, item))
+    if not valid:
+        return
+
+    # One counter update for the whole batch (only items that passed validation)
+    invoice_numbers = await run_io(reserve_invoice_numbers, len(valid))
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def finalize_one(index, item, invoice_no):
+        async with semaphore:
+            try:
+                context = await _prepare_quotation(item)
+                result, _ = await _render_quotation(context, invoice_no)
+            except Exception as e:
+                print(f"BATCH ERROR ({invoice_no}):", e)
+                result = {"success": False, "invoice_no": invoice_no, "error": str(e)}
+        result["index"] = index
+        return result
+
+    tasks = [
+        asyncio.create_task(finalize_one(index, item, invoice_no))
+        for (index, item), invoice_no in zip(valid, invoice_numbers)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: stop rendering the rest
+        for task in tasks:
+            task.cancel()
+
+def _check_batch_items(items: list):
+    """{index: error} for batch items whose template/locale doesn't resolve, with a quantity below 1 or a NaN / infinite amount."""
+    registry = get_template_registry()
+    errors = {}
+    for index, item in enumerate(items):
+        if isinstance(item, FinalizeRequest):
+            try:
+                registry.resolve(item.template, item.locale)
+                to_decimal(item.discount_rate)
+                to_decimal(item.tax_rate)
+                for product in item.products:
+                    parse_quantity(product.quantity)
+                    to_decimal(product.unit_price)
+            except (UnknownTemplate, InvalidQuantity, InvalidAmount) as e:
+                errors[index] = str(e)
+    return errors
+
+def _build_batch_zip(results: list):
+    fd, zip_path = tempfile.mkstemp(prefix="quotations-", suffix=".zip")
+    os.close(fd)
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for result in results:
+            if result.get("success"):
+                pdf = pdf_storage.stat(result["filename"])
+                if pdf is not None and pdf.path:
+                    archive.write(pdf.path, arcname=result["filename"])
+                else:
+                    archive.writestr(result["filename"], pdf_storage.get(result["filename"]))
+        manifest = sorted(results, key=lambda r: r["index"])
+        archive.writestr("results.json", json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+    return zip_path
 
 # ====================================================
 # ROUTE: HISTORY MANAGEMENT
 # ====================================================
 @app.get("/history")
-async def get_history():
-    """Returns list of generated PDFs sorted by date"""
-    files = []
-    pdf_dir = os.path.join("storage", "pdfs")
-    os.makedirs(pdf_dir, exist_ok=True)
-    
-    # Get all PDF files
-    paths = sorted(glob.glob(os.path.join(pdf_dir, "*.pdf")), key=os.path.getmtime, reverse=True)
-    
-    for p in paths:
-        filename = os.path.basename(p)
-        timestamp = datetime.fromtimestamp(os.path.getmtime(p)).strftime("%Y-%m-%d %H:%M")
-        files.append({
-            "filename": filename,
-            "url": f"{BASE_URL}/pdf/{filename}",      # <--- Uses dynamic URL
-            "created_at": timestamp
-        })
-    return files
+async def get_history(
+    response: Response,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    customer: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+):
+    """
+    Returns generated PDFs, newest first, one page at a time.
+    Filters: customer (name prefix), date_from / date_to (YYYY-MM-DD, inclusive),
+    min_total / max_total. Pass the X-Next-Cursor response header back as ?cursor=
+    to get the next page; it is absent on the last page.
+    The index is per host: with SHARED_STATE=redis (several instances) the response
+    carries X-History-Scope: instance, as other instances' quotations are not listed.
+    """
+    try:
+        rows, next_cursor = await run_io(
+            get_history_store().query,
+            limit=limit,
+            cursor=cursor,
+            customer=customer,
+            date_from=_parse_history_date(date_from),
+            date_to=_parse_history_date(date_to, end_of_day=True),
+            min_total=min_total,
+            max_total=max_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["X-History-Scope"] = "instance" if SHARED_STATE == "redis" else "host"
+    return [
+        {
+            "filename": row["filename"],
+            "url": f"{BASE_URL}/pdf/{row['filename']}",      # <--- Uses dynamic URL
+            "created_at": datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M"),
+            "invoice_no": row["invoice_no"],
+            "customer_name": row["customer_name"],
+            "grand_total": row["grand_total"],
+            "file_size": row["file_size"],
+        }
+        for row in rows
+    ]
+
+def _parse_history_date(value: Optional[str], end_of_day: bool = False):
+    """YYYY-MM-DD (or full ISO datetime) -> epoch seconds; a bare end date covers the whole day."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
 
 @app.delete("/history/{filename}")
 async def delete_history(filename: str):
     """Deletes a specific PDF file"""
-    file_path = os.path.join("storage", "pdfs", filename)
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    try:
+        deleted = await run_io(pdf_storage.delete, filename)
+    except FileNotFoundError:
+        deleted = False
+    if deleted:
+        await run_io(_forget_pdf, filename)
         return {"success": True, "message": "File deleted"}
     raise HTTPException(status_code=404, detail="File not found")
 
@@ -247,12 +815,45 @@ async def delete_history(filename: str):
 # ROUTE: SERVE PDF FILE
 # ====================================================
 @app.get("/pdf/{filename}")
-async def serve_pdf(filename: str, download: bool = False):
-    file_path = os.path.join("storage", "pdfs", filename)
-    if os.path.exists(file_path):
-        headers = {}
-        # If ?download=true is passed, force browser to download instead of view
-        if download:
-            headers["Content-Disposition"] = f'attachment; filename="{filename}"'
-        return FileResponse(file_path, media_type="application/pdf", headers=headers)
-    raise HTTPException(status_code=404, detail="PDF not found")
+async def serve_pdf(request: Request, filename: str, download: bool = False):
+    """
+    Serves a stored PDF. Responses carry ETag / Last-Modified, so revalidation
+    gets a 304, and Range requests on hot local files get partial content
+    (resumable downloads). Archived and remote PDFs are sent whole.
+    """
+    try:
+        pdf = await run_io(pdf_storage.stat, filename)
+    except FileNotFoundError:
+        pdf = None
+    if pdf is None:
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    headers = {
+        "ETag": pdf.etag,
+        "Last-Modified": formatdate(pdf.mtime, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, headers["ETag"], pdf.mtime):
+        return Response(status_code=304, headers=headers)
+
+    # If ?download=true is passed, force browser to download instead of view
+    if download:
+        headers["Content-Disposition"] = f'attachment; filename="{pdf.name}"'
+    if pdf.path:
+        return FileResponse(pdf.path, media_type="application/pdf", headers=headers)
+    try:
+        body = await run_io(pdf_storage.get, pdf.name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="PDF not found")
+    return Response(content=body, media_type="application/pdf", headers=headers)
+
+def _not_modified(request: Request, etag: str, mtime: float):
+    if request.headers.get("if-none-match") is not None:
+        return _etag_matches(request, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
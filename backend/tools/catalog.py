@@ -0,0 +1,289 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from tools.catalog_store import CATALOG_DB, CatalogStore
+from tools.product_index import ProductIndex
+from tools.product_matcher import ProductMatcher
+
+CATALOG_PATH = os.path.join("data", "products.json")
+
+# How often (seconds) we stat() the catalog file to look for changes
+RELOAD_CHECK_INTERVAL = float(os.getenv("CATALOG_RELOAD_INTERVAL", "2"))
+
+# Recent /products/search queries kept per snapshot (pages 2..n reuse the match list)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+
+
+def parse_products(data):
+    """
+    Robust parser: Handles both list [...] and dict {"products": [...]} formats.
+    """
+    if isinstance(data, dict):
+        if "products" in data:
+            return data["products"]
+        return list(data.values())
+
+    if isinstance(data, list):
+        return data
+
+    return []
+
+
+class CatalogSnapshot:
+    """
+    One immutable, fully-loaded version of the catalog (products + search structures).
+    Readers grab a snapshot and keep using it even if a reload happens meanwhile.
+    With lazy_index the search structures are built on first use instead of up front
+    (large store-backed catalogs: a reload doesn't pay for an index nobody queried yet).
+    """
+
+    def __init__(self, products, version="", load_ms=0.0, lazy_index=False):
+        self.products = products
+        self.version = version
+        self.load_ms = load_ms
+        self.loaded_at = time.time()
+
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._index = None if lazy_index else ProductIndex(products)
+        self._matcher = None if lazy_index else ProductMatcher(products)
+        self._listing = None
+        self._searches = OrderedDict()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = ProductIndex(self.products)
+        return self._index
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            with self._index_lock:
+                if self._matcher is None:
+                    self._matcher = ProductMatcher(self.products)
+        return self._matcher
+
+    def listing(self):
+        """The full product list as (json_bytes, gzip_bytes), serialized once per version."""
+        if self._listing is None:
+            with self._lock:
+                if self._listing is None:
+                    body = json.dumps(self.products, separators=(",", ":")).encode("utf-8")
+                    self._listing = (body, gzip.compress(body, compresslevel=6))
+        return self._listing
+
+    def search_ids(self, query):
+        """Product ids matching `query` in index priority order, one per SKU."""
+        key = (query or "").lower().strip()
+        with self._lock:
+            cached = self._searches.get(key)
+            if cached is not None:
+                self._searches.move_to_end(key)
+                return cached
+
+        if key:
+            seen = set()
+            ids = []
+            for tier in self.index.lookup(key):
+                for pid in tier:
+                    sku = self.products[pid].get("sku")
+                    if sku and sku not in seen:
+                        seen.add(sku)
+                        ids.append(pid)
+        else:
+            ids = list(range(len(self.products)))
+
+        with self._lock:
+            self._searches[key] = ids
+            while len(self._searches) > SEARCH_CACHE_SIZE:
+                self._searches.popitem(last=False)
+        return ids
+
+
+class ProductCatalog:
+    """
+    Process-wide product catalog.
+    Loaded once, then swapped atomically whenever products.json changes on disk
+    (or, with a CatalogStore, whenever an import bumps the store version).
+    Changes are noticed on the request path but loaded on a background thread;
+    readers keep getting the previous snapshot until the new one is ready.
+    """
+
+    def __init__(self, data_path=CATALOG_PATH, check_interval=RELOAD_CHECK_INTERVAL, store=None):
+        self.store = store
+        self.data_path = store.db_path if store is not None else data_path
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._snapshot = CatalogSnapshot([])
+        self._last_check = None
+        self._reloading = False
+        # stat() of the file behind the current snapshot (products.json only)
+        self._mtime_ns = 0
+        self._size = 0
+
+        self.reload_count = 0
+        self.reload_errors = 0
+        self.last_error = None
+
+    @property
+    def snapshot(self):
+        self.maybe_reload()
+        return self._snapshot
+
+    @property
+    def products(self):
+        return self.snapshot.products
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def maybe_reload(self, force=False):
+        """
+        Cheap change detection: stat() (or read the store version) at most once per
+        check_interval. A change starts a background reload, which re-parses only
+        if the content hash differs, and returns False right away; force=True loads
+        synchronously (startup). Returns True if a new snapshot was installed.
+        """
+        now = time.monotonic()
+        if not force and self._last_check is not None and now - self._last_check < self.check_interval:
+            return False
+
+        with self._lock:
+            # Another thread may have checked while we waited for the lock
+            if not force and self._last_check is not None and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+            if not force:
+                if self._reloading or not self._changed():
+                    return False
+                self._reloading = True
+                threading.Thread(target=self._reload_in_background, name="catalog-reload", daemon=True).start()
+                return False
+        return self._reload(force=True)
+
+    def _changed(self):
+        """Whether the source looks different from the current snapshot (no parsing)."""
+        try:
+            if self.store is not None:
+                return self.store.version() != self._snapshot.version
+            stat = os.stat(self.data_path)
+        except Exception as e:
+            print(f"ERROR checking {self.data_path}: {e}")
+            return False
+        return stat.st_mtime_ns != self._mtime_ns or stat.st_size != self._size
+
+    def _reload_in_background(self):
+        try:
+            self._reload()
+        finally:
+            self._reloading = False
+
+    def _reload(self, force=False):
+        with self._reload_lock:
+            current = self._snapshot
+            started = time.perf_counter()
+            try:
+                if self.store is not None:
+                    snapshot = self._load_from_store(current, force)
+                else:
+                    snapshot = self._load_from_file(current, force)
+            except Exception as e:
+                # Keep serving the previous snapshot if the new file is broken
+                print(f"ERROR loading {self.data_path}: {e}")
+                self.reload_errors += 1
+                self.last_error = str(e)
+                return False
+            if snapshot is None:
+                return False
+
+            load_ms = (time.perf_counter() - started) * 1000
+            snapshot.load_ms = load_ms
+            self._snapshot = snapshot
+            self.reload_count += 1
+            print(f"Catalog loaded: {len(snapshot.products)} products (version {snapshot.version}, {load_ms:.1f} ms)")
+            return True
+
+    def _load_from_file(self, current, force):
+        """New snapshot from products.json, or None if it hasn't changed."""
+        try:
+            stat = os.stat(self.data_path)
+        except FileNotFoundError:
+            if self.reload_count == 0:
+                print(f"WARNING: Product file not found at {self.data_path}")
+            return None
+
+        if not force and stat.st_mtime_ns == self._mtime_ns and stat.st_size == self._size:
+            return None
+
+        with open(self.data_path, "rb") as f:
+            raw = f.read()
+
+        version = hashlib.sha256(raw).hexdigest()[:16]
+        if version != current.version:
+            products = parse_products(json.loads(raw.decode("utf-8")))
+            # The index is built before the swap, so readers never see a half-built one
+            current = CatalogSnapshot(products, version=version)
+        else:
+            # File was touched but content is identical: just remember the new mtime
+            current = None
+        self._mtime_ns = stat.st_mtime_ns
+        self._size = stat.st_size
+        return current
+
+    def _load_from_store(self, current, force):
+        """
+        New snapshot from the SQLite store, or None if no import changed it. The product
+        list is still read in full (snapshots index into it); only the search structures
+        are deferred, and this runs on the background reload thread.
+        """
+        version = self.store.version()
+        if version == current.version and not force:
+            return None
+        if not version:
+            if self.reload_count == 0:
+                print(f"WARNING: Catalog store {self.data_path} is empty (run python -m tools.catalog_import)")
+            return None
+        return CatalogSnapshot(list(self.store.iter_products()), version=version, lazy_index=True)
+
+    def stats(self):
+        snap = self._snapshot
+        return {
+            "path": self.data_path,
+            "source": "sqlite" if self.store is not None else "json",
+            "index_built": snap._index is not None,
+            "reloading": self._reloading,
+            "version": snap.version,
+            "product_count": len(snap.products),
+            "loaded_at": snap.loaded_at,
+            "load_ms": round(snap.load_ms, 3),
+            "reload_count": self.reload_count,
+            "reload_errors": self.reload_errors,
+            "last_error": self.last_error,
+        }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Returns the shared ProductCatalog, creating (and loading) it on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                catalog = ProductCatalog(store=CatalogStore(CATALOG_DB) if CATALOG_DB else None)
+                catalog.maybe_reload(force=True)
+                _catalog = catalog
+    return _catalog
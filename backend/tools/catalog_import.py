@@ -0,0 +1,105 @@
+"""
+Streams a supplier feed into the SQLite catalog store, diffing against what is
+already there (run from the backend/ folder):
+
+    python -m tools.catalog_import feed.csv --db data/catalog.db
+    python -m tools.catalog_import feed.jsonl --full --diff-out diff.jsonl
+    python -m tools.catalog_import data/products.json      # seed from the current catalog
+
+Serve the result with CATALOG_DB=data/catalog.db.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from tools.catalog import parse_products
+from tools.catalog_store import CATALOG_DB, IMPORT_BATCH_SIZE, CatalogStore
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def read_feed(path, fmt=None):
+    """Yields raw rows from a CSV, JSONL or JSON (products.json layout) file."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+    elif fmt in ("jsonl", "ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield {}  # counted as invalid (missing sku)
+    elif fmt == "json":
+        # Not streamed: meant for seeding the store from data/products.json
+        with open(path, "r", encoding="utf-8") as f:
+            yield from parse_products(json.load(f))
+    else:
+        raise ValueError(f"Unsupported feed format: {fmt!r} (csv, jsonl or json)")
+
+
+def peak_rss_mb():
+    """Process memory high-water mark in MiB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_import(path, db_path=CATALOG_DB, full=False, dry_run=False, fmt=None,
+               batch_size=IMPORT_BATCH_SIZE, diff_out=None):
+    store = CatalogStore(db_path)
+    diff_file = open(diff_out, "w", encoding="utf-8") if diff_out else None
+    try:
+        on_change = None
+        if diff_file is not None:
+            def on_change(op, sku, fields):
+                diff_file.write(json.dumps({"op": op, "sku": sku, "fields": fields}) + "\n")
+        report = store.import_rows(read_feed(path, fmt), full=full, dry_run=dry_run,
+                                   batch_size=batch_size, on_change=on_change)
+    finally:
+        if diff_file is not None:
+            diff_file.close()
+    report["products"] = store.count()
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("feed", help="CSV, JSONL or products.json file")
+    parser.add_argument("--db", default=CATALOG_DB or os.path.join("data", "catalog.db"))
+    parser.add_argument("--format", choices=["csv", "jsonl", "json"], help="default: from the file extension")
+    parser.add_argument("--full", action="store_true", help="feed is the complete catalog: delete SKUs not in it")
+    parser.add_argument("--dry-run", action="store_true", help="report the diff without writing")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--diff-out", help="write one JSON line per inserted / updated / deleted SKU")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_import(args.feed, args.db, full=args.full, dry_run=args.dry_run, fmt=args.format,
+                        batch_size=args.batch_size, diff_out=args.diff_out)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.feed} -> {args.db}{' (dry run)' if args.dry_run else ''}")
+        print(f"  rows {report['rows']}: {report['inserted']} inserted, {report['updated']} updated, "
+              f"{report['unchanged']} unchanged, {report['deleted']} deleted, "
+              f"{report['invalid']} invalid, {report['duplicates']} duplicate")
+        print(f"  {report['elapsed_s']}s, {report['rows_per_sec']:,} rows/s, peak RSS {report['peak_rss_mb']} MiB")
+        print(f"  catalog: {report['products']} products, version {report['version'] or '-'}")
+        for error in report["errors"]:
+            print(f"  ! {error}")
+    return 1 if report["invalid"] and not report["rows"] - report["invalid"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
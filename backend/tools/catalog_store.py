@@ -0,0 +1,229 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# SQLite product store filled by `python -m tools.catalog_import`; when set, the catalog
+# is served from it instead of data/products.json
+CATALOG_DB = os.getenv("CATALOG_DB", "")
+IMPORT_BATCH_SIZE = int(os.getenv("CATALOG_IMPORT_BATCH", "2000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    sku        TEXT PRIMARY KEY,
+    name       TEXT NOT NULL,
+    brand      TEXT,
+    category   TEXT,
+    price      REAL,
+    data       TEXT NOT NULL,
+    hash       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand, category);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class InvalidProduct(ValueError):
+    """A feed row that cannot become a catalog product."""
+
+
+def normalize_product(row):
+    """
+    Validates one feed row (CSV strings or JSON values) into a catalog product.
+    sku and name are required (numbers are taken as text); price must be a finite,
+    non-negative number when present. Empty CSV cells are dropped.
+    """
+    if not isinstance(row, dict):
+        raise InvalidProduct(f"row is not an object: {type(row).__name__}")
+    product = {}
+    for key, value in row.items():
+        if key is None:
+            raise InvalidProduct("more cells than header columns")
+        key = key.strip()
+        if isinstance(value, str):
+            value = value.strip()
+        if key and value not in (None, ""):
+            product[key] = value
+
+    for field in ("sku", "name"):
+        value = product.get(field)
+        if value is None:
+            raise InvalidProduct(f"missing {field}")
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = product[field] = str(value)  # JSON feeds with numeric SKUs
+        if not isinstance(value, str):
+            raise InvalidProduct(f"bad {field} {value!r}")
+    if "price" in product:
+        try:
+            price = float(product["price"])
+        except (TypeError, ValueError):
+            raise InvalidProduct(f"bad price {product['price']!r}")
+        if price < 0 or not math.isfinite(price):
+            raise InvalidProduct(f"bad price {product['price']!r}")
+        product["price"] = int(price) if price.is_integer() else price
+    return product
+
+
+def encode_product(product):
+    """Canonical JSON (stored as-is) and its sha1, which is what the diff compares."""
+    data = json.dumps(product, sort_keys=True, separators=(",", ":"))
+    return data, hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class CatalogStore:
+    """
+    Compact on-disk catalog (SQLite, WAL) keyed by SKU.
+
+    Imports stream through in batches inside one transaction: readers keep seeing
+    the previous catalog until the import commits, and the `version` in meta only
+    changes when some product actually changed.
+    """
+
+    def __init__(self, db_path=CATALOG_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def version(self):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else ""
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def iter_products(self):
+        """Streams every product (insertion order) without building the list in SQLite's memory."""
+        for (data,) in self._conn().execute("SELECT data FROM products ORDER BY rowid"):
+            yield json.loads(data)
+
+    def import_rows(self, rows, full=False, dry_run=False, batch_size=IMPORT_BATCH_SIZE, on_change=None):
+        """
+        Upserts feed rows (an iterable of dicts) and returns a report dict.
+
+        - full: the feed is the whole catalog, so SKUs missing from it are deleted
+        - dry_run: compute the diff, then roll back
+        - on_change(op, sku, fields): called per insert / update / delete, `fields`
+          being the changed keys of an update
+
+        `duplicates` counts rows whose SKU already appeared earlier in the feed (in any
+        batch); the last occurrence wins.
+        """
+        conn = self._conn()
+        started = time.perf_counter()
+        report = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0,
+                  "invalid": 0, "duplicates": 0, "errors": []}
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (sku TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM seen")
+
+            batch = {}
+            for line_no, row in enumerate(rows, start=1):
+                report["rows"] += 1
+                try:
+                    product = normalize_product(row)
+                except InvalidProduct as e:
+                    report["invalid"] += 1
+                    if len(report["errors"]) < 20:
+                        report["errors"].append(f"row {line_no}: {e}")
+                    continue
+                if product["sku"] in batch:
+                    report["duplicates"] += 1
+                batch[product["sku"]] = product
+                if len(batch) >= batch_size:
+                    self._apply_batch(conn, batch, report, on_change)
+                    batch = {}
+            if batch:
+                self._apply_batch(conn, batch, report, on_change)
+
+            if full:
+                self._delete_unseen(conn, report, on_change)
+
+            changed = report["inserted"] + report["updated"] + report["deleted"]
+            if changed:
+                version = hashlib.sha256(f"{self.version()}:{time.time_ns()}:{changed}".encode()).hexdigest()[:16]
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+            conn.execute("DELETE FROM seen")
+            conn.execute("ROLLBACK" if dry_run else "COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        elapsed = time.perf_counter() - started
+        report["elapsed_s"] = round(elapsed, 3)
+        report["rows_per_sec"] = round(report["rows"] / elapsed) if elapsed else 0
+        report["version"] = self.version()
+        report["dry_run"] = dry_run
+        return report
+
+    def _apply_batch(self, conn, batch, report, on_change):
+        skus = list(batch)
+        cursor = conn.executemany("INSERT OR IGNORE INTO seen (sku) VALUES (?)", ((sku,) for sku in skus))
+        # SKUs an earlier batch already had (repeats within this batch were counted while filling it)
+        report["duplicates"] += len(skus) - cursor.rowcount
+
+        existing = {}
+        # SQLite caps bound parameters per statement; 500 keeps us well below it
+        for i in range(0, len(skus), 500):
+            chunk = skus[i:i + 500]
+            columns = "sku, hash, data" if on_change else "sku, hash"
+            sql = f"SELECT {columns} FROM products WHERE sku IN ({','.join('?' * len(chunk))})"
+            for row in conn.execute(sql, chunk):
+                existing[row[0]] = row[1:]
+
+        now = time.time()
+        upserts = []
+        for sku, product in batch.items():
+            data, digest = encode_product(product)
+            old = existing.get(sku)
+            if old is not None and old[0] == digest:
+                report["unchanged"] += 1
+                continue
+            if old is None:
+                report["inserted"] += 1
+                if on_change:
+                    on_change("insert", sku, None)
+            else:
+                report["updated"] += 1
+                if on_change:
+                    before = json.loads(old[1])
+                    fields = sorted(k for k in set(before) | set(product) if before.get(k) != product.get(k))
+                    on_change("update", sku, fields)
+            upserts.append((
+                sku, product["name"], product.get("brand"), product.get("category"), product.get("price"),
+                data, digest, now,
+            ))
+
+        conn.executemany(
+            "INSERT INTO products (sku, name, brand, category, price, data, hash, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(sku) DO UPDATE SET name = excluded.name, brand = excluded.brand, "
+            "category = excluded.category, price = excluded.price, data = excluded.data, "
+            "hash = excluded.hash, updated_at = excluded.updated_at",
+            upserts,
+        )
+
+    def _delete_unseen(self, conn, report, on_change):
+        if on_change:
+            for (sku,) in conn.execute("SELECT sku FROM products WHERE sku NOT IN (SELECT sku FROM seen)"):
+                on_change("delete", sku, None)
+        cursor = conn.execute("DELETE FROM products WHERE sku NOT IN (SELECT sku FROM seen)")
+        report["deleted"] += cursor.rowcount
+
+    def stats(self):
+        return {"db_path": self.db_path, "products": self.count(), "version": self.version()}
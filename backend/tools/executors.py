@@ -0,0 +1,73 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Blocking I/O (files, counters, image decoding) runs here
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "16"))
+
+# CPU-bound PDF rendering runs here. "process" uses every core (workers stay warm
+# between jobs), "thread" is lighter for small deployments.
+RENDER_POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", str(os.cpu_count() or 2)))
+RENDER_POOL_KIND = os.getenv("RENDER_POOL_KIND", "process")
+
+_io_pool = None
+_render_pool = None
+_lock = threading.Lock()
+
+
+def io_pool():
+    global _io_pool
+    if _io_pool is None:
+        with _lock:
+            if _io_pool is None:
+                _io_pool = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="io")
+    return _io_pool
+
+
+def render_pool():
+    global _render_pool
+    if _render_pool is None:
+        with _lock:
+            if _render_pool is None:
+                if RENDER_POOL_KIND == "process":
+                    # spawn: never fork a process that already runs threads / an event loop
+                    _render_pool = ProcessPoolExecutor(
+                        max_workers=RENDER_POOL_SIZE,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    _render_pool = ThreadPoolExecutor(max_workers=RENDER_POOL_SIZE, thread_name_prefix="render")
+    return _render_pool
+
+
+async def run_io(fn, *args, **kwargs):
+    """Runs a blocking call on the I/O pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_render(fn, *args, **kwargs):
+    """Runs a CPU-heavy call (PDF rendering) on the bounded render pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(render_pool(), functools.partial(fn, *args, **kwargs))
+
+
+def pool_stats():
+    return {
+        "io_pool_size": IO_POOL_SIZE,
+        "render_pool_size": RENDER_POOL_SIZE,
+        "render_pool_kind": RENDER_POOL_KIND,
+    }
+
+
+def shutdown():
+    global _io_pool, _render_pool
+    with _lock:
+        for pool in (_io_pool, _render_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        _io_pool = None
+        _render_pool = None
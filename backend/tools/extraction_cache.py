@@ -0,0 +1,240 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from tools.executors import run_io
+from tools.shared_state import get_shared_state
+
+EXTRACTION_CACHE_ENTRIES = int(os.getenv("EXTRACTION_CACHE_ENTRIES", "5000"))
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", str(7 * 86400)))
+# Append-only JSONL log replayed at startup; empty string keeps the cache in memory only
+EXTRACTION_CACHE_FILE = os.getenv("EXTRACTION_CACHE_FILE", os.path.join("storage", "extraction_cache.jsonl"))
+# Second tier in tools.shared_state, so a prompt extracted by one worker / instance is a hit on all
+EXTRACTION_CACHE_SHARED = os.getenv("EXTRACTION_CACHE_SHARED", "1") == "1"
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    """
+    Only whitespace is collapsed: case and spelling end up in the extraction
+    ("ACME corp" vs "Acme Corp" is the customer name the quote shows).
+    """
+    return _SPACE_RE.sub(" ", prompt or "").strip()
+
+
+def prompt_key(prompt, model_name, prompt_version=""):
+    """Cache key; `prompt_version` identifies the system prompt the extraction was made with."""
+    raw = f"{model_name}\n{prompt_version}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """
+    LRU + TTL cache of LLM extraction results keyed by normalized prompt.
+
+    Concurrent misses for the same key share one upstream call, and new entries
+    are appended to a JSONL file so the cache survives restarts (compacted on load).
+    With a shared tier, async lookups that miss locally check shared state before
+    calling upstream, and new results are published there. Only successful
+    extractions should be stored.
+    """
+
+    def __init__(self, max_entries=EXTRACTION_CACHE_ENTRIES, ttl=EXTRACTION_CACHE_TTL,
+                 path=EXTRACTION_CACHE_FILE, shared=None, use_shared=EXTRACTION_CACHE_SHARED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path or None
+        self._shared = shared
+        self.use_shared = use_shared or shared is not None
+        self._items = OrderedDict()  # key -> (value, stored_at)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_hits = 0
+        self.shared_errors = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_ms_total = 0.0
+        self.upstream_ms_max = 0.0
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    def load(self):
+        """Replays the JSONL log once (called lazily, or at startup off the event loop)."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.path or not os.path.exists(self.path):
+                return
+            now = time.time()
+            lines = 0
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if now - record["stored_at"] <= self.ttl:
+                        self._items[record["key"]] = (record["value"], record["stored_at"])
+                        self._items.move_to_end(record["key"])
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+            if lines > 2 * max(len(self._items), 1):
+                self._compact()
+            print(f"Extraction cache: {len(self._items)} entries loaded from {self.path}")
+
+    def _compact(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (value, stored_at) in self._items.items():
+                f.write(json.dumps({"key": key, "value": value, "stored_at": stored_at}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _append(self, key, value, stored_at):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "value": value, "stored_at": stored_at}) + "\n")
+        except OSError as e:
+            print(f"Extraction cache write failed: {e}")
+
+    # --------------------------------------------------
+    # Lookup
+    # --------------------------------------------------
+    def get(self, key):
+        """Returns a copy of the cached value, or None."""
+        self.load()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+        return copy.deepcopy(entry[0])
+
+    def put(self, key, value, persist=True):
+        """Stores `value`; with persist, also appends it to the JSONL log (blocking file write)."""
+        stored_at = self._store(key, value)
+        if persist:
+            self._append(key, value, stored_at)
+
+    def _store(self, key, value):
+        self.load()
+        stored_at = time.time()
+        with self._lock:
+            self._items[key] = (copy.deepcopy(value), stored_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return stored_at
+
+    def record_lookup(self, hit):
+        """Counts a hit or miss; extract() calls this from request threads."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # --------------------------------------------------
+    # Shared tier (blocking: call through run_io)
+    # --------------------------------------------------
+    def _shared_get(self, key):
+        try:
+            raw = (self._shared or get_shared_state()).get("extract:" + key)
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Shared extraction cache read failed: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def _shared_put(self, key, value):
+        try:
+            (self._shared or get_shared_state()).set("extract:" + key, json.dumps(value), ttl=self.ttl)
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Shared extraction cache write failed: {e}")
+
+    def record_upstream(self, elapsed_ms, ok):
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_errors += 0 if ok else 1
+            self.upstream_ms_total += elapsed_ms
+            self.upstream_ms_max = max(self.upstream_ms_max, elapsed_ms)
+
+    async def get_or_load(self, key, load):
+        """
+        Cached value for `key`, else awaits `load()` (shared by concurrent callers)
+        and caches its result. Exceptions from `load` propagate and are not cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.record_lookup(hit=True)
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.record_lookup(hit=False)
+            task = asyncio.ensure_future(self._load_and_store(key, load))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _load_and_store(self, key, load):
+        if self.use_shared:
+            value = await run_io(self._shared_get, key)
+            if value is not None:
+                self.shared_hits += 1
+                self._store(key, value)
+                return value
+        value = await load()
+        stored_at = self._store(key, value)
+        # The JSONL append is a blocking file write: keep it off the event loop
+        await run_io(self._append, key, value, stored_at)
+        if self.use_shared:
+            await run_io(self._shared_put, key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            calls = self.upstream_calls
+            return {
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "shared_hits": self.shared_hits,
+                "shared_errors": self.shared_errors,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "upstream_calls": self.upstream_calls,
+                "upstream_errors": self.upstream_errors,
+                "upstream_avg_ms": round(self.upstream_ms_total / calls, 2) if calls else 0.0,
+                "upstream_max_ms": round(self.upstream_ms_max, 2),
+                "persisted_to": self.path,
+            }
+
+
+extraction_cache = ExtractionCache()
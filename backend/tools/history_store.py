@@ -0,0 +1,184 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tools.pdf_storage import get_pdf_storage
+
+# Quotation metadata index: shared by the workers of one host, but each host/instance keeps its own
+# (local disk only, SQLite WAL doesn't work over network filesystems). /history flags this with SHARED_STATE=redis.
+HISTORY_DB = os.getenv("HISTORY_DB", os.path.join("storage", "history.db"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotations (
+    invoice_no    TEXT PRIMARY KEY,
+    filename      TEXT NOT NULL,
+    customer_name TEXT,
+    customer_key  TEXT,
+    subtotal      REAL,
+    grand_total   REAL,
+    item_count    INTEGER,
+    created_at    REAL NOT NULL,
+    file_size     INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_quotations_created ON quotations (created_at DESC, invoice_no DESC);
+CREATE INDEX IF NOT EXISTS idx_quotations_customer ON quotations (customer_key, created_at DESC, invoice_no DESC);
+CREATE INDEX IF NOT EXISTS idx_quotations_total ON quotations (grand_total);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def encode_cursor(created_at, invoice_no):
+    raw = json.dumps([created_at, invoice_no]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, invoice_no) or raises ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, invoice_no = json.loads(raw)
+        return float(created_at), str(invoice_no)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class HistoryStore:
+    """
+    Metadata index of generated quotations, written at finalize time.
+
+    Queries page with a keyset cursor on (created_at, invoice_no), so each page is
+    an index range scan whatever the archive size. Existing PDFs are backfilled
+    (from file name + mtime) the first time the database is opened.
+    """
+
+    def __init__(self, db_path=HISTORY_DB, storage=None):
+        self.db_path = db_path
+        self.storage = storage
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL: readers never block the writer (several workers share the file)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    conn.executescript(SCHEMA)
+                    self._backfill(conn)
+                    self._ready = True
+        return conn
+
+    def _backfill(self, conn):
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+            return
+        started = time.perf_counter()
+        rows = []
+        for pdf in (self.storage or get_pdf_storage()).iter_objects():
+            rows.append((os.path.splitext(pdf.name)[0], pdf.name, pdf.mtime, pdf.size))
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO quotations (invoice_no, filename, created_at, file_size) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', ?)", (str(time.time()),))
+        if rows:
+            print(f"History index: backfilled {len(rows)} PDFs in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    # --------------------------------------------------
+    # Writes
+    # --------------------------------------------------
+    def record(self, invoice_no, filename, customer_name=None, subtotal=None, grand_total=None,
+               item_count=None, file_size=None, created_at=None):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quotations "
+                "(invoice_no, filename, customer_name, customer_key, subtotal, grand_total, item_count, created_at, file_size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (invoice_no, filename, customer_name, (customer_name or "").strip().lower() or None,
+                 subtotal, grand_total, item_count, created_at or time.time(), file_size),
+            )
+
+    def delete(self, filename):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM quotations WHERE filename = ?", (filename,))
+
+    # --------------------------------------------------
+    # Queries
+    # --------------------------------------------------
+    def query(self, limit=HISTORY_PAGE_SIZE, cursor=None, customer=None, date_from=None, date_to=None,
+              min_total=None, max_total=None):
+        """
+        Returns (rows, next_cursor), newest first. `customer` is a case-insensitive
+        prefix; dates are epoch seconds (date_to exclusive); totals are inclusive.
+        """
+        limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+        where, params = [], []
+
+        if customer:
+            prefix = customer.strip().lower()
+            # Range instead of LIKE so the customer index is used
+            where.append("customer_key >= ? AND customer_key < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+        if date_from is not None:
+            where.append("created_at >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            where.append("created_at < ?")
+            params.append(date_to)
+        if min_total is not None:
+            where.append("grand_total >= ?")
+            params.append(min_total)
+        if max_total is not None:
+            where.append("grand_total <= ?")
+            params.append(max_total)
+        if cursor:
+            created_at, invoice_no = decode_cursor(cursor)
+            where.append("(created_at < ? OR (created_at = ? AND invoice_no < ?))")
+            params += [created_at, created_at, invoice_no]
+
+        sql = "SELECT * FROM quotations"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, invoice_no DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = [dict(r) for r in self._conn().execute(sql, params)]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["invoice_no"])
+        for row in rows:
+            row.pop("customer_key", None)
+        return rows, next_cursor
+
+    def stats(self):
+        count = self._conn().execute("SELECT COUNT(*) FROM quotations").fetchone()[0]
+        return {"entries": count, "db_path": self.db_path}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
@@ -1,34 +1,43 @@
 import json
-import os
 from datetime import datetime
 
+from tools.shared_state import get_shared_state
+
+# Pre-shared-state counter file; only read to carry today's sequence over on upgrade
 COUNTER_FILE = "data/invoice_counter.json"
+_legacy_sequences = {}
 
-def get_next_invoice_number():
-    # Default structure if file doesn't exist
-    data = {"date": "", "sequence": 0}
-    
-    # Read existing counter
-    if os.path.exists(COUNTER_FILE):
-        with open(COUNTER_FILE, "r") as f:
-            try:
+
+def _legacy_sequence(today_str):
+    """Today's sequence from the old counter file (0 if absent or from another day); read once per day."""
+    if today_str not in _legacy_sequences:
+        try:
+            with open(COUNTER_FILE, "r") as f:
                 data = json.load(f)
-            except:
-                pass
+        except (OSError, ValueError):
+            data = {}
+        _legacy_sequences[today_str] = data.get("sequence", 0) if data.get("date") == today_str else 0
+    return _legacy_sequences[today_str]
 
-    today_str = datetime.now().strftime("%Y%m%d")
 
-    # Reset sequence if it's a new day
-    if data["date"] != today_str:
-        data["date"] = today_str
-        data["sequence"] = 1
-    else:
-        data["sequence"] += 1
+def reserve_invoice_numbers(count, state=None):
+    """
+    Allocates `count` consecutive invoice numbers with a single counter update.
+    The per-day counter lives in shared state, so it is safe across threads,
+    uvicorn workers (SHARED_STATE=sqlite, one host) and instances (SHARED_STATE=redis).
+    """
+    if count < 1:
+        return []
 
-    # Save new state
-    os.makedirs("data", exist_ok=True)
-    with open(COUNTER_FILE, "w") as f:
-        json.dump(data, f)
+    state = state or get_shared_state()
+    today_str = datetime.now().strftime("%Y%m%d")
+    # A new day is a new counter key, so the sequence restarts at 1
+    last = state.incr(f"invoice:{today_str}", count, initial=_legacy_sequence(today_str))
+    first = last - count + 1
 
     # Format: SQ-20251130-0001
-    return f"SQ-{today_str}-{data['sequence']:04d}"
\ No newline at end of file
+    return [f"SQ-{today_str}-{seq:04d}" for seq in range(first, first + count)]
+
+
+def get_next_invoice_number():
+    return reserve_invoice_numbers(1)[0]
@@ -1,11 +1,13 @@
-import json
-import os
+from tools.catalog import get_catalog
 
 class JSONLookupTool:
-    def __init__(self):
-        self.data_path = os.path.join("data", "products.json")
-        with open(self.data_path, "r", encoding="utf-8") as f:
-            self.products_db = json.load(f)["products"]
+    def __init__(self, catalog=None):
+        self.catalog = catalog or get_catalog()
+        self.data_path = self.catalog.data_path
+
+    @property
+    def products_db(self):
+        return self.catalog.products
 
     def find_by_keyword(self, keyword: str):
         """
@@ -0,0 +1,228 @@
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Set METRICS_ENABLED=0 to turn stage timing, counters and Server-Timing headers into no-ops
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Server-Timing exposes internal stage names to clients; on by default (same-team frontend)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "1") == "1"
+
+# Seconds; covers a 0.1ms local parse up to a slow multi-retry Gemini call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage timings of the current request (read by ServerTimingMiddleware)
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple([labels.get(n, "") for n in self.label_names])
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(n, "") for n in self.label_names), 0)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple([labels.get(n, "") for n in self.label_names])
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += seconds
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(n, "") for n in self.label_names))
+        return sum(series[0]) if series else 0
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.label_names + ("le",), key + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {total:.6f}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# --------------------------------------------------
+# Pipeline metrics
+# --------------------------------------------------
+stage_seconds = Histogram("quotation_stage_seconds", "Time spent per quotation pipeline stage", labels=("stage",))
+http_seconds = Histogram("http_request_duration_seconds", "HTTP request latency", labels=("method", "route", "status"))
+events = Counter("quotation_events_total", "Pipeline events (cache hits, Gemini errors, unmatched items, ...)",
+                 labels=("event",))
+
+_collectors = []
+
+
+def register_collector(name, fn):
+    """
+    `fn()` returns a flat dict of numbers, exposed as `<name>_<key>` gauges at scrape
+    time (lets existing stats() counters show up without double bookkeeping).
+    """
+    _collectors.append((name, fn))
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoopStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name):
+    """`with stage("pricing"): ...` times the block into the stage histogram and Server-Timing."""
+    return _Stage(name) if METRICS_ENABLED else _NOOP_STAGE
+
+
+def record_stage(name, seconds):
+    """Records a duration measured elsewhere (e.g. by a render worker)."""
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def count(event, amount=1):
+    if METRICS_ENABLED:
+        events.inc(amount, event=event)
+
+
+def render_prometheus():
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in (stage_seconds, http_seconds, events):
+        lines.extend(metric.expose())
+    for prefix, fn in _collectors:
+        try:
+            values = fn()
+        except Exception as e:
+            print(f"Metrics collector {prefix} failed: {e}")
+            continue
+        for key, value in values.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def server_timing_header(timings, total_seconds):
+    """`stage;dur=ms` entries (repeated stages are summed), plus the total."""
+    merged = {}
+    for name, seconds in timings:
+        merged[name] = merged.get(name, 0.0) + seconds
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in merged.items()]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: collects the request's stage timings, adds a
+    Server-Timing header and records request latency per route. Streaming
+    responses only carry the stages finished before their headers went out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = []
+        token = _request_timings.set(timings)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    header = server_timing_header(timings, time.perf_counter() - started)
+                    message = dict(message, headers=list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))
+                    ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # Route template, not the raw path, so /pdf/<file> doesn't explode the label set
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_seconds.observe(time.perf_counter() - started, method=scope["method"], route=route,
+                                 status=status["code"])
@@ -0,0 +1,42 @@
+"""
+One PDF lifecycle pass outside the server (the API also runs it every
+PDF_COMPACTION_INTERVAL seconds). Run from the backend/ folder:
+
+    python -m tools.pdf_compaction                        # PDF_ARCHIVE_AFTER_DAYS / PDF_RETENTION_DAYS
+    python -m tools.pdf_compaction --archive-after 7 --retention 365
+
+Moves pre-sharding flat files into their day shard, gzips PDFs older than
+--archive-after days into the cold tier and deletes (with their history rows)
+PDFs older than --retention days. A running server notices the deletions on its own:
+its render cache checks that a PDF still exists before replaying it.
+"""
+import argparse
+import json
+import sys
+
+from tools.history_store import get_history_store
+from tools.pdf_storage import PDF_ARCHIVE_AFTER_DAYS, PDF_RETENTION_DAYS, compact, get_pdf_storage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--archive-after", type=float, default=PDF_ARCHIVE_AFTER_DAYS, help="days, 0 disables")
+    parser.add_argument("--retention", type=float, default=PDF_RETENTION_DAYS, help="days, 0 keeps PDFs forever")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    storage = get_pdf_storage()
+    history = get_history_store()
+    report = compact(storage, archive_after_days=args.archive_after, retention_days=args.retention,
+                     on_delete=history.delete)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{storage.kind} storage: scanned {report['scanned']}, relocated {report['relocated']}, "
+              f"archived {report['archived']} ({report['bytes_saved'] / 1024:.0f} KiB saved), "
+              f"deleted {report['deleted']}, errors {report['errors']} in {report['elapsed_s']}s")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,187 @@
 import os
-import requests
+import re
+import hashlib
+import httpx
 import base64
+import threading
+import time
 from io import BytesIO
-from PIL import Image
-from weasyprint import HTML, CSS
-from weasyprint.text.fonts import FontConfiguration
+
+from tools.thumbnail_cache import LRUBytesCache, ThumbnailCache
+
+# PIL, requests and WeasyPrint are imported on first use, not at startup: the API
+# process never lays out a PDF (render workers do), and cold starts skip ~1s of imports
+
+IMAGE_HEADERS = {'User-Agent': 'Mozilla/5.0'}  # Fake a browser user agent
+IMAGE_TIMEOUT = 5
+STYLESHEET_PATH = os.path.join("templates", "quotation_template.css")
+
+_async_client = None
+
+def get_async_client():
+    """Shared async HTTP client (connection pooling across requests)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(headers=IMAGE_HEADERS, timeout=IMAGE_TIMEOUT, follow_redirects=True)
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+# Thumbnails are shrunk to the .prod-thumb box of the template, at this pixel density
+THUMBNAIL_DENSITY = float(os.getenv("THUMBNAIL_DENSITY", "2"))
+THUMBNAIL_JPEG_QUALITY = int(os.getenv("THUMBNAIL_JPEG_QUALITY", "82"))
+
+def thumbnail_box(stylesheet_path=STYLESHEET_PATH, default=50):
+    """
+    Display size (CSS px) of .prod-thumb in the quotation stylesheet.
+    """
+    try:
+        with open(stylesheet_path, "r", encoding="utf-8") as f:
+            css = f.read()
+        block = re.search(r"\.prod-thumb\s*\{([^}]*)\}", css)
+        sizes = [int(v) for v in re.findall(r"(?:^|[;\s])(?:width|height)\s*:\s*(\d+)px", block.group(1))]
+        return max(sizes) if sizes else default
+    except (OSError, AttributeError):
+        return default
+
+THUMBNAIL_PIXELS = int(thumbnail_box() * THUMBNAIL_DENSITY)
+
+# Identical images (even from different URLs) share one data URI string
+_encoded_by_digest = LRUBytesCache(8 * 1024 * 1024)
+
+def encode_image(content, max_pixels=None):
+    """
+    Shrinks raw image bytes to the thumbnail box and returns a Base64 data URI.
+    Photos become JPEG (embedded into the PDF as-is), flat artwork becomes palette PNG,
+    whichever is smaller.
+    """
+    from PIL import Image
+
+    max_pixels = max_pixels or THUMBNAIL_PIXELS
+
+    img = Image.open(BytesIO(content))
+    img.draft("RGB", (max_pixels, max_pixels))  # cheap JPEG downscale while decoding
+    img.thumbnail((max_pixels, max_pixels), Image.LANCZOS)
+
+    # Flatten transparency onto white (the .prod-thumb background)
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buffered = BytesIO()
+    img.save(buffered, format="JPEG", quality=THUMBNAIL_JPEG_QUALITY, optimize=True)
+    best, mime = buffered.getvalue(), "image/jpeg"
+
+    if img.getcolors(256) is not None:
+        buffered = BytesIO()
+        img.quantize(256).save(buffered, format="PNG", optimize=True)
+        if len(buffered.getvalue()) < len(best):
+            best, mime = buffered.getvalue(), "image/png"
+
+    digest = hashlib.sha1(best).hexdigest()
+    existing = _encoded_by_digest.get(digest)
+    if existing is not None:
+        return existing
+
+    img_str = base64.b64encode(best).decode("utf-8")
+    data_uri = f"data:{mime};base64,{img_str}"
+    _encoded_by_digest.put(digest, data_uri)
+    return data_uri
 
 def image_to_base64(url):
     """
-    Downloads an image, converts it to PNG, and returns Base64 string.
+    Downloads an image, shrinks it to thumbnail size, and returns Base64 string.
     """
     if not url:
         return None
+    import requests
+
     try:
-        # Fake a browser user agent
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=5)
+        response = requests.get(url, headers=IMAGE_HEADERS, timeout=IMAGE_TIMEOUT)
         
         if response.status_code == 200:
-            img = Image.open(BytesIO(response.content))
-            
-            # Convert to RGB (fix for RGBA/P modes)
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-                
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-            return f"data:image/png;base64,{img_str}"
+            return encode_image(response.content)
     except Exception as e:
         print(f"Failed to process image {url}: {e}")
         return None
 
-def generate_pdf_from_html(html_content, output_path):
+# Memory + disk cache shared by every quotation in this process
+thumbnail_cache = ThumbnailCache(encoder=encode_image, client_factory=get_async_client)
+
+async def image_to_base64_async(url):
+    """
+    Non-blocking, cached image_to_base64 (repeat thumbnails cost no network I/O).
     """
-    Generates a PDF using WeasyPrint.
+    return await thumbnail_cache.get(url)
+
+async def images_to_base64_async(urls):
     """
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    Converts many images at once: cache hits are instant, misses download in parallel.
+    """
+    return await thumbnail_cache.get_many(urls)
+
+# Per-worker WeasyPrint state (fonts + parsed stylesheets), built once per thread/process
+_renderer_state = threading.local()
 
-    # Configure Fonts (Optional but good for Enterprise)
-    font_config = FontConfiguration()
+def get_renderer():
+    state = _renderer_state
+    if not hasattr(state, "font_config"):
+        from weasyprint.text.fonts import FontConfiguration
+
+        # Configure Fonts (Optional but good for Enterprise)
+        state.font_config = FontConfiguration()
+        state.stylesheets = {}  # path -> parsed CSS, each parsed on first use
+    return state
+
+def parsed_stylesheets(renderer, paths):
+    from weasyprint import CSS
+
+    parsed = []
+    for path in paths:
+        css = renderer.stylesheets.get(path)
+        if css is None:
+            css = renderer.stylesheets[path] = CSS(filename=path, font_config=renderer.font_config)
+        parsed.append(css)
+    return parsed
+
+def generate_pdf_from_html(html_content, output_path=None, timings=None, stylesheets=(STYLESHEET_PATH,)):
+    """
+    Generates a PDF using WeasyPrint, styled by the `stylesheets` files.
+    Writes to `output_path`, or returns the PDF bytes when no path is given.
+    Pass a dict as `timings` to get layout_ms / write_ms back.
+    """
+    from weasyprint import HTML
+
+    renderer = get_renderer()
 
     # Render PDF
     # WeasyPrint handles modern CSS perfectly.
-    html = HTML(string=html_content)
-    html.write_pdf(
-        output_path, 
-        font_config=font_config,
+    started = time.perf_counter()
+    document = HTML(string=html_content).render(
+        stylesheets=parsed_stylesheets(renderer, stylesheets),
+        font_config=renderer.font_config,
         presentational_hints=True
     )
+    laid_out = time.perf_counter()
+
+    if output_path is None:
+        result = document.write_pdf()
+    else:
+        # Ensure directory exists
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        document.write_pdf(output_path)
+        result = output_path
+
+    if timings is not None:
+        timings["layout_ms"] = (laid_out - started) * 1000
+        timings["write_ms"] = (time.perf_counter() - laid_out) * 1000
 
-    return output_path
\ No newline at end of file
+    return result
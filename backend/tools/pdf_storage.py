@@ -0,0 +1,426 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+# "local" (storage/pdfs on disk) or "s3" (any S3-compatible service, needs boto3)
+PDF_STORAGE = os.getenv("PDF_STORAGE", "local").lower()
+PDF_DIR = os.getenv("PDF_DIR", os.path.join("storage", "pdfs"))
+PDF_S3_BUCKET = os.getenv("PDF_S3_BUCKET", "")
+PDF_S3_PREFIX = os.getenv("PDF_S3_PREFIX", "pdfs/")
+# MinIO / localstack / benchmarks.stub_s3_server; empty means AWS
+PDF_S3_ENDPOINT = os.getenv("PDF_S3_ENDPOINT", "") or None
+# Storage class for archived objects, e.g. STANDARD_IA (empty keeps the bucket default)
+PDF_S3_COLD_CLASS = os.getenv("PDF_S3_COLD_CLASS", "")
+
+# Lifecycle, applied by the compaction job (0 disables either step):
+# PDFs older than ARCHIVE_AFTER move to the gzip cold tier, older than RETENTION are deleted
+PDF_ARCHIVE_AFTER_DAYS = float(os.getenv("PDF_ARCHIVE_AFTER_DAYS", "30"))
+PDF_RETENTION_DAYS = float(os.getenv("PDF_RETENTION_DAYS", "0"))
+PDF_COMPACTION_INTERVAL = int(os.getenv("PDF_COMPACTION_INTERVAL", "3600"))
+
+COLD_SUFFIX = ".gz"
+# SQ-20251130-0001.pdf -> 2025/11/30/SQ-20251130-0001.pdf
+_DATED_NAME = re.compile(r"-(\d{4})(\d{2})(\d{2})-")
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def shard_for(name):
+    """
+    Directory (key prefix) of a PDF. Invoice PDFs are sharded per day, so listings
+    stay a day's worth of files and the compaction job can skip recent days
+    without opening them; anything else is spread over 256 hash buckets.
+    """
+    match = _DATED_NAME.search(name)
+    if match:
+        return "/".join(match.groups())
+    return "misc/" + hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+
+
+def _shard_date(shard):
+    """Day of a dated shard as a timestamp (start of day), None for hash buckets."""
+    try:
+        return datetime.strptime(shard, "%Y/%m/%d").timestamp()
+    except ValueError:
+        return None
+
+
+def check_name(name):
+    name = os.path.basename(name)
+    if not _SAFE_NAME.match(name) or name.endswith(COLD_SUFFIX):
+        raise FileNotFoundError(name)
+    return name
+
+
+class StoredPdf:
+    __slots__ = ("name", "size", "mtime", "tier", "path")
+
+    def __init__(self, name, size, mtime, tier="hot", path=None):
+        self.name = name
+        self.size = size    # stored size (compressed for the cold tier)
+        self.mtime = mtime
+        self.tier = tier    # "hot" or "cold"
+        self.path = path    # local file that can be served as-is (hot local PDFs only)
+
+    @property
+    def etag(self):
+        return f'"{self.size:x}-{int(self.mtime * 1e9):x}"'
+
+
+class LocalPdfStorage:
+    """
+    PDFs on the local filesystem under day shards (see shard_for).
+
+    Writes are write-then-rename. Cold PDFs are `<name>.gz` next to where the PDF
+    was; files left flat in the root by older versions are still found, and the
+    compaction job moves them into their shard.
+    """
+
+    kind = "local"
+
+    def __init__(self, root=PDF_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, name):
+        return os.path.join(self.root, *shard_for(name).split("/"), name)
+
+    def direct_path(self, name):
+        """Where a render worker may write the PDF itself (saves shipping the bytes back)."""
+        return self.path_for(check_name(name))
+
+    def put(self, name, data):
+        _write_atomic(self.path_for(check_name(name)), data)
+
+    def stat(self, name):
+        name = check_name(name)
+        for path, tier in self._candidates(name):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            return StoredPdf(name, st.st_size, st.st_mtime, tier, path if tier == "hot" else None)
+        return None
+
+    def get(self, name):
+        name = check_name(name)
+        for path, tier in self._candidates(name):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            return gzip.decompress(data) if tier == "cold" else data
+        raise FileNotFoundError(name)
+
+    def delete(self, name):
+        name = check_name(name)
+        deleted = False
+        for path, _ in self._candidates(name):
+            try:
+                os.remove(path)
+                deleted = True
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def _candidates(self, name):
+        path = self.path_for(name)
+        return [
+            (path, "hot"),
+            (path + COLD_SUFFIX, "cold"),
+            (os.path.join(self.root, name), "hot"),  # pre-sharding flat layout
+        ]
+
+    def iter_objects(self, older_than=None):
+        """
+        Yields StoredPdf for every stored PDF. With `older_than` (epoch seconds),
+        day shards that start after it are not listed at all.
+        """
+        for entry in _scandir(self.root):
+            if entry.is_file():
+                yield from self._stored(entry, legacy=True)
+        for year in _scandir(self.root):
+            if not year.is_dir():
+                continue
+            if year.name == "misc":
+                for bucket in _scandir(year.path):
+                    for entry in _scandir(bucket.path):
+                        yield from self._stored(entry)
+                continue
+            for month in _scandir(year.path):
+                for day in _scandir(month.path):
+                    shard = f"{year.name}/{month.name}/{day.name}"
+                    shard_date = _shard_date(shard)
+                    if older_than is not None and shard_date is not None and shard_date > older_than:
+                        continue
+                    for entry in _scandir(day.path):
+                        yield from self._stored(entry)
+
+    def _stored(self, entry, legacy=False):
+        if entry.name.endswith(".pdf"):
+            tier, name = "hot", entry.name
+        elif entry.name.endswith(".pdf" + COLD_SUFFIX) and not legacy:
+            tier, name = "cold", entry.name[:-len(COLD_SUFFIX)]
+        else:
+            return
+        try:
+            st = entry.stat()
+        except OSError:
+            return
+        yield StoredPdf(name, st.st_size, st.st_mtime, tier, entry.path if tier == "hot" else None)
+
+    def archive(self, pdf):
+        """Moves a hot PDF to the cold tier (gzip); returns the bytes saved."""
+        with open(pdf.path, "rb") as f:
+            data = f.read()
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+        target = self.path_for(pdf.name) + COLD_SUFFIX
+        _write_atomic(target, packed)
+        os.utime(target, (pdf.mtime, pdf.mtime))  # age keeps counting from creation
+        os.remove(pdf.path)
+        return len(data) - len(packed)
+
+    def relocate(self, pdf):
+        """Moves a flat (pre-sharding) file into its shard; True if it moved."""
+        target = self.path_for(pdf.name)
+        if pdf.path is None or os.path.abspath(pdf.path) == os.path.abspath(target):
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(pdf.path, target)
+        pdf.path = target
+        return True
+
+    def created_at(self, pdf):
+        return pdf.mtime  # archive() keeps the original mtime
+
+    def remove(self, pdf):
+        path = pdf.path or self.path_for(pdf.name) + COLD_SUFFIX
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        # Drop shard directories retention emptied, so listings don't walk dead days
+        parent = os.path.dirname(path)
+        while os.path.abspath(parent) != os.path.abspath(self.root):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    @property
+    def errors(self):
+        """Exceptions a storage call can raise for one object (see compact())."""
+        return (OSError,)
+
+    def stats(self):
+        return {"backend": self.kind, "root": self.root}
+
+
+class S3PdfStorage:
+    """
+    PDFs in an S3-compatible bucket, keyed `<prefix><shard>/<name>`; cold objects
+    are gzipped `<name>.gz` (optionally in a cheaper storage class). boto3 is only
+    needed when this backend is selected.
+    """
+
+    kind = "s3"
+
+    def __init__(self, bucket=PDF_S3_BUCKET, prefix=PDF_S3_PREFIX, endpoint_url=PDF_S3_ENDPOINT,
+                 cold_class=PDF_S3_COLD_CLASS, client=None):
+        if not bucket:
+            raise RuntimeError("PDF_STORAGE=s3 needs PDF_S3_BUCKET")
+        if client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError:
+                raise RuntimeError("PDF_STORAGE=s3 needs boto3 (pip install boto3)")
+            # Self-hosted S3 (MinIO, stand-ins) generally only speaks path-style URLs
+            config = Config(s3={"addressing_style": "path"}) if endpoint_url else None
+            client = boto3.client("s3", endpoint_url=endpoint_url, config=config)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cold_class = cold_class
+
+    def key_for(self, name):
+        return f"{self.prefix}{shard_for(name)}/{name}"
+
+    def direct_path(self, name):
+        return None  # render workers hand the bytes back; put() uploads them
+
+    def put(self, name, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.key_for(check_name(name)), Body=data,
+                               ContentType="application/pdf")
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def stat(self, name):
+        name = check_name(name)
+        key = self.key_for(name)
+        for tier, candidate in (("hot", key), ("cold", key + COLD_SUFFIX)):
+            head = self._head(candidate)
+            if head is not None:
+                return StoredPdf(name, head["ContentLength"], head["LastModified"].timestamp(), tier)
+        return None
+
+    def get(self, name):
+        name = check_name(name)
+        key = self.key_for(name)
+        for tier, candidate in (("hot", key), ("cold", key + COLD_SUFFIX)):
+            try:
+                body = self.client.get_object(Bucket=self.bucket, Key=candidate)["Body"].read()
+            except self.client.exceptions.NoSuchKey:
+                continue
+            return gzip.decompress(body) if tier == "cold" else body
+        raise FileNotFoundError(name)
+
+    def delete(self, name):
+        name = check_name(name)
+        pdf = self.stat(name)
+        if pdf is None:
+            return False
+        self.remove(pdf)
+        return True
+
+    def iter_objects(self, older_than=None):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                filename = obj["Key"].rsplit("/", 1)[-1]
+                if filename.endswith(".pdf"):
+                    tier, name = "hot", filename
+                elif filename.endswith(".pdf" + COLD_SUFFIX):
+                    tier, name = "cold", filename[:-len(COLD_SUFFIX)]
+                else:
+                    continue
+                yield StoredPdf(name, obj["Size"], obj["LastModified"].timestamp(), tier)
+
+    def archive(self, pdf):
+        key = self.key_for(pdf.name)
+        data = self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+        extra = {"StorageClass": self.cold_class} if self.cold_class else {}
+        # The object's own LastModified restarts here; keep the creation time for retention
+        self.client.put_object(Bucket=self.bucket, Key=key + COLD_SUFFIX, Body=packed,
+                               ContentType="application/gzip", Metadata={"created": str(pdf.mtime)}, **extra)
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        return len(data) - len(packed)
+
+    def relocate(self, pdf):
+        return False
+
+    def created_at(self, pdf):
+        """Creation time of an object; for archived ones LastModified is the archive time."""
+        if pdf.tier == "hot":
+            return pdf.mtime
+        # Day-sharded keys already tell the creation day, no need for a HEAD per object
+        shard_date = _shard_date(shard_for(pdf.name))
+        if shard_date is not None:
+            return min(pdf.mtime, shard_date + 86400)
+        head = self._head(self.key_for(pdf.name) + COLD_SUFFIX)
+        created = (head or {}).get("Metadata", {}).get("created")
+        return float(created) if created else pdf.mtime
+
+    def remove(self, pdf):
+        key = self.key_for(pdf.name) + (COLD_SUFFIX if pdf.tier == "cold" else "")
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    @property
+    def errors(self):
+        """Exceptions a storage call can raise for one object (throttling, access denied, ...)."""
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        return (OSError, BotoCoreError, ClientError)
+
+    def stats(self):
+        return {"backend": self.kind, "bucket": self.bucket, "prefix": self.prefix,
+                "endpoint": self.client.meta.endpoint_url}
+
+
+def _scandir(path):
+    try:
+        with os.scandir(path) as it:
+            return sorted(it, key=lambda e: e.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def compact(storage, archive_after_days=PDF_ARCHIVE_AFTER_DAYS, retention_days=PDF_RETENTION_DAYS,
+            on_delete=None, now=None):
+    """
+    One lifecycle pass: moves flat legacy files into shards, gzips hot PDFs older
+    than `archive_after_days` and deletes PDFs older than `retention_days`
+    (`on_delete(name)` lets callers drop history rows / cache entries).
+    Returns a report dict.
+    """
+    now = now or time.time()
+    started = time.perf_counter()
+    report = {"scanned": 0, "archived": 0, "deleted": 0, "relocated": 0, "bytes_saved": 0, "errors": 0}
+    archive_before = now - archive_after_days * 86400 if archive_after_days > 0 else None
+    delete_before = now - retention_days * 86400 if retention_days > 0 else None
+    # Day shards newer than both cut-offs hold nothing to do (except legacy files, always listed)
+    cutoffs = [c for c in (archive_before, delete_before) if c is not None]
+    older_than = max(cutoffs) if cutoffs else None
+
+    for pdf in list(storage.iter_objects(older_than=older_than)):
+        report["scanned"] += 1
+        try:
+            if storage.relocate(pdf):
+                report["relocated"] += 1
+            created = storage.created_at(pdf)
+            if delete_before is not None and created < delete_before:
+                storage.remove(pdf)
+                report["deleted"] += 1
+                if on_delete is not None:
+                    on_delete(pdf.name)
+            elif archive_before is not None and pdf.tier == "hot" and created < archive_before:
+                report["bytes_saved"] += storage.archive(pdf)
+                report["archived"] += 1
+        except FileNotFoundError:
+            continue  # deleted meanwhile, or another worker's compaction got there first
+        except storage.errors as e:
+            # One object failing (S3 throttling, access denied, disk error) doesn't stop the pass
+            report["errors"] += 1
+            print(f"PDF compaction: {pdf.name} failed: {e}")
+    report["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_pdf_storage():
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if PDF_STORAGE == "s3":
+                    _storage = S3PdfStorage()
+                elif PDF_STORAGE == "local":
+                    _storage = LocalPdfStorage()
+                else:
+                    raise RuntimeError(f"Unknown PDF_STORAGE: {PDF_STORAGE!r} (local or s3)")
+    return _storage
@@ -0,0 +1,274 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+PRICING_RULES_PATH = os.path.join("data", "pricing_rules.json")
+# How often (seconds) we stat() the rules file to look for edits
+RULES_CHECK_INTERVAL = float(os.getenv("PRICING_RULES_CHECK_INTERVAL", "2"))
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+ONE = Decimal("1")
+HUNDRED = Decimal("100")
+
+
+class InvalidAmount(ValueError):
+    """A price or rate that is NaN, infinite or not a number."""
+
+
+def to_decimal(value, default=None):
+    """
+    Exact Decimal for ints, strings and floats (via their shortest repr, not binary value).
+    Raises InvalidAmount for NaN / Infinity, which would fail later in quantize().
+    """
+    if value is None or value == "":
+        return default
+    try:
+        amount = value if isinstance(value, Decimal) else Decimal(str(value))
+    except InvalidOperation:
+        raise InvalidAmount(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise InvalidAmount(f"Amount must be a finite number, got {value!r}")
+    return amount
+
+
+class InvalidQuantity(ValueError):
+    """A line quantity that is zero, negative or not a number."""
+
+
+def parse_quantity(value):
+    """Line quantity as an int; only a missing quantity (None) defaults to 1."""
+    if value is None:
+        return 1
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise InvalidQuantity(f"Invalid quantity: {value!r}")
+    if quantity <= 0:
+        raise InvalidQuantity(f"Quantity must be at least 1, got {value!r}")
+    return quantity
+
+
+def money(value):
+    """Rounds to cents, half-up (the way invoices are read by people)."""
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _key(text):
+    return str(text or "").strip().lower()
+
+
+class PricingRules:
+    """
+    Parsed data/pricing_rules.json.
+
+    - margins: most specific match wins: brand+category > brand > category > default
+    - quantity_tiers: discount for the highest min_qty <= line quantity
+    - customer_price_lists: per-customer fixed SKU prices and/or a blanket discount
+    """
+
+    def __init__(self, default_margin="0.10", margin_rules=(), quantity_tiers=(),
+                 customer_price_lists=None, fallback_base_price=None):
+        self.default_margin = to_decimal(default_margin, ZERO)
+        self.fallback_base_price = to_decimal(fallback_base_price)
+
+        self.by_pair, self.by_brand, self.by_category = {}, {}, {}
+        for rule in margin_rules:
+            brand, category = _key(rule.get("brand")), _key(rule.get("category"))
+            margin = to_decimal(rule["margin"])
+            if brand and category:
+                self.by_pair[(brand, category)] = margin
+            elif brand:
+                self.by_brand[brand] = margin
+            elif category:
+                self.by_category[category] = margin
+
+        tiers = sorted((int(t["min_qty"]), to_decimal(t["discount"], ZERO)) for t in quantity_tiers)
+        self.tier_thresholds = [t[0] for t in tiers]
+        self.tier_discounts = [t[1] for t in tiers]
+
+        self.customers = {}
+        for name, entry in (customer_price_lists or {}).items():
+            self.customers[_key(name)] = {
+                "discount": to_decimal(entry.get("discount"), ZERO),
+                "prices": {_key(sku): to_decimal(price) for sku, price in entry.get("prices", {}).items()},
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            default_margin=data.get("default_margin", "0.10"),
+            margin_rules=data.get("margin_rules", []),
+            quantity_tiers=data.get("quantity_tiers", []),
+            customer_price_lists=data.get("customer_price_lists", {}),
+            fallback_base_price=data.get("fallback_base_price"),
+        )
+
+    def margin(self, brand, category):
+        brand, category = _key(brand), _key(category)
+        for table, key in ((self.by_pair, (brand, category)), (self.by_brand, brand), (self.by_category, category)):
+            if key in table:
+                return table[key]
+        return self.default_margin
+
+    def tier_discount(self, quantity):
+        i = bisect_right(self.tier_thresholds, quantity)
+        return self.tier_discounts[i - 1] if i else ZERO
+
+
+class PricingEngine:
+    """
+    Single source of truth for money: line pricing (analyze step, bulk price-list
+    runs) and quote totals (finalize). All arithmetic is Decimal; results are
+    rounded to cents once per unit price and once per total.
+
+    Lines are priced column-wise: the rule lookups (margin per brand/category,
+    tier per quantity, customer list) are resolved once per distinct key in a
+    batch, then applied across the whole column.
+    """
+
+    def __init__(self, rules=None, rules_path=PRICING_RULES_PATH):
+        # Explicit rules (tests, benchmarks) are never replaced from disk
+        self.rules_path = None if rules is not None else rules_path
+        self._rules = rules
+        self._mtime_ns = None
+        self._last_check = None
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self):
+        """Current rules; the JSON file is re-read when it changes."""
+        if self.rules_path is not None:
+            now = time.monotonic()
+            if self._last_check is None or now - self._last_check >= RULES_CHECK_INTERVAL:
+                self._last_check = now
+                self._maybe_reload()
+        return self._rules or PricingRules()
+
+    def _maybe_reload(self):
+        try:
+            mtime_ns = os.stat(self.rules_path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime_ns == self._mtime_ns:
+                return
+            try:
+                with open(self.rules_path, "r", encoding="utf-8") as f:
+                    self._rules = PricingRules.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                # Keep the previous rules; a bad edit must not take pricing down
+                print(f"Pricing rules load failed ({self.rules_path}): {e}")
+            self._mtime_ns = mtime_ns
+
+    # --------------------------------------------------
+    # Line pricing
+    # --------------------------------------------------
+    def price_lines(self, products, customer=None):
+        """
+        Prices catalog products (dicts with sku, brand, category, price, quantity).
+        Returns (unit_prices, line_totals, flags) as parallel lists of Decimals / dicts.
+        Raises InvalidQuantity for a quantity below 1, InvalidAmount for a NaN / infinite price.
+        """
+        rules = self.rules
+        price_list = rules.customers.get(_key(customer)) if customer else None
+        customer_factor = ONE - price_list["discount"] if price_list else ONE
+        fixed_prices = price_list["prices"] if price_list else {}
+
+        # Columns
+        skus = [p.get("sku") for p in products]
+        quantities = [parse_quantity(p.get("quantity")) for p in products]
+        raw_bases = [p.get("price") for p in products]
+
+        # Rule resolution (and float -> Decimal conversion) once per distinct key
+        base_memo, margin_memo, tier_memo = {}, {}, {}
+        bases = []
+        for raw in raw_bases:
+            try:
+                base = base_memo[raw]
+            except KeyError:
+                base = base_memo[raw] = to_decimal(raw, rules.fallback_base_price)
+            except TypeError:  # unhashable junk; let to_decimal complain
+                base = to_decimal(raw, rules.fallback_base_price)
+            bases.append(base)
+        markups = []
+        for p in products:
+            key = (p.get("brand"), p.get("category"))
+            markup = margin_memo.get(key)
+            if markup is None:
+                markup = margin_memo[key] = ONE + rules.margin(*key)
+            markups.append(markup)
+        tier_factors = []
+        for qty in quantities:
+            factor = tier_memo.get(qty)
+            if factor is None:
+                factor = tier_memo[qty] = (ONE - rules.tier_discount(qty)) * customer_factor
+            tier_factors.append(factor)
+
+        # Unit prices repeat heavily in bulk runs (same SKU, same tier)
+        unit_memo = {}
+        unit_prices, line_totals, flags = [], [], []
+        for sku, qty, base, markup, factor in zip(skus, quantities, bases, markups, tier_factors):
+            fixed = fixed_prices.get(_key(sku)) if fixed_prices else None
+            if fixed is not None:
+                # Negotiated price: no margin or tier on top
+                unit = money(fixed)
+                flag = {"price_source": "customer_price_list"}
+            elif base is None:
+                unit = ZERO
+                flag = {"price_source": "missing"}
+            else:
+                key = (base, markup, factor)
+                unit = unit_memo.get(key)
+                if unit is None:
+                    unit = unit_memo[key] = money(base * markup * factor)
+                flag = None
+            unit_prices.append(unit)
+            line_totals.append(unit * qty)
+            flags.append(flag)
+        return unit_prices, line_totals, flags
+
+    def price_line(self, base_price, brand=None, category=None, quantity=1, customer=None, sku=None):
+        unit_prices, line_totals, _ = self.price_lines(
+            [{"sku": sku, "brand": brand, "category": category, "price": base_price, "quantity": quantity}],
+            customer=customer,
+        )
+        return unit_prices[0], line_totals[0]
+
+    # --------------------------------------------------
+    # Quote totals
+    # --------------------------------------------------
+    def quote_totals(self, lines, discount_rate=0, tax_rate=0):
+        """
+        `lines` are (unit_price, quantity) pairs as entered on the quote.
+        Returns exact Decimal line totals and subtotal / discount / tax / total.
+        Raises InvalidQuantity for a quantity below 1, InvalidAmount for a NaN / infinite amount.
+        """
+        line_totals = [money(to_decimal(unit, ZERO)) * parse_quantity(qty) for unit, qty in lines]
+        subtotal = sum(line_totals, ZERO)
+        discount_amount = money(subtotal * to_decimal(discount_rate, ZERO) / HUNDRED)
+        taxable = subtotal - discount_amount
+        tax_amount = money(taxable * to_decimal(tax_rate, ZERO) / HUNDRED)
+        return {
+            "line_totals": line_totals,
+            "subtotal": subtotal,
+            "discount_amount": discount_amount,
+            "tax_amount": tax_amount,
+            "total": taxable + tax_amount,
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_pricing_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PricingEngine()
+    return _engine
@@ -1,12 +1,19 @@
+from tools.pricing_engine import PricingEngine, PricingRules, get_pricing_engine
+
+
 class PricingTool:
-    def __init__(self, margin=0.10):
-        self.margin = margin
+    def __init__(self, margin=None, engine=None):
+        # A fixed margin overrides the rules file (no tiers or price lists then)
+        if margin is not None:
+            engine = PricingEngine(rules=PricingRules(default_margin=margin))
+        self.engine = engine or get_pricing_engine()
 
-    def calculate_price(self, base_price):
+    def calculate_price(self, base_price, brand=None, category=None, quantity=1, customer=None):
         """
-        Apply margin to base price.
+        Apply margin (and tier / customer rules) to base price.
         """
-        return base_price + (base_price * self.margin)
+        unit_price, _ = self.engine.price_line(base_price, brand, category, quantity, customer)
+        return float(unit_price)
 
     def calculate_line_total(self, unit_price, quantity):
-        return unit_price * quantity
+        return float(self.engine.quote_totals([(unit_price, quantity)])["subtotal"])
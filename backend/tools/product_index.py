@@ -0,0 +1,170 @@
+import re
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def _field(product, key):
+    # Same normalisation the linear search always used
+    return str(product.get(key, "")).lower()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProductIndex:
+    """
+    Precomputed search structures for one catalog snapshot.
+
+    - sku_exact:     lowercase SKU -> product ids (hash lookup)
+    - name_exact:    lowercase name -> product ids
+    - sku/name grams: trigram -> product ids, candidates are then verified with `in`
+    - desc tokens:   word token -> product ids for brand + short_description,
+                     plus a trigram index over the token vocabulary
+
+    find() returns exactly what the old linear scan returned: same four priority
+    tiers, catalog order inside each tier, and the same SKU de-duplication.
+    """
+
+    def __init__(self, products):
+        self.products = products
+        self.rows = []
+
+        self.sku_exact = {}
+        self.name_exact = {}
+        self.sku_grams = {}
+        self.name_grams = {}
+        self.token_postings = {}
+        self.vocab_grams = {}
+
+        for pid, product in enumerate(products):
+            p_sku = _field(product, "sku")
+            p_name = _field(product, "name")
+            p_brand = _field(product, "brand")
+            p_desc = _field(product, "short_description")
+            self.rows.append((p_sku, p_name, p_brand, p_desc))
+
+            self.sku_exact.setdefault(p_sku, []).append(pid)
+            self.name_exact.setdefault(p_name, []).append(pid)
+            for gram in _trigrams(p_sku):
+                self.sku_grams.setdefault(gram, []).append(pid)
+            for gram in _trigrams(p_name):
+                self.name_grams.setdefault(gram, []).append(pid)
+
+            for token in set(TOKEN_RE.findall(p_brand)) | set(TOKEN_RE.findall(p_desc)):
+                self.token_postings.setdefault(token, []).append(pid)
+
+        for token in self.token_postings:
+            for gram in _trigrams(token):
+                self.vocab_grams.setdefault(gram, []).append(token)
+
+    # --------------------------------------------------
+    # Candidate generation
+    # --------------------------------------------------
+    @staticmethod
+    def _intersect(postings):
+        """Intersects posting lists, smallest first. Empty if any list is missing."""
+        if any(p is None for p in postings):
+            return set()
+        postings = sorted(postings, key=len)
+        result = set(postings[0])
+        for plist in postings[1:]:
+            result.intersection_update(plist)
+            if not result:
+                break
+        return result
+
+    def _gram_candidates(self, grams_index, query):
+        return self._intersect([grams_index.get(g) for g in _trigrams(query)])
+
+    def _vocab_containing(self, token):
+        """All vocabulary tokens that contain `token` as a substring."""
+        if len(token) < 3:
+            return [v for v in self.token_postings if token in v]
+        candidates = self._intersect([self.vocab_grams.get(g) for g in _trigrams(token)])
+        return [v for v in candidates if token in v]
+
+    def _broad_candidates(self, query):
+        """
+        Any query token must sit inside some token of the brand/description text,
+        so the candidates are the intersection (over query tokens) of the postings
+        of every vocabulary token containing it.
+        """
+        tokens = set(TOKEN_RE.findall(query))
+        if not tokens:
+            return None  # e.g. punctuation-only query: caller verifies everything
+
+        result = None
+        for token in sorted(tokens, key=len, reverse=True):
+            ids = set()
+            for vocab_token in self._vocab_containing(token):
+                ids.update(self.token_postings[vocab_token])
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+    # --------------------------------------------------
+    # Search
+    # --------------------------------------------------
+    def scan(self, query_lower):
+        """Reference linear scan over the pre-lowercased fields."""
+        tiers = ([], [], [], [])
+        for pid, (p_sku, p_name, p_brand, p_desc) in enumerate(self.rows):
+            if query_lower == p_sku:
+                tiers[0].append(pid)
+            elif query_lower in p_sku:
+                tiers[1].append(pid)
+            elif query_lower in p_name:
+                tiers[2].append(pid)
+            elif query_lower in p_brand or query_lower in p_desc:
+                tiers[3].append(pid)
+        return tiers
+
+    def lookup(self, query_lower):
+        """Indexed version of scan(): returns the same four tiers of product ids."""
+        if len(query_lower) < 3:
+            # Too short for trigrams; the pre-lowercased scan is still cheap
+            return self.scan(query_lower)
+
+        rows = self.rows
+        exact = list(self.sku_exact.get(query_lower, []))
+        taken = set(exact)
+
+        partial = sorted(
+            pid for pid in self._gram_candidates(self.sku_grams, query_lower)
+            if pid not in taken and query_lower in rows[pid][0]
+        )
+        taken.update(partial)
+
+        name = sorted(
+            pid for pid in self._gram_candidates(self.name_grams, query_lower)
+            if pid not in taken and query_lower in rows[pid][1]
+        )
+        taken.update(name)
+
+        candidates = self._broad_candidates(query_lower)
+        if candidates is None:
+            candidates = range(len(rows))
+        broad = sorted(
+            pid for pid in candidates
+            if pid not in taken and (query_lower in rows[pid][2] or query_lower in rows[pid][3])
+        )
+        return exact, partial, name, broad
+
+    def exact(self, text):
+        """Product whose SKU (or, failing that, name) equals `text` case-insensitively."""
+        key = str(text or "").lower().strip()
+        for table in (self.sku_exact, self.name_exact):
+            pids = table.get(key)
+            if pids and key:
+                return self.products[pids[0]]
+        return None
+
+    def find(self, query):
+        """Returns matching product dicts in priority order (duplicates not yet removed)."""
+        if not query:
+            return []
+        query_lower = query.lower().strip()
+        products = self.products
+        return [products[pid] for tier in self.lookup(query_lower) for pid in tier]
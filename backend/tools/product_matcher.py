@@ -0,0 +1,239 @@
+import heapq
+import itertools
+import math
+import os
+import re
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Relative importance of each product field when ranking
+FIELD_WEIGHTS = {
+    "sku": 3.0,
+    "name": 2.0,
+    "brand": 1.5,
+    "category": 1.5,
+    "short_description": 0.5,
+}
+
+# Minimum confidence for a ranked match to be used automatically
+MATCH_CONFIDENCE_THRESHOLD = float(os.getenv("MATCH_CONFIDENCE_THRESHOLD", "0.6"))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Score multiplier for terms that only matched with a typo
+FUZZY_PENALTY = 0.7
+
+# Terms with more postings than this only re-score existing candidates (or, when
+# they are the rarest term of the query, contribute their best N products)
+MAX_POSTINGS_PER_TERM = int(os.getenv("MATCH_MAX_POSTINGS", "500"))
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "with", "to", "in", "on", "x",
+    "need", "want", "please", "quote", "pcs", "pc", "units", "unit", "qty",
+}
+
+
+def _stem(token):
+    """Tiny plural folding so 'cameras' finds 'camera' and 'switches' finds 'switch'."""
+    if len(token) <= 3 or token.endswith("ss") or token.isdigit():
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if token.endswith("ches") or token.endswith("shes"):
+        return token[:-2]
+    if token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [_stem(t) for t in TOKEN_RE.findall(str(text or "").lower())]
+
+
+def compact(text):
+    """'UXG-Enterprise' -> 'uxgenterprise', so spacing/dash variants of a SKU compare equal."""
+    return "".join(TOKEN_RE.findall(str(text or "").lower()))
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def edit_distance(a, b, limit=2):
+    """Optimal string alignment distance, giving up early once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class ProductMatcher:
+    """
+    Ranked, typo-tolerant matching of free-text item names against the catalog.
+
+    Everything expensive happens once per catalog snapshot:
+    - per-product BM25 term vectors plus impact-ordered postings (term -> [pid], best first)
+    - a symmetric-delete map (term minus one char -> terms) for edit-distance lookups
+    - compact SKU map for dash/space-insensitive SKU hits
+
+    A query walks the postings of its rarest terms and scores common terms
+    against the candidates' vectors, so very frequent words stay cheap.
+    """
+
+    def __init__(self, products):
+        self.products = products
+        self.postings = {}
+        self.idf = {}
+        self.delete_map = {}
+        self.sku_compact = {}
+
+        vectors = []
+        lengths = []
+        for pid, product in enumerate(products):
+            vector = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(product.get(field)):
+                    vector[term] = vector.get(term, 0.0) + weight
+            vectors.append(vector)
+            lengths.append(sum(vector.values()))
+
+            sku_key = compact(product.get("sku"))
+            if sku_key:
+                self.sku_compact.setdefault(sku_key, pid)
+
+        doc_count = len(products) or 1
+        avg_len = (sum(lengths) / len(lengths)) if lengths else 1.0
+
+        doc_freq = {}
+        for vector in vectors:
+            for term in vector:
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        for term, df in doc_freq.items():
+            self.idf[term] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+        # Per-product BM25 term weights, plus impact-ordered postings of product ids
+        self.doc_weights = []
+        for pid, vector in enumerate(vectors):
+            norm = K1 * (1 - B + B * lengths[pid] / avg_len)
+            weights = {
+                term: self.idf[term] * tf * (K1 + 1) / (tf + norm)
+                for term, tf in vector.items()
+            }
+            self.doc_weights.append(weights)
+            for term in weights:
+                self.postings.setdefault(term, []).append(pid)
+
+        doc_weights = self.doc_weights
+        for term, plist in self.postings.items():
+            plist.sort(key=lambda pid: doc_weights[pid][term], reverse=True)
+
+        for term in list(self.idf) + list(self.sku_compact):
+            if len(term) >= 4:
+                for deleted in _deletes(term):
+                    self.delete_map.setdefault(deleted, set()).add(term)
+
+        self.max_idf = max(self.idf.values(), default=1.0)
+
+    # --------------------------------------------------
+    # Typo tolerance
+    # --------------------------------------------------
+    def _similar(self, term):
+        """Known terms within edit distance 1 (2 for long terms) of `term`."""
+        if len(term) < 4:
+            return []
+        limit = 1 if len(term) < 8 else 2
+        candidates = set(self.delete_map.get(term, ()))
+        for deleted in _deletes(term):
+            if deleted in self.idf or deleted in self.sku_compact:
+                candidates.add(deleted)
+            candidates.update(self.delete_map.get(deleted, ()))
+        candidates.discard(term)
+        return [c for c in candidates if edit_distance(term, c, limit) <= limit]
+
+    def _expand(self, term):
+        """Returns [(known_term, factor)] for a query term: exact hit or typo neighbours."""
+        if term in self.idf:
+            return [(term, 1.0)]
+        return [(t, FUZZY_PENALTY) for t in self._similar(term) if t in self.idf]
+
+    def _sku_hit(self, query):
+        key = compact(query)
+        if not key:
+            return None, 0.0
+        if key in self.sku_compact:
+            return self.sku_compact[key], 1.0
+        for near in self._similar(key):
+            if near in self.sku_compact:
+                return self.sku_compact[near], 0.9
+        return None, 0.0
+
+    # --------------------------------------------------
+    # Ranking
+    # --------------------------------------------------
+    def rank(self, query, top_k=5, min_confidence=0.0):
+        """
+        Returns up to top_k [{"product", "score", "confidence"}], best first.
+        confidence (0..1) is the share of the query's IDF mass the product covers,
+        discounted for typo matches; an exact/near SKU hit counts as full coverage.
+        """
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t not in STOPWORDS and not t.isdigit()]
+
+        expanded = []
+        total_mass = 0.0
+        for term in terms:
+            total_mass += self.idf.get(term, self.max_idf)
+            expanded.extend(self._expand(term))
+
+        # Rare terms first: they pick the candidates, common terms mostly just re-score them
+        expanded.sort(key=lambda entry: len(self.postings[entry[0]]))
+
+        doc_weights = self.doc_weights
+        scores = {}
+        covered = {}
+        for known, factor in expanded:
+            idf = self.idf[known]
+            plist = self.postings[known]
+            if scores and len(plist) > MAX_POSTINGS_PER_TERM:
+                # Common term: only update products we already have, via their term vectors
+                pids = [pid for pid in scores if known in doc_weights[pid]]
+            else:
+                pids = itertools.islice(plist, MAX_POSTINGS_PER_TERM)
+            for pid in pids:
+                scores[pid] = scores.get(pid, 0.0) + doc_weights[pid][known] * factor
+                covered[pid] = covered.get(pid, 0.0) + idf * factor
+
+        sku_pid, sku_conf = self._sku_hit(query)
+
+        results = []
+        for pid, score in scores.items():
+            confidence = min(1.0, covered[pid] / total_mass) if total_mass else 0.0
+            if pid == sku_pid:
+                confidence = max(confidence, sku_conf)
+                score += self.max_idf * sku_conf
+            results.append((confidence, score, -pid))
+
+        if sku_pid is not None and sku_pid not in scores:
+            results.append((sku_conf, self.max_idf * sku_conf, -sku_pid))
+
+        best = heapq.nlargest(top_k, results)
+        return [
+            {"product": self.products[-neg_pid], "score": round(score, 4), "confidence": round(conf, 4)}
+            for conf, score, neg_pid in best
+            if conf >= min_confidence
+        ]
@@ -0,0 +1,61 @@
+import base64
+import json
+
+# Autocomplete projection: what the search box needs, none of the long texts
+DEFAULT_FIELDS = ("sku", "name", "thumbnail", "price", "brand")
+MAX_SEARCH_LIMIT = 100
+
+
+def encode_cursor(version, offset):
+    raw = json.dumps([version, offset]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (catalog_version, offset) or raises ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        version, offset = json.loads(raw)
+        return str(version), int(offset)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_fields(fields):
+    """'sku,name' -> ("sku", "name"); '*' -> None (whole product); empty -> defaults."""
+    if not fields:
+        return DEFAULT_FIELDS
+    if fields.strip() == "*":
+        return None
+    return tuple(f.strip() for f in fields.split(",") if f.strip())
+
+
+def search_products(snapshot, query="", limit=20, cursor=None, fields=None):
+    """
+    One page of catalog search results, ranked like ProductAgent.find_products
+    (exact SKU, SKU contains, name contains, brand/description contains).
+    Cursors are tied to the catalog version; a stale cursor raises ValueError.
+    """
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    offset = 0
+    if cursor:
+        version, offset = decode_cursor(cursor)
+        if version != snapshot.version:
+            raise ValueError("Catalog changed since this cursor was issued; restart the search")
+
+    ids = snapshot.search_ids(query)
+    page = ids[offset:offset + limit]
+    products = snapshot.products
+    projection = parse_fields(fields)
+    if projection is None:
+        items = [products[pid] for pid in page]
+    else:
+        items = [{f: products[pid].get(f) for f in projection} for pid in page]
+
+    next_offset = offset + len(page)
+    return {
+        "items": items,
+        "total": len(ids),
+        "next_cursor": encode_cursor(snapshot.version, next_offset) if next_offset < len(ids) else None,
+        "catalog_version": snapshot.version,
+    }
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from tools.executors import run_io
+from tools.shared_state import get_shared_state
+from tools.thumbnail_cache import LRUBytesCache
+
+# Identical finalize inputs within this window return the already rendered quotation (0 disables)
+RENDER_CACHE_TTL = int(os.getenv("RENDER_CACHE_TTL", "86400"))
+RENDER_CACHE_ENTRIES = int(os.getenv("RENDER_CACHE_ENTRIES", "10000"))
+RENDER_CACHE_BYTES = int(float(os.getenv("RENDER_CACHE_MB", "64")) * 1024 * 1024)
+# Idempotency-Key replays are honoured for this long
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Publish results / Idempotency-Keys in tools.shared_state so every worker and instance sees them
+RENDER_CACHE_SHARED = os.getenv("RENDER_CACHE_SHARED", "1") == "1"
+# A worker that sees another one rendering the same Idempotency-Key waits this long for its result
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "60"))
+
+# Bump when the template/layout changes in a way that should invalidate old renders
+RENDER_CACHE_VERSION = "1"
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused with a different request body."""
+
+
+class PdfUnavailable(Exception):
+    """A cached quotation's PDF exists but storage could not be read right now (retry later)."""
+
+
+def fingerprint(payload):
+    """Canonical sha256 of the render inputs (key order and float formatting independent)."""
+    canonical = json.dumps([RENDER_CACHE_VERSION, payload], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class QuotationCache:
+    """
+    Content-addressed cache of finalized quotations.
+
+    - content hash -> rendered result (invoice number, file name, ...), TTL + entry cap
+    - PDF bodies in a byte-capped LRU, falling back to PDF storage
+    - Idempotency-Key -> content hash + result, so client retries never burn a
+      new invoice number
+    - concurrent identical requests share one render
+    - with the shared tier, results and Idempotency-Keys are also published to
+      shared state (local misses check it), and an Idempotency-Key is claimed
+      there before rendering, so a retry landing on another worker replays too
+    """
+
+    def __init__(self, storage, ttl=RENDER_CACHE_TTL, max_entries=RENDER_CACHE_ENTRIES,
+                 max_bytes=RENDER_CACHE_BYTES, idempotency_ttl=IDEMPOTENCY_TTL, shared=None,
+                 use_shared=RENDER_CACHE_SHARED):
+        self.storage = storage
+        self._shared = shared
+        self.use_shared = use_shared or shared is not None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.idempotency_ttl = idempotency_ttl
+        self.pdfs = LRUBytesCache(max_bytes)
+
+        self._entries = OrderedDict()      # content hash -> (result, stored_at)
+        self._idempotency = OrderedDict()  # key -> (content hash, result, stored_at)
+        # forget() runs on I/O threads (history delete, compaction) while the loop reads/writes the tables
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.replays = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.shared_hits = 0
+        self.shared_errors = 0
+
+    async def get_or_render(self, content_hash, idempotency_key, render):
+        """
+        Returns (result, pdf_bytes, status) where status is "replay", "hit",
+        "coalesced" or "miss". `render` is an async callable returning
+        (result, pdf_bytes); it only runs on a miss.
+        """
+        if idempotency_key:
+            entry = self._fresh(self._idempotency, idempotency_key, self.idempotency_ttl)
+            if entry is None and self.use_shared:
+                entry = await self._shared_idempotency(idempotency_key)
+            if entry is not None:
+                stored_hash, result, _ = entry
+                if stored_hash != content_hash:
+                    raise IdempotencyConflict(f"Idempotency-Key {idempotency_key!r} was used with a different request")
+                pdf_bytes = await self._load_pdf(result)
+                if pdf_bytes is not None:
+                    self.replays += 1
+                    return result, pdf_bytes, "replay"
+
+        status = "miss"
+        cached = None
+        if self.ttl > 0:
+            entry = self._fresh(self._entries, content_hash, self.ttl)
+            if entry is None and self.use_shared:
+                entry = await self._shared_lookup("render:" + content_hash, self._entries, content_hash)
+            if entry is not None:
+                cached = entry[0]
+
+        pdf_bytes = await self._load_pdf(cached) if cached is not None else None
+        if pdf_bytes is not None:
+            self.hits += 1
+            result, status = cached, "hit"
+        else:
+            task = self._inflight.get(content_hash)
+            if task is None:
+                self.misses += 1
+                task = asyncio.ensure_future(self._render(content_hash, render, idempotency_key))
+                self._inflight[content_hash] = task
+                task.add_done_callback(lambda _: self._inflight.pop(content_hash, None))
+            else:
+                self.coalesced += 1
+                status = "coalesced"
+            result, pdf_bytes, rendered = await asyncio.shield(task)
+            if not rendered:
+                status = "coalesced"  # another worker rendered it
+
+        if idempotency_key:
+            entry = (content_hash, result, time.time())
+            self._put(self._idempotency, idempotency_key, entry)
+            if self.use_shared and status != "replay":
+                await self._shared_call("set", "idem:" + idempotency_key, json.dumps(entry), ttl=self.idempotency_ttl)
+        return result, pdf_bytes, status
+
+    async def _render(self, content_hash, render, idempotency_key=None):
+        claimed = False
+        if idempotency_key and self.use_shared:
+            # Another worker holding the key renders; take its result instead of a second invoice number
+            claimed = await self._shared_call("add", "idem-claim:" + idempotency_key, content_hash,
+                                              ttl=IDEMPOTENCY_WAIT)
+            if claimed is False:
+                entry = await self._wait_for_idempotency(idempotency_key)
+                if entry is not None and entry[0] != content_hash:
+                    raise IdempotencyConflict(f"Idempotency-Key {idempotency_key!r} was used with a different request")
+                if entry is not None:
+                    pdf_bytes = await self._load_pdf(entry[1])
+                    if pdf_bytes is not None:
+                        return entry[1], pdf_bytes, False
+        try:
+            result, pdf_bytes = await render()
+        except BaseException:
+            if claimed:
+                # Let a retry with the same key render straight away instead of waiting out the claim
+                await self._shared_call("delete", "idem-claim:" + idempotency_key)
+            raise
+        self.pdfs.put(result["invoice_no"], pdf_bytes)
+        if self.ttl > 0:
+            stored_at = time.time()
+            self._put(self._entries, content_hash, (result, stored_at))
+            if self.use_shared:
+                await self._shared_call("set", "render:" + content_hash, json.dumps([result, stored_at]), ttl=self.ttl)
+        return result, pdf_bytes, True
+
+    # --------------------------------------------------
+    # Shared tier
+    # --------------------------------------------------
+    async def _shared_call(self, method, *args, **kwargs):
+        """Shared-state call off the event loop; failures degrade to local-only caching (None)."""
+        try:
+            return await run_io(getattr(self._shared or get_shared_state(), method), *args, **kwargs)
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Shared render cache {method} failed: {e}")
+            return None
+
+    async def _shared_lookup(self, shared_key, table, key):
+        raw = await self._shared_call("get", shared_key)
+        if raw is None:
+            return None
+        entry = tuple(json.loads(raw))
+        self.shared_hits += 1
+        self._put(table, key, entry)
+        return self._fresh(table, key, self.idempotency_ttl if table is self._idempotency else self.ttl)
+
+    async def _shared_idempotency(self, idempotency_key):
+        return await self._shared_lookup("idem:" + idempotency_key, self._idempotency, idempotency_key)
+
+    async def _wait_for_idempotency(self, idempotency_key):
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT
+        while time.monotonic() < deadline:
+            entry = await self._shared_idempotency(idempotency_key)
+            if entry is not None:
+                self.coalesced += 1
+                return entry
+            await asyncio.sleep(0.1)
+        return None
+
+    async def _load_pdf(self, result):
+        """
+        PDF body for a cached result; None if it has been deleted since (retention in
+        another process, e.g. `python -m tools.pdf_compaction`, can't call forget()).
+        Other storage errors raise PdfUnavailable: re-rendering would spend a new
+        invoice number on a quotation that still exists.
+        """
+        pdf_bytes = self.pdfs.get(result["invoice_no"])
+        try:
+            if pdf_bytes is not None:
+                if await run_io(self.storage.stat, result["filename"]) is not None:
+                    return pdf_bytes
+                raise FileNotFoundError(result["filename"])
+            pdf_bytes = await run_io(self.storage.get, result["filename"])
+        except FileNotFoundError:
+            self.stale += 1
+            self.forget(result["invoice_no"])
+            return None
+        except self.storage.errors as e:
+            raise PdfUnavailable(f"PDF storage unavailable for {result['filename']}: {e}") from e
+        self.pdfs.put(result["invoice_no"], pdf_bytes)
+        return pdf_bytes
+
+    def _fresh(self, table, key, ttl):
+        with self._lock:
+            entry = table.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[-1] > ttl:
+                table.pop(key, None)
+                return None
+            table.move_to_end(key)
+            return entry
+
+    def _put(self, table, key, entry):
+        with self._lock:
+            table[key] = entry
+            table.move_to_end(key)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+
+    def forget(self, invoice_no):
+        """Drops every entry pointing at `invoice_no` (e.g. after its PDF was deleted). Thread-safe."""
+        self.pdfs.pop(invoice_no)
+        with self._lock:
+            for table, result_index in ((self._entries, 0), (self._idempotency, 1)):
+                for key in [k for k, entry in table.items() if entry[result_index]["invoice_no"] == invoice_no]:
+                    del table[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "idempotency_keys": len(self._idempotency),
+            "pdf_bytes": self.pdfs.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "replays": self.replays,
+            "stale": self.stale,
+            "shared_hits": self.shared_hits,
+            "shared_errors": self.shared_errors,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
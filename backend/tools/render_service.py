@@ -0,0 +1,131 @@
+import asyncio
+import os
+import threading
+import time
+
+from agents.formatting_agent import FormattingAgent
+from tools.executors import RENDER_POOL_SIZE, run_render
+from tools.pdf_generator import generate_pdf_from_html
+
+# Render one dummy quotation per worker at startup so fonts/CSS/templates are resident
+RENDER_PREWARM = os.getenv("RENDER_PREWARM", "1") == "1"
+
+STAGES = ("queue_ms", "template_ms", "layout_ms", "write_ms", "total_ms")
+
+_worker_state = threading.local()
+
+
+def render_quotation(context, output_path=None, return_bytes=False):
+    """
+    Render job, executed inside a render worker: template -> layout -> PDF.
+    The worker keeps its FormattingAgent (compiled Jinja templates) and WeasyPrint
+    fonts/stylesheets between jobs. context["template"] / context["locale"] select
+    the quotation template, which brings its own stylesheet.
+
+    The PDF is produced in memory, stored at `output_path` (if given) and handed
+    back when `return_bytes` is set, so callers never read the file back.
+    Returns (pdf_bytes or None, per-stage timings in ms + pdf_size + template file).
+    """
+    started = time.perf_counter()
+    if not hasattr(_worker_state, "formatting_agent"):
+        _worker_state.formatting_agent = FormattingAgent()
+
+    timings = {}
+    agent = _worker_state.formatting_agent
+    html_output = agent.generate_html_with_context(
+        context, template=context.get("template"), locale=context.get("locale"), timings=timings
+    )
+
+    stylesheets = agent.registry.stylesheets(timings["template"])
+    pdf_bytes = generate_pdf_from_html(html_output, timings=timings, stylesheets=stylesheets)
+    if output_path is not None:
+        write_file_atomic(output_path, pdf_bytes)
+    timings["worker_ms"] = (time.perf_counter() - started) * 1000
+    timings["pdf_size"] = len(pdf_bytes)
+    return (pdf_bytes if return_bytes else None), timings
+
+
+def write_file_atomic(path, data):
+    """Write-then-rename so /pdf never serves a half-written file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _sample_context():
+    return {
+        "invoice_no": "WARMUP", "quote_id": "WARMUP", "customer_name": "Warm-up",
+        "date_today": "", "valid_until": "",
+        "items": [{"sku": "WARMUP", "name": "Warm-up", "quantity": 1,
+                   "unit_price": 1.0, "line_total": 1.0, "base64_image": None}],
+        "subtotal": 1.0, "discount_rate": 0, "discount_amount": 0,
+        "tax_rate": 0, "tax_amount": 0, "total": 1.0,
+    }
+
+
+class RenderService:
+    """
+    Front-end for the persistent render workers (tools.executors render pool).
+    Jobs are queued onto the pool; each returns per-stage timings which are
+    aggregated here for monitoring.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.failures = 0
+        self.totals = {stage: 0.0 for stage in STAGES}
+        self.max = {stage: 0.0 for stage in STAGES}
+        self.templates = {}  # template file -> [renders, total template ms, max template ms]
+
+    async def render(self, context, output_path=None, return_bytes=False):
+        """Returns (pdf_bytes or None, timings); see render_quotation."""
+        started = time.perf_counter()
+        try:
+            pdf_bytes, timings = await run_render(render_quotation, context, output_path, return_bytes)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+        timings["queue_ms"] = max(timings["total_ms"] - timings.pop("worker_ms"), 0.0)
+        self._record(timings)
+        return pdf_bytes, timings
+
+    def _record(self, timings):
+        with self._lock:
+            self.jobs += 1
+            for stage in STAGES:
+                value = timings.get(stage, 0.0)
+                self.totals[stage] += value
+                self.max[stage] = max(self.max[stage], value)
+            entry = self.templates.setdefault(timings.get("template"), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += timings.get("template_ms", 0.0)
+            entry[2] = max(entry[2], timings.get("template_ms", 0.0))
+
+    async def warm_up(self, workers=RENDER_POOL_SIZE):
+        """Runs one render per worker so every worker has fonts/CSS/templates loaded."""
+        started = time.perf_counter()
+        await asyncio.gather(*(run_render(render_quotation, _sample_context()) for _ in range(workers)))
+        print(f"Render workers warmed: {workers} in {time.perf_counter() - started:.1f}s")
+
+    def stats(self):
+        with self._lock:
+            jobs = self.jobs
+            return {
+                "jobs": jobs,
+                "failures": self.failures,
+                "avg_ms": {s: round(self.totals[s] / jobs, 2) if jobs else 0.0 for s in STAGES},
+                "max_ms": {s: round(self.max[s], 2) for s in STAGES},
+                "templates": {
+                    name: {"renders": count, "avg_template_ms": round(total / count, 2), "max_template_ms": round(peak, 2)}
+                    for name, (count, total, peak) in self.templates.items()
+                },
+            }
+
+
+render_service = RenderService()
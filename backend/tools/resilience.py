@@ -0,0 +1,203 @@
+import asyncio
+import random
+import threading
+import time
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """The upstream is considered down; the call was not attempted."""
+
+
+class DeadlineExceeded(Exception):
+    """The call (including queueing and retries) ran out of time."""
+
+
+def is_retryable(exc):
+    """Timeouts, connection problems and 408/429/5xx answers are worth another attempt."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        # google.api_core exceptions carry the HTTP status as .code
+        code = getattr(exc, "code", None)
+        status = code if isinstance(code, int) else None
+    if status is not None:
+        return int(status) in RETRYABLE_STATUS
+    return type(exc).__name__ in ("ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+                                  "ServiceUnavailable", "DeadlineExceeded", "ResourceExhausted")
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failed attempts;
+    open -> half_open after `reset_timeout` seconds (one probe call allowed);
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_inflight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_inflight = False
+            if self.state == "half_open" and not self._probe_inflight:
+                self._probe_inflight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probe_inflight = False
+
+    def release_probe(self):
+        """The probe ended without an answer (cancelled): let the next call probe instead."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_inflight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe_inflight = False
+
+
+class ResilientCaller:
+    """
+    Wraps an async upstream call with an overall deadline, a per-attempt timeout,
+    bounded concurrency, jittered exponential backoff retries and a circuit breaker.
+    """
+
+    def __init__(self, name, deadline=20.0, attempt_timeout=8.0, max_concurrency=8, retries=2,
+                 backoff_base=0.25, backoff_max=2.0, breaker=None):
+        self.name = name
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = None
+
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retried = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+
+    async def call(self, fn):
+        """
+        Awaits `fn()` (a coroutine factory) under the policy. Raises CircuitOpenError
+        without calling upstream while the breaker is open, DeadlineExceeded when out
+        of time, or the last upstream error once retries are exhausted.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.calls += 1
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name}: circuit open")
+
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+        attempt = 0
+        try:
+            while True:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise DeadlineExceeded(f"{self.name}: deadline of {self.deadline}s exceeded")
+                try:
+                    result = await self._attempt(fn, remaining)
+                except DeadlineExceeded:
+                    self.timeouts += 1
+                    self.breaker.record_failure()
+                    raise
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                    self.breaker.record_failure()
+                    if attempt >= self.retries or not is_retryable(e) or not self.breaker.allow():
+                        raise
+                    attempt += 1
+                    self.retried += 1
+                    # Full jitter: spreads retries so a recovering upstream isn't hit in lockstep
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                    await asyncio.sleep(min(delay, max(deadline_at - time.monotonic(), 0)))
+                    continue
+
+                self.breaker.record_success()
+                self.successes += 1
+                return result
+        except asyncio.CancelledError:
+            # Not an Exception subclass: a cancelled probe would otherwise keep the breaker half-open
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.latency_ms_total += elapsed_ms
+            self.latency_ms_max = max(self.latency_ms_max, elapsed_ms)
+
+    async def _attempt(self, fn, remaining):
+        self.waiting += 1
+        try:
+            # Queueing for a slot counts against the deadline too
+            await asyncio.wait_for(self._semaphore.acquire(), remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{self.name}: no upstream slot within the deadline")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(fn(), min(self.attempt_timeout, remaining))
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        finished = self.successes + self.failures
+        return {
+            "state": self.breaker.state,
+            "times_opened": self.breaker.times_opened,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retried,
+            "rejected_open": self.rejected,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "avg_ms": round(self.latency_ms_total / finished, 2) if finished else 0.0,
+            "max_ms": round(self.latency_ms_max, 2),
+            "max_concurrency": self.max_concurrency,
+        }
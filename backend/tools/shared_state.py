@@ -0,0 +1,170 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# State shared by every worker / instance: invoice sequences, extraction and render caches.
+#   sqlite - one SQLite file (default) on a local disk: the workers of ONE host only.
+#            WAL mode needs shared memory, so never put it on NFS/SMB/EFS volumes.
+#   redis  - any Redis-compatible server (needs the `redis` package); use this as
+#            soon as there is more than one host/instance
+SHARED_STATE = os.getenv("SHARED_STATE", "sqlite").lower()
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", os.path.join("storage", "shared_state.db"))
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "redis://127.0.0.1:6379/0")
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "sq:")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key        TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv (expires_at) WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+# Expired SQLite rows are purged every this many writes
+_PURGE_EVERY = 1000
+
+
+class SqliteSharedState:
+    """
+    Key-value store and atomic counters in one SQLite file (WAL). Every uvicorn
+    worker on the host sees the same values; writes are serialised by SQLite's
+    lock, so counters never hand out a value twice. Single host only: WAL's
+    shared-memory index doesn't work over network filesystems.
+    """
+
+    kind = "sqlite"
+
+    def __init__(self, db_path=SHARED_STATE_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            # Autocommit: single statements are atomic on their own
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key, amount=1, initial=0):
+        """Adds `amount` (a missing counter starts at `initial`) and returns the new value."""
+        row = self._conn().execute(
+            "INSERT INTO counters (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + ? RETURNING value",
+            (key, initial + amount, amount),
+        ).fetchone()
+        return row[0]
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None),
+        )
+        self._wrote()
+
+    def add(self, key, value, ttl=None):
+        """Sets `key` only if it is absent (or expired); True if this call set it."""
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?",
+            (key, value, now + ttl if ttl else None, now),
+        )
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            self._conn().execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "backend": self.kind,
+            "db_path": self.db_path,
+            "keys": conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0],
+            "counters": conn.execute("SELECT COUNT(*) FROM counters").fetchone()[0],
+        }
+
+
+class RedisSharedState:
+    """
+    The same interface on a Redis-compatible server, for deployments with more
+    than one host. Keys are namespaced with SHARED_STATE_PREFIX.
+    """
+
+    kind = "redis"
+
+    def __init__(self, url=SHARED_STATE_URL, prefix=SHARED_STATE_PREFIX, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("SHARED_STATE=redis needs the redis package (pip install redis)")
+            client = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+        self.client = client
+        self.url = url
+        self.prefix = prefix
+
+    def incr(self, key, amount=1, initial=0):
+        key = self.prefix + key
+        if initial:
+            self.client.set(key, initial, nx=True)
+        return self.client.incrby(key, amount)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def stats(self):
+        # Only our prefix: the Redis DB may be shared with other apps (SCAN, not the blocking KEYS)
+        match = re.sub(r"([*?\[\]\\])", r"\\\1", self.prefix) + "*"
+        keys = sum(1 for _ in self.client.scan_iter(match=match, count=1000))
+        return {"backend": self.kind, "url": self.url, "keys": keys}
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state():
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                if SHARED_STATE == "redis":
+                    _state = RedisSharedState()
+                elif SHARED_STATE == "sqlite":
+                    _state = SqliteSharedState()
+                else:
+                    raise RuntimeError(f"Unknown SHARED_STATE: {SHARED_STATE!r} (sqlite or redis)")
+    return _state
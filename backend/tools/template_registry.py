@@ -0,0 +1,128 @@
+import os
+import re
+import threading
+import time
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateError  # noqa: F401 (re-exported)
+
+TEMPLATE_DIR = "templates"
+# Compiled template bytecode survives restarts here (empty string disables)
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.join("storage", "jinja_cache"))
+# Re-check template files for edits; turn off in production images where templates never change
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "1") == "1"
+
+DEFAULT_TEMPLATE = "default"
+# templates/quotation_template.html is "default"; templates/quotation_<name>[.<locale>].html are the others
+_FILE_RE = re.compile(r"^quotation_(?P<name>[a-z0-9_-]+)(?:\.(?P<locale>[a-z]{2}(?:[-_][a-z0-9]+)?))?\.html$", re.I)
+
+
+class UnknownTemplate(LookupError):
+    """The requested quotation template does not exist."""
+
+
+def template_filename(name, locale=None):
+    stem = "quotation_template" if name == DEFAULT_TEMPLATE else f"quotation_{name}"
+    return f"{stem}.{locale}.html" if locale else f"{stem}.html"
+
+
+class TemplateRegistry:
+    """
+    One Jinja environment for every quotation template.
+
+    Templates are compiled once per process and kept in memory; their bytecode is
+    also written to TEMPLATE_CACHE_DIR so a fresh worker skips the parse/compile
+    step. With auto_reload on, a template is recompiled only when its file changes.
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, cache_dir=TEMPLATE_CACHE_DIR, auto_reload=TEMPLATE_AUTO_RELOAD):
+        self.template_dir = template_dir
+        bytecode_cache = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=bytecode_cache,
+            auto_reload=auto_reload,
+            cache_size=-1,  # never evict: the set of templates is small and fixed
+        )
+
+    def available(self):
+        """{name: [locales]} for every quotation template on disk."""
+        found = {DEFAULT_TEMPLATE: []}
+        for filename in sorted(os.listdir(self.template_dir)):
+            match = _FILE_RE.match(filename)
+            if not match:
+                continue
+            name = match["name"].lower()
+            name = DEFAULT_TEMPLATE if name == "template" else name
+            locales = found.setdefault(name, [])
+            if match["locale"]:
+                locales.append(match["locale"])
+        return found
+
+    def resolve(self, name=None, locale=None):
+        """
+        File name of the template to use. A missing locale variant falls back to
+        the template's base file; an unknown template name raises UnknownTemplate.
+        """
+        name = (name or DEFAULT_TEMPLATE).strip().lower()
+        if name == "template" or not _FILE_RE.match(template_filename(name)):
+            raise UnknownTemplate(f"Unknown template: {name!r}")
+        candidates = [template_filename(name)]
+        if locale:
+            localized = template_filename(name, locale.strip().lower())
+            if not _FILE_RE.match(localized):
+                raise UnknownTemplate(f"Invalid locale: {locale!r}")
+            candidates.insert(0, localized)
+        for filename in candidates:
+            if os.path.exists(os.path.join(self.template_dir, filename)):
+                return filename
+        raise UnknownTemplate(f"Unknown template: {name!r} (available: {', '.join(self.available())})")
+
+    def stylesheets(self, filename):
+        """
+        Stylesheet paths for a resolved template file: quotation_<name>.css beside it,
+        shared by its locale variants. Empty if the template ships no stylesheet.
+        """
+        path = os.path.join(self.template_dir, filename.split(".", 1)[0] + ".css")
+        return (path,) if os.path.exists(path) else ()
+
+    def render(self, context, name=None, locale=None, timings=None):
+        """Renders a quotation template; template errors propagate to the caller."""
+        filename = self.resolve(name, locale)
+        started = time.perf_counter()
+        html = self.env.get_template(filename).render(**context)
+        if timings is not None:
+            timings["template"] = filename
+            timings["template_ms"] = (time.perf_counter() - started) * 1000
+        return html
+
+    def compile_all(self):
+        """Loads every template variant (from the bytecode cache when warm); returns how many."""
+        compiled = 0
+        for name, locales in self.available().items():
+            for locale in [None] + locales:
+                self.env.get_template(self.resolve(name, locale))
+                compiled += 1
+        return compiled
+
+    def stats(self):
+        return {
+            "available": self.available(),
+            "auto_reload": self.env.auto_reload,
+            "bytecode_cache": getattr(self.env.bytecode_cache, "directory", None),
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry()
+    return _registry
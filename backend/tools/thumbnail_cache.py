@@ -0,0 +1,312 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from tools.executors import run_io
+
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", os.path.join("storage", "thumbnails"))
+THUMBNAIL_MEMORY_BYTES = int(float(os.getenv("THUMBNAIL_CACHE_MB", "64")) * 1024 * 1024)
+THUMBNAIL_FETCH_CONCURRENCY = int(os.getenv("THUMBNAIL_FETCH_CONCURRENCY", "8"))
+# Disk copies younger than this are used without asking the origin server at all
+THUMBNAIL_REVALIDATE_SECONDS = int(os.getenv("THUMBNAIL_REVALIDATE_SECONDS", "86400"))
+# Failed URLs are not retried for this long (avoids a slow origin stalling every quote)
+THUMBNAIL_FAILURE_TTL = int(os.getenv("THUMBNAIL_FAILURE_TTL", "60"))
+THUMBNAIL_FAILURE_ENTRIES = int(os.getenv("THUMBNAIL_FAILURE_ENTRIES", "10000"))
+# Disk tier cap; least recently used images are evicted down to 80% of it (0 = unbounded)
+THUMBNAIL_DISK_BYTES = int(float(os.getenv("THUMBNAIL_DISK_MB", "1024")) * 1024 * 1024)
+PREWARM_THUMBNAILS = os.getenv("PREWARM_THUMBNAILS", "0") == "1"
+
+
+class LRUBytesCache:
+    """Thread-safe LRU keyed by string, bounded by the total size of its values."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._items[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def pop(self, key):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            return old
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ThumbnailCache:
+    """
+    Two-level cache for product thumbnails embedded in PDFs.
+
+    - memory: encoded data URIs, LRU with a byte cap
+    - disk:   original image bytes + ETag/Last-Modified, keyed by sha256(url),
+              bounded by max_disk_bytes (oldest-used files evicted by a periodic sweep)
+
+    Misses are fetched in parallel (bounded), concurrent requests for the same URL
+    share one download, and stale disk copies are revalidated with conditional GETs.
+    """
+
+    def __init__(self, encoder, client_factory, cache_dir=THUMBNAIL_CACHE_DIR,
+                 max_bytes=THUMBNAIL_MEMORY_BYTES, concurrency=THUMBNAIL_FETCH_CONCURRENCY,
+                 max_disk_bytes=THUMBNAIL_DISK_BYTES, max_failures=THUMBNAIL_FAILURE_ENTRIES):
+        self.encoder = encoder
+        self.client_factory = client_factory
+        self.cache_dir = cache_dir
+        self.memory = LRUBytesCache(max_bytes)
+        self.concurrency = concurrency
+        self.max_disk_bytes = max_disk_bytes
+        self.max_failures = max_failures
+
+        self._semaphore = None
+        self._inflight = {}
+        self._failures = OrderedDict()  # url -> time of last failure, oldest first
+        self._lock = threading.Lock()  # _written_since_sweep is bumped from several I/O threads
+        self._sweep_lock = threading.Lock()
+        self._written_since_sweep = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.revalidated = 0
+        self.fetches = 0
+        self.failures = 0
+        self.disk_evictions = 0
+
+    # --------------------------------------------------
+    # Disk store
+    # --------------------------------------------------
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".img", base + ".json"
+
+    def _read_disk(self, url):
+        data_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(data_path, "rb") as f:
+                content = f.read()
+            os.utime(data_path)  # recency for the disk sweep
+            return content, meta
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_disk(self, url, content, meta):
+        data_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        # Write-then-rename so a crash never leaves a half-written image behind
+        for path, payload, mode in ((data_path, content, "wb"), (meta_path, json.dumps(meta), "w")):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+        # Sweep every ~10% of the cap written, rather than statting the tree on each write
+        with self._lock:
+            self._written_since_sweep += len(content)
+            due = self.max_disk_bytes and self._written_since_sweep >= self.max_disk_bytes // 10
+            if due:
+                self._written_since_sweep = 0
+        if due:
+            self._sweep_disk()
+
+    def _sweep_disk(self):
+        """Evicts the least recently used images until the disk tier is under 80% of its cap."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return  # another thread is already sweeping
+        try:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith(".img"):
+                        continue
+                    data_path = os.path.join(root, name)
+                    meta_path = data_path[:-len(".img")] + ".json"
+                    try:
+                        st = os.stat(data_path)
+                        size = st.st_size + os.path.getsize(meta_path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, size, data_path, meta_path))
+                    total += size
+            if total <= self.max_disk_bytes:
+                return
+            entries.sort()
+            target = self.max_disk_bytes * 0.8
+            for _, size, data_path, meta_path in entries:
+                if total <= target:
+                    break
+                for path in (meta_path, data_path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                self.disk_evictions += 1
+        finally:
+            self._sweep_lock.release()
+
+    def _record_failure(self, url):
+        """Remembers a failed URL; expired and oldest entries are dropped to keep the map bounded."""
+        now = time.time()
+        self._failures.pop(url, None)
+        self._failures[url] = now
+        while self._failures:
+            oldest_url, failed_at = next(iter(self._failures.items()))
+            if len(self._failures) <= self.max_failures and now - failed_at < THUMBNAIL_FAILURE_TTL:
+                break
+            del self._failures[oldest_url]
+
+    # --------------------------------------------------
+    # Lookup
+    # --------------------------------------------------
+    async def get(self, url):
+        """Returns the encoded data URI for `url`, or None if it cannot be loaded."""
+        if not url:
+            return None
+
+        cached = self.memory.get(url)
+        if cached is not None:
+            self.memory_hits += 1
+            return cached
+
+        failed_at = self._failures.get(url)
+        if failed_at and time.time() - failed_at < THUMBNAIL_FAILURE_TTL:
+            return None
+
+        # Coalesce: concurrent callers for the same URL await one load
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._load(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def get_many(self, urls):
+        """Resolves many URLs concurrently; result order matches `urls`."""
+        return await asyncio.gather(*(self.get(url) for url in urls))
+
+    async def prewarm(self, urls):
+        urls = [u for u in dict.fromkeys(urls) if u]
+        started = time.perf_counter()
+        results = await self.get_many(urls)
+        loaded = sum(1 for r in results if r)
+        print(f"Thumbnail prewarm: {loaded}/{len(urls)} images in {time.perf_counter() - started:.1f}s")
+
+    async def _load(self, url):
+        content, meta = await run_io(self._read_disk, url)
+        fresh = meta is not None and time.time() - meta.get("fetched_at", 0) < THUMBNAIL_REVALIDATE_SECONDS
+
+        if content is not None and fresh:
+            self.disk_hits += 1
+        else:
+            fetched = await self._fetch(url, content, meta)
+            if fetched is not None:
+                content = fetched
+            elif content is None:
+                self._record_failure(url)
+                self.failures += 1
+                return None
+            # else: origin unreachable, serve the stale disk copy
+
+        try:
+            encoded = await run_io(self.encoder, content)
+        except Exception as e:
+            print(f"Failed to process image {url}: {e}")
+            self._record_failure(url)
+            self.failures += 1
+            return None
+
+        if encoded:
+            self.memory.put(url, encoded)
+        return encoded
+
+    async def _fetch(self, url, cached_content, meta):
+        """Downloads `url` (conditionally if we hold a copy). Returns current bytes or None."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        headers = {}
+        if cached_content is not None and meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        async with self._semaphore:
+            try:
+                response = await self.client_factory().get(url, headers=headers)
+            except Exception as e:
+                print(f"Failed to process image {url}: {e}")
+                return None
+
+        if response.status_code == 304 and cached_content is not None:
+            self.revalidated += 1
+            meta["fetched_at"] = time.time()
+            try:
+                await run_io(self._write_disk, url, cached_content, meta)
+            except OSError as e:
+                print(f"Thumbnail cache write failed for {url}: {e}")
+            return cached_content
+
+        if response.status_code != 200:
+            print(f"Failed to process image {url}: HTTP {response.status_code}")
+            return None
+
+        self.fetches += 1
+        new_meta = {
+            "url": url,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "content_type": response.headers.get("content-type"),
+            "fetched_at": time.time(),
+        }
+        try:
+            await run_io(self._write_disk, url, response.content, new_meta)
+        except OSError as e:
+            print(f"Thumbnail cache write failed for {url}: {e}")
+        return response.content
+
+    def stats(self):
+        return {
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+            "memory_max_bytes": self.memory.max_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "revalidated": self.revalidated,
+            "fetches": self.fetches,
+            "failures": self.failures,
+            "failed_urls": len(self._failures),
+            "disk_max_bytes": self.max_disk_bytes,
+            "disk_evictions": self.disk_evictions,
+        }
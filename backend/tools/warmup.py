@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+
+from tools.executors import run_io
+
+# Comma-separated warm-up steps to run at startup ("all" or "none" also work); default is
+# every registered step except the ones switched off by their own flag (RENDER_PREWARM, ...)
+WARMUP_STEPS = os.getenv("WARMUP_STEPS", "")
+# What the server waits for before accepting traffic:
+#   core - catalog, history, caches, templates (default); render workers / Gemini warm in the background
+#   all  - every gating step (platforms without a readiness probe)
+#   none - bind immediately and report progress on /ready
+WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "core").lower()
+
+
+class WarmupStep:
+    def __init__(self, name, fn, core=False, gating=True, enabled=True):
+        self.name = name
+        self.fn = fn  # sync (run off the event loop) or async
+        self.core = core
+        self.gating = gating  # readiness waits for it
+        self.enabled = enabled
+        self.status = "pending" if enabled else "skipped"
+        self.ms = None
+        self.error = None
+
+    def to_dict(self):
+        entry = {"status": self.status, "gating": self.gating}
+        if self.ms is not None:
+            entry["ms"] = round(self.ms, 1)
+        if self.error:
+            entry["error"] = self.error
+        return entry
+
+
+class Warmup:
+    """
+    Startup warm-up: named steps (load the catalog, compile templates, render a
+    dummy PDF, ...) with per-step timings and a readiness flag for /ready.
+
+    Steps run in registration order; the blocking ones are awaited before the app
+    starts serving, the rest continue in a background task. A failed step is logged
+    and reported, it doesn't stop startup (the work happens lazily on first use).
+    """
+
+    def __init__(self, steps=WARMUP_STEPS, blocking=WARMUP_BLOCKING):
+        self.selected = {s.strip() for s in steps.split(",") if s.strip()} if steps else None
+        self.blocking = blocking
+        self.steps = []
+        self._started = None
+        self._finished = None
+        self._tasks = []
+
+    def add(self, name, fn, core=False, gating=True, enabled=True):
+        if self.selected is not None and "all" not in self.selected:
+            enabled = name in self.selected
+        elif self.selected is not None:
+            enabled = True
+        self.steps.append(WarmupStep(name, fn, core=core, gating=gating, enabled=enabled))
+
+    def _blocks_startup(self, step):
+        if self.blocking == "all":
+            return step.gating
+        if self.blocking == "none":
+            return False
+        return step.core
+
+    async def _run_step(self, step):
+        step.status = "running"
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(step.fn):
+                await step.fn()
+            else:
+                await run_io(step.fn)
+            step.status = "done"
+        except Exception as e:
+            step.status = "failed"
+            step.error = f"{type(e).__name__}: {e}"
+            print(f"Warm-up step {step.name} failed: {step.error}")
+        step.ms = (time.perf_counter() - started) * 1000
+
+    async def _run_all(self, steps):
+        for step in steps:
+            await self._run_step(step)
+        if not any(s.status in ("pending", "running") for s in self.steps if s.gating):
+            self._finished = time.perf_counter()
+            print(f"Warm-up finished in {(self._finished - self._started):.2f}s")
+
+    async def start(self):
+        """Runs the blocking steps, then schedules the others in the background."""
+        self._started = time.perf_counter()
+        enabled = [s for s in self.steps if s.enabled]
+        blocking = [s for s in enabled if self._blocks_startup(s)]
+        background = [s for s in enabled if not self._blocks_startup(s)]
+        for step in blocking:
+            await self._run_step(step)
+        gating = [s for s in background if s.gating]
+        # Non-gating steps (thumbnail prefetch) don't hold up readiness
+        self._tasks = [asyncio.create_task(self._run_all(gating))]
+        self._tasks += [asyncio.create_task(self._run_step(s)) for s in background if not s.gating]
+        if not gating:
+            await self._tasks[0]
+
+    async def stop(self):
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+
+    @property
+    def ready(self):
+        return all(s.status not in ("pending", "running") for s in self.steps if s.gating)
+
+    def status(self):
+        failed = [s.name for s in self.steps if s.gating and s.status == "failed"]
+        if not self.ready:
+            state = "warming"
+        else:
+            state = "degraded" if failed else "ready"
+        return {
+            "status": state,
+            "blocking": self.blocking,
+            "warmup_ms": round((self._finished - self._started) * 1000, 1) if self._finished and self._started else None,
+            "steps": {s.name: s.to_dict() for s in self.steps},
+        }
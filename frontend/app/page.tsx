@@ -44,7 +44,8 @@ interface QuotationResult {
   invoice_no: string;
   pdf_url: string;
   filename: string;
-  pdf_base64?: string; // Optional because old records might not have it
+  pdf_base64?: string; // Only sent when requested with include_pdf=true
+  pdf_blob?: Blob; // PDF returned directly by /finalize-quotation?format=pdf
   grand_total: number;
 }
 
@@ -52,6 +53,9 @@ interface HistoryItem {
   filename: string;
   url: string;
   created_at: string;
+  invoice_no?: string;
+  customer_name?: string | null;
+  grand_total?: number | null;
 }
 
 // Speech Recognition Type Definition
@@ -83,6 +87,7 @@ export default function Home() {
   const [analyzing, setAnalyzing] = useState(false);
   const [finalResult, setFinalResult] = useState<QuotationResult | null>(null);
   const [history, setHistory] = useState<HistoryItem[]>([]);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
   const [generating, setGenerating] = useState(false);
 
   /* ---------------- VALID UNTIL AUTO SET ---------------- */
@@ -93,11 +98,15 @@ export default function Home() {
   }, [invoiceDate]);
 
   /* ---------------- HISTORY FETCH ---------------- */
-  const fetchHistory = async () => {
+  // History is paginated: the next page's cursor comes back in X-Next-Cursor
+  const fetchHistory = async (cursor?: string) => {
     try {
       // Uses dynamic URL from config
-      const res = await axios.get(`${API_BASE_URL}/history`);
-      setHistory(res.data);
+      const res = await axios.get(`${API_BASE_URL}/history`, {
+        params: cursor ? { cursor } : {},
+      });
+      setHistory((prev) => (cursor ? [...prev, ...res.data] : res.data));
+      setHistoryCursor(res.headers["x-next-cursor"] ?? null);
     } catch (e) {
       console.error("History load failed", e);
     }
@@ -132,6 +141,20 @@ export default function Home() {
     downloadLink.click();
   };
 
+  const downloadBlob = (blob: Blob, filename: string) => {
+    // Create a temporary URL for the downloaded blob
+    const url = window.URL.createObjectURL(blob);
+    const link = document.createElement("a");
+    link.href = url;
+    link.setAttribute("download", filename);
+    document.body.appendChild(link);
+    link.click();
+
+    // Cleanup
+    link.remove();
+    window.URL.revokeObjectURL(url);
+  };
+
   // 2. DOWNLOAD HISTORY (For History Tab)
   // This fetches the file data fresh from the backend, ignoring broken DB links.
   const handleHistoryDownload = async (filename: string) => {
@@ -139,18 +162,7 @@ export default function Home() {
       const response = await axios.get(`${API_BASE_URL}/pdf/${filename}`, {
         responseType: "blob", // Important: Treat response as binary file
       });
-
-      // Create a temporary URL for the downloaded blob
-      const url = window.URL.createObjectURL(new Blob([response.data]));
-      const link = document.createElement("a");
-      link.href = url;
-      link.setAttribute("download", filename);
-      document.body.appendChild(link);
-      link.click();
-
-      // Cleanup
-      link.remove();
-      window.URL.revokeObjectURL(url);
+      downloadBlob(new Blob([response.data]), filename);
     } catch (error) {
       console.error("Download failed:", error);
       alert(
@@ -180,21 +192,26 @@ export default function Home() {
   };
 
   /* ---------------- ANALYZE REQUEST ---------------- */
+  // Streams Server-Sent Events from /analyze-request/stream so matched products
+  // appear as soon as each one resolves; falls back to the plain JSON endpoint.
   const generateQuotation = async () => {
     setAnalyzing(true);
     setFinalResult(null);
     setProducts([]);
 
     try {
-      const res = await axios.post(`${API_BASE_URL}/analyze-request`, {
-        prompt,
-      });
-
-      if (res.data.success) {
-        setProducts(res.data.products);
-
-        if (res.data.suggested_customer?.trim()) {
-          setCustomerName(res.data.suggested_customer);
+      const streamed = await analyzeStreaming();
+      if (!streamed) {
+        const res = await axios.post(`${API_BASE_URL}/analyze-request`, {
+          prompt,
+        });
+
+        if (res.data.success) {
+          setProducts(res.data.products);
+
+          if (res.data.suggested_customer?.trim()) {
+            setCustomerName(res.data.suggested_customer);
+          }
         }
       }
     } catch (e) {
@@ -205,6 +222,56 @@ export default function Home() {
     }
   };
 
+  // Returns false if streaming isn't available (caller uses the JSON endpoint)
+  const analyzeStreaming = async (): Promise<boolean> => {
+    let res: Response;
+    try {
+      res = await fetch(`${API_BASE_URL}/analyze-request/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ prompt }),
+      });
+    } catch {
+      return false;
+    }
+    if (!res.ok || !res.body) return false;
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        let data = "";
+        for (const line of raw.split("\n")) {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        if (!data) continue;
+        const payload = JSON.parse(data);
+
+        if (event === "extraction" && payload.suggested_customer?.trim()) {
+          setCustomerName(payload.suggested_customer);
+        } else if (event === "product") {
+          setProducts((prev) => [...prev, payload.product]);
+        } else if (event === "error") {
+          throw new Error(payload.detail);
+        }
+      }
+    }
+    return true;
+  };
+
   /* ---------------- SMART SEARCH ADD ---------------- */
   const addProductFromSearch = (prod: any) => {
     const price = Number(prod.unit_price || prod.price || 0);
@@ -254,21 +321,29 @@ export default function Home() {
         products,
       };
 
+      // format=pdf: the PDF comes back as the response body (no base64 round trip),
+      // invoice details come back in headers
       const res = await axios.post(
         `${API_BASE_URL}/finalize-quotation`,
-        payload
+        payload,
+        { params: { format: "pdf" }, responseType: "blob" }
       );
 
-      if (res.data && res.data.success) {
-        setFinalResult(res.data);
+      const invoiceNo = res.headers["x-invoice-no"];
+      if (invoiceNo) {
+        const result: QuotationResult = {
+          success: true,
+          invoice_no: invoiceNo,
+          pdf_url: res.headers["x-pdf-url"],
+          filename: `${invoiceNo}.pdf`,
+          pdf_blob: res.data,
+          grand_total: Number(res.headers["x-grand-total"]),
+        };
+        setFinalResult(result);
         fetchHistory(); // Refresh history list
 
-        // AUTO-DOWNLOAD: Check if we got the raw file data
-        if (res.data.pdf_base64) {
-          downloadFromBase64(res.data.pdf_base64, res.data.filename);
-        } else {
-          alert(`Generated! Invoice #${res.data.invoice_no}`);
-        }
+        // AUTO-DOWNLOAD
+        downloadBlob(res.data, result.filename);
       }
     } catch (err) {
       console.error("Finalize Error:", err);
@@ -670,15 +745,19 @@ export default function Home() {
 
                         <button
                           onClick={() => {
-                            if (finalResult.pdf_base64) {
+                            if (finalResult.pdf_blob) {
                               // OPTION A: Instant Download (Prod & Local)
+                              downloadBlob(
+                                finalResult.pdf_blob,
+                                finalResult.filename
+                              );
+                            } else if (finalResult.pdf_base64) {
                               downloadFromBase64(
                                 finalResult.pdf_base64,
                                 finalResult.filename
                               );
                             } else {
-                              // OPTION B: Fallback
-                              alert("PDF Base64 data missing. Trying URL...");
+                              // OPTION B: Fallback to the stored file
                               window.open(finalResult.pdf_url, "_blank");
                             }
                           }}
@@ -724,7 +803,7 @@ export default function Home() {
               </p>
             </div>
             <button
-              onClick={fetchHistory}
+              onClick={() => fetchHistory()}
               className="text-blue-600 hover:bg-blue-100 p-2 rounded-full"
             >
               <RefreshCcw size={20} />
@@ -754,6 +833,9 @@ export default function Home() {
                   </div>
                   <div>
                     <p className="font-bold text-gray-800">{file.filename}</p>
+                    {file.customer_name && (
+                      <p className="text-xs text-gray-600">{file.customer_name}</p>
+                    )}
                     <p className="text-xs text-gray-500 flex items-center gap-1">
                       <Calendar size={12} /> {file.created_at}
                     </p>
@@ -789,6 +871,17 @@ export default function Home() {
               </div>
             ))
           )}
+
+          {historyCursor && (
+            <div className="p-4 text-center">
+              <button
+                onClick={() => fetchHistory(historyCursor)}
+                className="text-blue-600 text-sm font-semibold hover:underline"
+              >
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect, useRef, useMemo } from "react";
+import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { API_BASE_URL } from "../lib/config";
 import { Search, Package, Plus, Loader2, X } from "lucide-react";
@@ -29,62 +29,54 @@ interface SmartSearchProps {
   onAddProduct: (product: Product) => void;
 }
 
+const normalize = (p: RawProduct): Product => ({
+  name: String(p.name || "Unknown Product"),
+  sku: String(p.sku || "NO-SKU"),
+  unit_price: Number(p.unit_price || p.price || 0),
+  thumbnail: typeof p.thumbnail === "string" ? p.thumbnail : undefined,
+  brand: typeof p.brand === "string" ? p.brand : undefined,
+});
+
 export default function SmartSearch({ onAddProduct }: SmartSearchProps) {
   const [query, setQuery] = useState("");
-  const [allProducts, setAllProducts] = useState<Product[]>([]);
+  const [filteredResults, setFilteredResults] = useState<Product[]>([]);
   const [loading, setLoading] = useState(false);
   const [isOpen, setIsOpen] = useState(false);
   const wrapperRef = useRef<HTMLDivElement>(null);
 
-  // 1. Fetch Data on Mount
+  // 1. Server-side search (debounced): only the top matches, only the fields we show
   useEffect(() => {
-    const fetchData = async () => {
+    const q = query.trim();
+    if (!q) {
+      // An aborted in-flight request skips its setLoading(false), so reset it here
+      setFilteredResults([]);
+      setLoading(false);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
       setLoading(true);
       try {
-        const res = await axios.get(`${API_BASE_URL}/products`);
-
-        let data: RawProduct[] = [];
-
-        if (Array.isArray(res.data)) {
-          data = res.data;
-        } else if (res.data && Array.isArray(res.data.products)) {
-          data = res.data.products;
-        }
-
-        // Fix 1: Removed 'any', used 'RawProduct' type
-        const normalized: Product[] = data.map((p) => ({
-          name: String(p.name || "Unknown Product"),
-          sku: String(p.sku || "NO-SKU"),
-          unit_price: Number(p.unit_price || p.price || 0),
-          thumbnail: typeof p.thumbnail === "string" ? p.thumbnail : undefined,
-          brand: typeof p.brand === "string" ? p.brand : undefined,
-        }));
-
-        setAllProducts(normalized);
+        const res = await axios.get(`${API_BASE_URL}/products/search`, {
+          params: { q, limit: 10, fields: "sku,name,thumbnail,price,brand" },
+          signal: controller.signal,
+        });
+        const data: RawProduct[] = Array.isArray(res.data?.items) ? res.data.items : [];
+        setFilteredResults(data.map(normalize));
       } catch (e) {
-        console.error("Smart Search Error:", e);
+        if (!axios.isCancel(e)) console.error("Smart Search Error:", e);
       } finally {
-        setLoading(false);
+        if (!controller.signal.aborted) setLoading(false);
       }
-    };
-    fetchData();
-  }, []);
+    }, 150);
 
-  // Fix 2: Replaced 'useEffect' with 'useMemo'
-  // This calculates results instantly during render, avoiding the cascading update error
-  const filteredResults = useMemo(() => {
-    if (!query.trim()) return [];
-
-    const q = query.toLowerCase();
-    return allProducts
-      .filter(
-        (p) =>
-          p.name.toLowerCase().includes(q) ||
-          p.sku.toLowerCase().includes(q) ||
-          (p.brand && p.brand.toLowerCase().includes(q))
-      )
-      .slice(0, 10); // Limit results
-  }, [query, allProducts]);
+    // A newer keystroke cancels the pending / in-flight request
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query]);
 
   // 3. Click Outside to Close
   useEffect(() => {